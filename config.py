@@ -2,15 +2,100 @@
 Configuration file for the Finance data pipeline.
 """
 
+import os
+
 # --- Active Tickers Check Job ---
 ACTIVE_TICKERS_BATCH_SIZE = 100
 ACTIVE_TICKERS_THREADS = 30
+# Max tickers probed concurrently by the asyncio engine (--mode async)
+ACTIVE_TICKERS_ASYNC_CONCURRENCY = 500
+# Liveness probe for single/distributed modes: "light" checks the raw Yahoo response for
+# data, "full" builds the statement DataFrame from it with stockdex
+ACTIVE_TICKERS_PROBE = "light"
+# Re-check tickers whose active_tickers row is older than this many days (None: never)
+ACTIVE_TICKERS_RECHECK_DAYS = 90
 
 # --- Financial Data ETL Jobs ---
 # Number of tickers to fetch per job run
 ETL_BATCH_SIZE = 10
 # Concurrent threads for fetching financial data from Yahoo
 ETL_THREADS = 1
+# How batches are written: "insert" (executemany), "copy" (COPY into a staging table)
+# or "incremental" (ON CONFLICT upsert of new/changed rows only)
+ETL_LOAD_METHOD = "insert"
+# Streaming pipeline (--pipeline): fetch, melt and load run concurrently, connected by
+# queues of at most ETL_PIPELINE_QUEUE_SIZE tickers; results are written once
+# ETL_FLUSH_ROWS rows have accumulated or ETL_FLUSH_SECONDS have passed
+ETL_PIPELINE = False
+ETL_PIPELINE_QUEUE_SIZE = 100
+ETL_FLUSH_ROWS = 20000
+ETL_FLUSH_SECONDS = 5.0
+# Sharded runs (--sharded / --workers): workers claim batches through the etl_leases
+# table. A crashed worker's claims expire after ETL_LEASE_MINUTES (renewed on every
+# claim); a finished worker's tickers stay claimed for ETL_LEASE_HOLD_HOURS, about one
+# schedule interval, so other workers do not refetch tickers that had no data
+ETL_SHARDED = False
+ETL_LEASE_MINUTES = 15
+ETL_LEASE_HOLD_HOURS = 6
+
+# Run state (see finance/src/run_state.py): both jobs record per-ticker outcomes, and
+# an interrupted run is resumed by the next one if it is less than
+# RUN_STATE_RESUME_HOURS old. A run with a heartbeat newer than RUN_STATE_STALE_MINUTES
+# is considered alive. Tickers that fail transiently RUN_STATE_MAX_ATTEMPTS times are
+# marked failed and skipped. Off until the etl_runs migration is applied
+# (python -m finance.src.run_migrations)
+RUN_STATE_ENABLED = False
+RUN_STATE_MAX_ATTEMPTS = 3
+RUN_STATE_RESUME_HOURS = 24
+RUN_STATE_STALE_MINUTES = 10
+
+# --- Yahoo rate limiting (per host, per process; see finance/src/rate_limiter.py) ---
+# Requests/second and requests in flight start at the initial values, grow while
+# responses are healthy and are halved on 429/403/5xx/timeouts
+RATE_LIMIT_INITIAL_RATE = 20
+RATE_LIMIT_MIN_RATE = 0.5
+RATE_LIMIT_MAX_RATE = 500
+RATE_LIMIT_INITIAL_CONCURRENCY = 20
+RATE_LIMIT_MAX_CONCURRENCY = 1000
+# Retries of a throttled request, with full-jitter exponential backoff (seconds)
+RATE_LIMIT_RETRIES = 4
+RATE_LIMIT_BACKOFF = 1.0
+RATE_LIMIT_MAX_BACKOFF = 30.0
+
+# --- Postgres reads (see finance/src/postgres_interface.py) ---
+# Rows fetched per round trip by the chunked read helpers (server-side cursors)
+DB_READ_CHUNK_ROWS = 10_000
+
+# --- Local caches ---
+# Directory for local caches (Yahoo responses, columnar copy of the tickers file)
+CACHE_DIR = os.path.join(os.path.dirname(__file__), ".cache")
+# On-disk cache of raw Yahoo responses shared by the financial ETL and the liveness probes
+# (see finance/src/response_cache.py). Off by default; enable with --cache
+RESPONSE_CACHE_ENABLED = False
+RESPONSE_CACHE_PATH = os.path.join(CACHE_DIR, "yahoo_responses.sqlite")
+RESPONSE_CACHE_TTL_HOURS = 24
+RESPONSE_CACHE_MAX_MB = 512
+
+# --- Run metrics (see finance/src/run_metrics.py) ---
+# Per-stage latency histograms, Yahoo request outcomes per endpoint and the slowest
+# tickers of each run, written to METRICS_DIR as a JSON summary and a Prometheus
+# text-format file (--metrics)
+METRICS_ENABLED = False
+METRICS_DIR = os.path.join(os.path.dirname(__file__), "metrics")
+METRICS_SLOWEST_N = 10
+
+# --- Parquet export (see finance/src/parquet_export.py) ---
+PARQUET_EXPORT_DIR = os.path.join(os.path.dirname(__file__), "exports", "parquet")
+# Rows fetched from Postgres per chunk
+PARQUET_EXPORT_CHUNK_ROWS = 100_000
+# Incremental exports also re-export rows inserted this long before the previous export
+# started, which may have been committed after it read the table
+PARQUET_EXPORT_OVERLAP_MINUTES = 60
+
+# --- Statement table partitioning (see finance/src/statement_partitioning.py) ---
+# Hash partitions by ticker_id of each frequency partition of a partitioned statement
+# table
+STATEMENT_TICKER_PARTITIONS = 16
 
 # --- General ---
 SCHEMA = "finance"
@@ -0,0 +1 @@
+"""Offline benchmarks for the finance data pipeline."""
@@ -0,0 +1,174 @@
+"""
+Benchmark for the active-tickers check engines against a local Yahoo stub.
+
+Runs the threaded engine (yahoo_client requests in a ThreadPoolExecutor, as in
+'single' mode) and the asyncio engine ('async' mode) over the same synthetic
+tickers and reports tickers/sec and requests per ticker. 'async-static' is the
+asyncio engine probing every endpoint in the fixed YAHOO_METHODS order, without
+liveness_probe's deduplication and adaptive ordering. --endpoint-ratios makes the
+stub answer only for a share of active tickers per endpoint, so ordering matters;
+--throttle-ratio makes it answer a share of requests with HTTP 429, exercising the
+rate limiter's backoff (tickers still throttled after retries are reported as
+"unknown", never as inactive). No network or database access is needed.
+
+Usage:
+    python -m finance.benchmarks.bench_active_tickers [--tickers N] [--latency S]
+        [--threads N] [--concurrency N] [--engines threads async async-static]
+        [--endpoint-ratios income_statement=0.3 cash_flow=0.6 balance_sheet=0.95]
+        [--throttle-ratio R]
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# etl_job imports the Postgres interface, which requires a connection string; nothing connects here
+os.environ.setdefault("PG_NEON_FINANCE_URL", "postgresql://localhost/unused")
+
+from stockdex import config as stockdex_config  # noqa: E402
+
+from finance.benchmarks.yahoo_stub import (  # noqa: E402
+    YahooStub,
+    has_endpoint_data,
+    is_active_ticker,
+)
+from finance.src import yahoo_async  # noqa: E402
+from finance.src.etl_job import YAHOO_METHODS, _check_single_ticker  # noqa: E402
+from finance.src.liveness_probe import ProbeStats, distinct_methods  # noqa: E402
+from finance.src.rate_limiter import ThrottledError  # noqa: E402
+from finance.src.response_cache import set_response_cache_enabled  # noqa: E402
+from finance.src.yahoo_async import AsyncYahooProbe, build_timeseries_url  # noqa: E402
+
+
+def make_tickers(n: int) -> list[str]:
+    return [f"T{i:06d}" for i in range(n)]
+
+
+def first_type(entity: str) -> str:
+    """First timeseries type stockdex requests for entity, which the stub keys endpoints on."""
+    method = next(m for m in YAHOO_METHODS if m.endswith(entity))
+    url = build_timeseries_url("T", method)
+    return url.split("type=", 1)[1].split(",", 1)[0]
+
+
+def expected_active(ticker_symbol: str, active_ratio: float, endpoint_ratios: dict) -> bool:
+    if not is_active_ticker(ticker_symbol, active_ratio):
+        return False
+    first_types = {first_type(m.removeprefix("yahoo_api_")) for m in YAHOO_METHODS}
+    return any(
+        t not in endpoint_ratios or has_endpoint_data(ticker_symbol, t, endpoint_ratios[t])
+        for t in first_types
+    )
+
+
+def run_threads(stub: YahooStub, tickers: list[str], threads: int) -> list[bool | None]:
+    """Threaded engine: yahoo_client requests pointed at the stub."""
+    stockdex_config.FUNDAMENTALS_BASE_URL = stub.base_url
+    yahoo_async.YAHOO_COOKIE_URL = stub.cookie_url
+    yahoo_async.YAHOO_CRUMB_URL = stub.crumb_url
+    stats = ProbeStats(distinct_methods(YAHOO_METHODS))
+
+    def check(ticker_symbol: str) -> bool | None:
+        try:
+            return _check_single_ticker(ticker_symbol, stats=stats)
+        except ThrottledError:
+            return None
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(check, tickers))
+
+
+def run_async(
+    stub: YahooStub, tickers: list[str], concurrency: int, adaptive: bool
+) -> list[bool | None]:
+    """Asyncio engine with one shared session."""
+
+    async def check() -> list[dict]:
+        stats = ProbeStats(distinct_methods(YAHOO_METHODS)) if adaptive else None
+        probe = AsyncYahooProbe(
+            stats.methods if adaptive else YAHOO_METHODS,
+            max_concurrency=concurrency,
+            base_url=stub.base_url,
+            cookie_url=stub.cookie_url,
+            crumb_url=stub.crumb_url,
+            stats=stats,
+        )
+        await probe.open()
+        try:
+            return await probe.check_batch([{"ticker": t} for t in tickers])
+        finally:
+            await probe.close()
+
+    return [row["is_active"] for row in asyncio.run(check())]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark active-tickers check engines")
+    parser.add_argument("--tickers", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub latency per request (s)")
+    parser.add_argument("--active-ratio", type=float, default=0.5)
+    parser.add_argument("--threads", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument(
+        "--engines",
+        nargs="+",
+        default=["threads", "async", "async-static"],
+        choices=["threads", "async", "async-static"],
+    )
+    parser.add_argument(
+        "--endpoint-ratios",
+        nargs="*",
+        default=["income_statement=0.3", "cash_flow=0.6", "balance_sheet=0.95"],
+        metavar="ENTITY=RATIO",
+        help="Share of active tickers each endpoint has data for (default: skewed)",
+    )
+    parser.add_argument(
+        "--throttle-ratio",
+        type=float,
+        default=0.0,
+        help="Share of stub requests answered with HTTP 429",
+    )
+    args = parser.parse_args()
+
+    # Every engine must hit the stub, not responses cached by a previous engine or run
+    set_response_cache_enabled(False)
+    endpoint_ratios = {
+        first_type(entity): float(ratio)
+        for entity, ratio in (item.split("=", 1) for item in args.endpoint_ratios)
+    }
+    tickers = make_tickers(args.tickers)
+    expected = [expected_active(t, args.active_ratio, endpoint_ratios) for t in tickers]
+    engines = {
+        "threads": lambda stub: run_threads(stub, tickers, args.threads),
+        "async": lambda stub: run_async(stub, tickers, args.concurrency, adaptive=True),
+        "async-static": lambda stub: run_async(stub, tickers, args.concurrency, adaptive=False),
+    }
+
+    print(f"tickers: {args.tickers} | stub latency: {args.latency * 1000:.0f}ms")
+    for name in args.engines:
+        with YahooStub(
+            args.latency,
+            args.active_ratio,
+            endpoint_ratios=endpoint_ratios,
+            throttle_ratio=args.throttle_ratio,
+        ) as stub:
+            start = time.perf_counter()
+            results = engines[name](stub)
+            elapsed = time.perf_counter() - start
+            requests = stub.requests
+            throttled = stub.throttled
+        mismatches = sum(r is not None and r != e for r, e in zip(results, expected))
+        unknown = sum(r is None for r in results)
+        width = args.threads if name == "threads" else args.concurrency
+        print(
+            f"  {name:<12} width={width:<5} {elapsed:7.2f}s  "
+            f"{args.tickers / elapsed:8.1f} tickers/sec  "
+            f"{requests / args.tickers:.2f} requests/ticker  {throttled} throttled  "
+            f"{sum(bool(r) for r in results)} active  {unknown} unknown  {mismatches} mismatches"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+End-to-end benchmark of both ETL jobs against a local Yahoo stub and a local Postgres.
+
+Creates a scratch database (--database, next to the one in PG_NEON_FINANCE_URL) with
+the finance schema, seeds a synthetic --tickers universe and runs, for every mode
+and thread count, the real jobs against it:
+
+- active tickers check (ETLJob) in --active-modes: single, distributed and async
+  (async uses --concurrency instead of the thread count), reading the universe
+  from memory instead of the tickers file
+- financial data ETL (FinancialDataETL, or MultiTableFinancialETL with --table all)
+  in --etl-modes: batch and pipeline, over the seeded active_tickers
+
+Each run checks or loads --limit tickers in a fresh process, with the tables it
+writes emptied beforehand, the response cache off and run metrics on. Yahoo is
+served by yahoo_stub with synthetic payloads, --latency per request, and
+--throttle-ratio/--error-ratio of requests answered with HTTP 429/404. Reported per
+run: tickers/sec, rows written/sec, p50/p99 batch latency (in pipeline mode: time
+between flushes), peak RSS of the run's process (from /proc, so Linux only; in
+distributed mode without its workers) and the stub's request counts.
+
+--output writes the results as JSON; --compare reads such a file and exits non-zero
+if a run's tickers/sec dropped by more than --tolerance against it, for CI.
+
+Point PG_NEON_FINANCE_URL at a local Postgres, not at the production database. The
+scratch database is dropped afterwards unless --keep is given.
+
+Usage:
+    python -m finance.benchmarks.bench_e2e [--tickers N] [--limit N] [--threads 10 20]
+        [--concurrency N] [--active-modes single distributed async]
+        [--etl-modes batch pipeline] [--table income_stmt|all] [--latency S]
+        [--throttle-ratio R] [--error-ratio R] [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import glob
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+
+from config import FINANCIAL_TABLES, SCHEMA
+from finance.benchmarks.bench_sql_reads import _reset_peak_rss, _status_mb
+from finance.benchmarks.yahoo_stub import YahooStub, is_active_ticker, use_stub
+from finance.src.etl_job import UNIVERSE_COLUMNS, ETLJob
+from finance.src.financial_data_etl import FinancialDataETL, MultiTableFinancialETL
+from finance.src.postgres_interface import NEON_CONNECTION_STRING, PostgresInterface
+from finance.src.response_cache import set_response_cache_enabled
+from finance.src.run_migrations import MIGRATIONS, apply_migration
+from finance.src.ticker_keys import TICKER_KEYS_MIGRATION
+
+ACTIVE_MODES = ["single", "distributed", "async"]
+ETL_MODES = ["batch", "pipeline"]
+
+SCHEMA_DDL = (
+    [
+        f"CREATE SCHEMA {SCHEMA}",
+        f"""CREATE TABLE {SCHEMA}.active_tickers (
+        ticker VARCHAR(20) PRIMARY KEY, name VARCHAR, exchange VARCHAR, category_name VARCHAR,
+        country VARCHAR, is_active BOOLEAN, upsert_datetime TIMESTAMP
+    )""",
+    ]
+    + [
+        f"""CREATE TABLE {SCHEMA}.{table} (
+        ticker VARCHAR, frequency VARCHAR, report_date DATE, metric VARCHAR,
+        value DOUBLE PRECISION, insert_datetime TIMESTAMP
+    )"""
+        for table in FINANCIAL_TABLES
+    ]
+)
+# Migrations applied to the scratch schema: the natural-key indexes. The tables of the
+# other migrations are left out, so the jobs run with their defaults
+SCRATCH_MIGRATIONS = [TICKER_KEYS_MIGRATION]
+
+
+def make_universe(n: int) -> pd.DataFrame:
+    """Synthetic ticker universe in the tickers file's columns."""
+    tickers = [f"E{i:06d}" for i in range(n)]
+    return pd.DataFrame(
+        {
+            "ticker": tickers,
+            "name": [f"{ticker} Holdings Inc." for ticker in tickers],
+            "exchange": "NMS",
+            "category_name": "Benchmark",
+            "country": "United States",
+        }
+    )[UNIVERSE_COLUMNS].astype("string")
+
+
+class UniverseETLJob(ETLJob):
+    """ETLJob reading its universe from memory instead of the tickers file."""
+
+    def __init__(self, universe: pd.DataFrame, **kwargs):
+        super().__init__(**kwargs)
+        self.universe = universe
+
+    def load_ticker_universe(self) -> pd.DataFrame:
+        return self.universe
+
+
+def create_database(admin_url, database: str) -> str:
+    """(Re)create the scratch database with the finance schema; returns its URL."""
+    admin = create_engine(admin_url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+        conn.execute(text(f'CREATE DATABASE "{database}"'))
+    admin.dispose()
+    url = make_url(admin_url).set(database=database).render_as_string(hide_password=False)
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for statement in SCHEMA_DDL:
+            conn.execute(text(statement))
+    for migration in MIGRATIONS:
+        if migration.name in SCRATCH_MIGRATIONS:
+            apply_migration(engine, migration)
+    engine.dispose()
+    return url
+
+
+def drop_database(admin_url, database: str) -> None:
+    admin = create_engine(admin_url, isolation_level="AUTOCOMMIT")
+    with admin.connect() as conn:
+        conn.execute(text(f'DROP DATABASE IF EXISTS "{database}"'))
+    admin.dispose()
+
+
+def seed_active_tickers(engine, universe: pd.DataFrame, active_ratio: float) -> int:
+    """COPY the universe into active_tickers, active where the stub has data."""
+    now = datetime.utcnow().isoformat()
+    buffer = io.StringIO()
+    for row in universe.itertuples(index=False):
+        active = "t" if is_active_ticker(row.ticker, active_ratio) else "f"
+        fields = [row.ticker, row.name, row.exchange, row.category_name, row.country, active, now]
+        buffer.write("\t".join(map(str, fields)) + "\n")
+    buffer.seek(0)
+    with engine.begin() as conn:
+        conn.execute(text(f"TRUNCATE {SCHEMA}.active_tickers"))
+        with conn.connection.cursor() as cur:
+            cur.copy_expert(f"COPY {SCHEMA}.active_tickers FROM STDIN", buffer)
+    return len(universe)
+
+
+def reset_tables(engine, keep_active_tickers: bool) -> None:
+    """Empty every table of the schema (statement tables, freshness, run state, leases)."""
+    with engine.begin() as conn:
+        tables = [
+            row[0]
+            for row in conn.execute(
+                text("SELECT tablename FROM pg_tables WHERE schemaname = :schema"),
+                {"schema": SCHEMA},
+            )
+            if not (keep_active_tickers and row[0] == "active_tickers")
+        ]
+        conn.execute(text(f"TRUNCATE {', '.join(f'{SCHEMA}.{table}' for table in tables)}"))
+
+
+def run_job(config: dict) -> dict:
+    """One job run in a fresh process; returns its throughput, batch latency and peak RSS."""
+    # Distributed-mode workers fork from here, inheriting the stub and cache settings
+    # (this process itself is spawned, which would otherwise make them spawn too)
+    multiprocessing.set_start_method("fork", force=True)
+    use_stub(config["stub_url"])
+    set_response_cache_enabled(False)
+    postgres = PostgresInterface(config["database_url"])
+    limit, width = config["limit"], config["width"]
+    batch_size = config["batch_size"]
+    max_batches = -(-limit // batch_size)
+    if config["job"] == "active_tickers":
+        job = UniverseETLJob(
+            make_universe(config["tickers"]),
+            postgres_interface=postgres,
+            batch_size=batch_size,
+            mode=config["mode"],
+            max_threads=width,
+            max_concurrency=width,
+            run_state=False,
+            resume=False,
+            metrics=True,
+        )
+
+        def run(metrics_dir):
+            job.metrics_dir = metrics_dir
+            job.run_active_tickers_check(max_batches=max_batches)
+
+    else:
+        options = dict(
+            postgres_interface=postgres,
+            batch_size=batch_size,
+            max_threads=width,
+            pipeline=config["mode"] == "pipeline",
+            sharded=False,
+            run_state=False,
+            resume=False,
+            metrics=True,
+        )
+        if config["table"] == "all":
+            job = MultiTableFinancialETL(**options)
+        else:
+            job = FinancialDataETL(config["table"], **options)
+
+        def run(metrics_dir):
+            job.metrics_dir = metrics_dir
+            job.run(max_batches=max_batches)
+
+    with tempfile.TemporaryDirectory() as metrics_dir:
+        _reset_peak_rss()
+        baseline = _status_mb("VmRSS")
+        start = time.perf_counter()
+        run(metrics_dir)
+        seconds = time.perf_counter() - start
+        peak = _status_mb("VmHWM") - baseline
+        with open(glob.glob(os.path.join(metrics_dir, "*.json"))[0]) as f:
+            summary = json.load(f)
+
+    totals = summary["totals"] or {}
+    if config["job"] == "active_tickers":
+        tickers = totals.get("active", 0) + totals.get("inactive", 0) + totals.get("throttled", 0)
+        rows = tickers - totals.get("throttled", 0)
+    else:
+        tickers, rows = totals.get("processed", 0), totals.get("rows_written", 0)
+    stages = summary["stages"]
+    batches = stages.get("batch") or stages.get("flush") or {}
+    return {
+        "seconds": seconds,
+        "tickers": tickers,
+        "rows": rows,
+        "tickers_per_sec": tickers / seconds,
+        "rows_per_sec": rows / seconds,
+        "batch_p50_ms": batches.get("p50_ms", 0.0),
+        "batch_p99_ms": batches.get("p99_ms", 0.0),
+        "peak_rss_mb": peak,
+    }
+
+
+def run_key(result: dict) -> str:
+    return f"{result['job']}/{result['mode']}/{result['width']}"
+
+
+def compare(results: list[dict], baseline_file: str, tolerance: float) -> list[str]:
+    """Runs whose tickers/sec dropped by more than tolerance against the baseline file."""
+    with open(baseline_file) as f:
+        baseline = {run_key(result): result for result in json.load(f)["results"]}
+    regressions = []
+    for result in results:
+        before = baseline.get(run_key(result))
+        if before and result["tickers_per_sec"] < before["tickers_per_sec"] * (1 - tolerance):
+            regressions.append(
+                f"{run_key(result)}: {result['tickers_per_sec']:.1f} tickers/s, "
+                f"was {before['tickers_per_sec']:.1f}"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="End-to-end benchmark of both ETL jobs against a Yahoo stub"
+    )
+    parser.add_argument("--tickers", type=int, default=100_000, help="Ticker universe size")
+    parser.add_argument(
+        "--limit", type=int, default=2000, help="Tickers checked or loaded per run"
+    )
+    parser.add_argument(
+        "--threads", type=int, nargs="+", default=[10, 20], help="Thread counts to run"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=200, help="Requests in flight in async mode"
+    )
+    parser.add_argument("--active-modes", nargs="*", choices=ACTIVE_MODES, default=ACTIVE_MODES)
+    parser.add_argument("--etl-modes", nargs="*", choices=ETL_MODES, default=ETL_MODES)
+    parser.add_argument("--table", choices=[*FINANCIAL_TABLES, "all"], default="income_stmt")
+    parser.add_argument("--active-batch-size", type=int, default=500)
+    parser.add_argument("--etl-batch-size", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response latency (s)")
+    parser.add_argument(
+        "--active-ratio", type=float, default=0.5, help="Share of tickers with data"
+    )
+    parser.add_argument(
+        "--throttle-ratio", type=float, default=0.0, help="Share of requests answered 429"
+    )
+    parser.add_argument(
+        "--error-ratio", type=float, default=0.0, help="Share of requests answered 404"
+    )
+    parser.add_argument("--database", default="finance_e2e_bench", help="Scratch database name")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch database")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Results JSON file to check for regressions against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="Allowed tickers/sec drop (share)"
+    )
+    args = parser.parse_args()
+
+    runs = [
+        (
+            "active_tickers",
+            mode,
+            args.concurrency if mode == "async" else threads,
+            args.active_batch_size,
+        )
+        for mode in args.active_modes
+        for threads in ([None] if mode == "async" else args.threads)
+    ]
+    runs += [
+        ("financial_data", mode, threads, args.etl_batch_size)
+        for mode in args.etl_modes
+        for threads in args.threads
+    ]
+
+    database_url = create_database(NEON_CONNECTION_STRING, args.database)
+    engine = create_engine(database_url)
+    universe = make_universe(args.tickers)
+    results = []
+    try:
+        seeded = False
+        context = multiprocessing.get_context("spawn")
+        print(
+            f"{'job':<15} {'mode':<12} {'width':>5} {'tickers':>7} {'tickers/s':>9} {'rows/s':>9} "
+            f"{'p50 batch':>10} {'p99 batch':>10} {'peak RSS':>9} {'requests':>8} {'429s':>6} "
+            f"{'errors':>6}"
+        )
+        for job, mode, width, batch_size in runs:
+            if job == "financial_data" and not seeded:
+                start = time.perf_counter()
+                seed_active_tickers(engine, universe, args.active_ratio)
+                seconds = time.perf_counter() - start
+                print(f"Seeded {len(universe)} active_tickers rows in {seconds:.1f}s")
+                seeded = True
+            reset_tables(engine, keep_active_tickers=job == "financial_data")
+            with YahooStub(
+                latency=args.latency,
+                active_ratio=args.active_ratio,
+                throttle_ratio=args.throttle_ratio,
+                error_ratio=args.error_ratio,
+            ) as stub:
+                config = {
+                    "job": job,
+                    "mode": mode,
+                    "width": width,
+                    "batch_size": batch_size,
+                    "tickers": args.tickers,
+                    "limit": args.limit,
+                    "table": args.table,
+                    "stub_url": stub.root_url,
+                    "database_url": database_url,
+                }
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    result = {
+                        "job": job,
+                        "mode": mode,
+                        "width": width,
+                        **pool.submit(run_job, config).result(),
+                    }
+                result.update(requests=stub.requests, throttled=stub.throttled, errors=stub.errors)
+            results.append(result)
+            print(
+                f"{job:<15} {mode:<12} {width:>5} {result['tickers']:>7} "
+                f"{result['tickers_per_sec']:>9.1f} {result['rows_per_sec']:>9.0f} "
+                f"{result['batch_p50_ms']:>8.0f}ms {result['batch_p99_ms']:>8.0f}ms "
+                f"{result['peak_rss_mb']:>7.1f}MB {result['requests']:>8} "
+                f"{result['throttled']:>6} {result['errors']:>6}"
+            )
+    finally:
+        engine.dispose()
+        if not args.keep:
+            drop_database(NEON_CONNECTION_STRING, args.database)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
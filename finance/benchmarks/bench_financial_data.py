@@ -0,0 +1,204 @@
+"""
+Latency benchmark for the /api/financial_data query.
+
+Seeds synthetic statement rows for --tickers tickers (prefixed BENCH) into the four
+statement tables of the database in PG_NEON_FINANCE_URL, then times the previous
+implementation (one pooled connection and one query per table, filtering on
+UPPER(ticker)) against fetch_financial_data (one UNION ALL query on the plain ticker
+predicate) over the same random tickers, and checks both return the same data.
+Then times the endpoint itself through Flask's test client once its in-process
+response cache is warm. The seeded rows are deleted afterwards unless --keep is given.
+
+Point PG_NEON_FINANCE_URL at a local Postgres, not at the production database, with
+the ticker_natural_keys migration applied (python -m finance.src.run_migrations).
+
+Usage:
+    python -m finance.benchmarks.bench_financial_data [--tickers N] [--metrics N]
+        [--dates N] [--requests N] [--keep]
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from finance.src.financial_data_etl import _copy_replace_ticker_rows, _layout_rows
+from finance.src.schema_migrations import migration_applied, require_migration
+from finance.src.statement_encoding import TICKER_IDS_TABLE, statement_layout
+from finance.src.statement_snapshots import FRESHNESS_TABLE, LATEST_TABLE
+from finance.src.ticker_keys import TICKER_KEYS_MIGRATION
+from finance.src.web.app import SCHEMA, TABLES, app, engine, fetch_financial_data
+
+PREFIX = "BENCH"
+
+
+def legacy_fetch_financial_data(ticker: str) -> dict:
+    """The per-table implementation the endpoint replaced, kept as the baseline."""
+    data = {}
+    for table in TABLES:
+        query = text(
+            f"""
+            SELECT ticker, frequency, report_date, metric, value
+            FROM {SCHEMA}.{table}
+            WHERE UPPER(ticker) = :ticker
+            ORDER BY frequency, report_date, metric
+        """
+        )
+        with engine.connect() as conn:
+            result = conn.execute(query, {"ticker": ticker})
+            rows = [
+                {
+                    "ticker": row[0],
+                    "frequency": row[1],
+                    "report_date": row[2].isoformat(),
+                    "metric": row[3],
+                    "value": row[4],
+                }
+                for row in result
+            ]
+        data[table] = {
+            "annual": [r for r in rows if r["frequency"] == "annual"],
+            "quarterly": [r for r in rows if r["frequency"] == "quarterly"],
+        }
+    return data
+
+
+def make_tickers(n: int) -> list[str]:
+    return [f"{PREFIX}{i:06d}" for i in range(n)]
+
+
+def seed(tickers: list[str], n_metrics: int, n_dates: int) -> int:
+    """COPY synthetic rows (both frequencies) for tickers into every statement table."""
+    keys = pd.MultiIndex.from_product(
+        [
+            tickers,
+            ["annual", "quarterly"],
+            range(n_metrics),
+            [date(2024 - i, 12, 31) for i in range(n_dates)],
+        ],
+        names=["ticker", "frequency", "metric", "report_date"],
+    ).to_frame(index=False)
+    df = pd.DataFrame(
+        {
+            "ticker": keys["ticker"],
+            "frequency": keys["frequency"],
+            "report_date": keys["report_date"],
+            "metric": keys["frequency"] + "Metric" + keys["metric"].astype(str),
+            "value": np.random.default_rng(0).uniform(-1e9, 1e9, len(keys)).round(2),
+            "insert_datetime": datetime.utcnow(),
+        }
+    )
+    with engine.connect() as conn:
+        # Measure the index the schema ships with, not one created here
+        require_migration(conn, TICKER_KEYS_MIGRATION, "The benchmark")
+    for table in TABLES:
+        # Ids for dictionary-encoded tables (see statement_encoding)
+        layout, rows = _layout_rows(engine, table, df)
+        with engine.begin() as conn:
+            _copy_replace_ticker_rows(conn, layout, rows)
+            conn.execute(text(f"ANALYZE {SCHEMA}.{layout.table}"))
+            # The API cache versions responses by the ETL's load times
+            if not migration_applied(conn, FRESHNESS_TABLE):
+                continue
+            conn.execute(
+                text(
+                    f"""
+                    INSERT INTO {SCHEMA}.{FRESHNESS_TABLE}
+                        (table_name, ticker, frequency, last_insert)
+                    SELECT :table, ticker, frequency, MAX(insert_datetime) FROM {SCHEMA}.{table}
+                    WHERE ticker LIKE :prefix GROUP BY ticker, frequency
+                    ON CONFLICT DO NOTHING
+                """
+                ),
+                {"table": table, "prefix": f"{PREFIX}%"},
+            )
+    return len(df) * len(TABLES)
+
+
+def cleanup() -> None:
+    with engine.begin() as conn:
+        for table in TABLES + [FRESHNESS_TABLE, LATEST_TABLE]:
+            if conn.execute(text(f"SELECT to_regclass('{SCHEMA}.{table}')")).scalar() is None:
+                continue
+            if table in TABLES and statement_layout(engine, table).encoded:
+                conn.execute(
+                    text(
+                        f"""
+                        DELETE FROM {SCHEMA}.{table}_data WHERE ticker_id IN (
+                            SELECT ticker_id FROM {SCHEMA}.{TICKER_IDS_TABLE}
+                            WHERE ticker LIKE :prefix
+                        )
+                    """
+                    ),
+                    {"prefix": f"{PREFIX}%"},
+                )
+            else:
+                conn.execute(
+                    text(f"DELETE FROM {SCHEMA}.{table} WHERE ticker LIKE :prefix"),
+                    {"prefix": f"{PREFIX}%"},
+                )
+
+
+def time_requests(label: str, fetch, tickers: list[str]) -> None:
+    latencies = []
+    for ticker in tickers:
+        start = time.perf_counter()
+        fetch(ticker)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) >= 20 else latencies[-1]
+    print(
+        f"{label:<10} mean {statistics.mean(latencies):7.2f} ms "
+        f"| p50 {statistics.median(latencies):7.2f} ms | p95 {p95:7.2f} ms "
+        f"| {len(latencies)} requests"
+    )
+
+
+def single_query(ticker: str) -> dict:
+    with engine.connect() as conn:
+        return fetch_financial_data(conn, ticker)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /api/financial_data query")
+    parser.add_argument("--tickers", type=int, default=1000, help="Seeded tickers")
+    parser.add_argument("--metrics", type=int, default=30, help="Metrics per ticker and frequency")
+    parser.add_argument("--dates", type=int, default=5, help="Report dates per metric")
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows")
+    args = parser.parse_args()
+
+    tickers = make_tickers(args.tickers)
+    cleanup()
+    start = time.perf_counter()
+    rows = seed(tickers, args.metrics, args.dates)
+    print(f"Seeded {rows} rows for {len(tickers)} tickers in {time.perf_counter() - start:.1f}s")
+
+    try:
+        sample = random.Random(1).choices(tickers, k=args.requests)
+        if legacy_fetch_financial_data(sample[0]) != single_query(sample[0]):
+            raise AssertionError(
+                "UNION ALL query returned different data than the per-table queries"
+            )
+        # Warm up the pool and the plan cache
+        for ticker in sample[:5]:
+            legacy_fetch_financial_data(ticker)
+            single_query(ticker)
+        time_requests("per-table", legacy_fetch_financial_data, sample)
+        time_requests("union-all", single_query, sample)
+        client = app.test_client()
+        for ticker in sample:
+            client.get(f"/api/financial_data/{ticker}")
+        time_requests("cached", lambda ticker: client.get(f"/api/financial_data/{ticker}"), sample)
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Micro-benchmark for _melt_financial_df.
+
+Compares the previous per-cell implementation (Series.apply of a scalar parser
+plus a per-row frequency lambda) against the vectorized one, on synthetic
+stockdex-shaped DataFrames, and the memory of a batch of melted rows with string
+columns against categorical ones. No network or database access is needed.
+
+Usage:
+    python -m finance.benchmarks.bench_melt [--tickers N] [--metrics N] [--dates N] [--repeat N]
+"""
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+# financial_data_etl imports the Postgres interface, which requires a connection string;
+# nothing connects here
+os.environ.setdefault("PG_NEON_FINANCE_URL", "postgresql://localhost/unused")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from finance.src.financial_data_etl import (  # noqa: E402
+    CATEGORICAL_COLUMNS,
+    _concat_melted,
+    _melt_financial_df,
+    _parse_value,
+    _parse_values,
+)
+
+
+def legacy_melt_financial_df(ticker_symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+    """The per-cell implementation _melt_financial_df replaced, kept as the baseline."""
+    df = df.copy()
+    df.index.name = "report_date"
+    df = df.reset_index()
+    metric_cols = [c for c in df.columns if c != "report_date"]
+    melted = df.melt(
+        id_vars=["report_date"], value_vars=metric_cols, var_name="metric", value_name="value_raw"
+    )
+    melted["value"] = melted["value_raw"].apply(_parse_value)
+    melted = melted.dropna(subset=["value"])
+    melted["report_date"] = pd.to_datetime(melted["report_date"], errors="coerce").dt.date
+    melted = melted.dropna(subset=["report_date"])
+    melted["frequency"] = melted["metric"].apply(
+        lambda m: "quarterly" if m.startswith("quarterly") else "annual"
+    )
+    melted["ticker"] = ticker_symbol
+    melted["insert_datetime"] = datetime.utcnow()
+    return melted[["ticker", "frequency", "report_date", "metric", "value", "insert_datetime"]]
+
+
+def make_raw_values(n_values: int, seed: int = 0) -> list[str]:
+    """Build stockdex-style cell values: mostly suffixed, some plain, comma and '--' cells."""
+    rng = np.random.default_rng(seed)
+    numbers = rng.uniform(-999, 999, n_values).round(2)
+    suffixes = np.array(["T", "B", "M", "K", "", ""])[rng.integers(0, 6, n_values)]
+    values = [f"{num}{suffix}" for num, suffix in zip(numbers, suffixes)]
+    for i in range(0, n_values, 17):
+        values[i] = "--"
+    for i in range(5, n_values, 23):
+        values[i] = f"{int(abs(numbers[i]) * 1000):,}"
+    return values
+
+
+def make_statement(n_metrics: int, n_dates: int, seed: int = 0) -> pd.DataFrame:
+    """Build one wide statement as stockdex returns it: index=dates, columns=metrics."""
+    dates = pd.date_range("2019-09-30", periods=n_dates, freq="QE").strftime("%Y-%m-%d")
+    metrics = [f"{'quarterly' if i % 2 else 'annual'}Metric{i}" for i in range(n_metrics)]
+    values = np.array(make_raw_values(n_metrics * n_dates, seed), dtype=object)
+    return pd.DataFrame(values.reshape(n_dates, n_metrics), index=dates, columns=metrics)
+
+
+def _best_of(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _report(label: str, n_rows: int, legacy_s: float, current_s: float) -> None:
+    print(f"[{label}]")
+    print(f"  legacy:     {legacy_s:.3f}s  {n_rows / legacy_s:,.0f} rows/sec")
+    print(f"  vectorized: {current_s:.3f}s  {n_rows / current_s:,.0f} rows/sec")
+    print(f"  speedup:    {legacy_s / current_s:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark _melt_financial_df")
+    parser.add_argument("--tickers", type=int, default=300)
+    parser.add_argument("--metrics", type=int, default=60)
+    parser.add_argument("--dates", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    statements = [make_statement(args.metrics, args.dates, seed) for seed in range(args.tickers)]
+    n_rows = args.tickers * args.metrics * args.dates
+
+    for statement in statements[:10]:
+        expected = legacy_melt_financial_df("TEST", statement).reset_index(drop=True)
+        actual = _melt_financial_df("TEST", statement).reset_index(drop=True)
+        actual = actual.astype({column: object for column in CATEGORICAL_COLUMNS})
+        pd.testing.assert_frame_equal(
+            expected.drop(columns="insert_datetime"), actual.drop(columns="insert_datetime")
+        )
+
+    print(f"rows: {n_rows} ({args.tickers} tickers x {args.metrics * args.dates} cells)")
+
+    legacy_s = _best_of(
+        lambda: [legacy_melt_financial_df("TEST", df) for df in statements], args.repeat
+    )
+    current_s = _best_of(
+        lambda: [_melt_financial_df("TEST", df) for df in statements], args.repeat
+    )
+    _report("_melt_financial_df per ticker", n_rows, legacy_s, current_s)
+
+    legacy_mb = pd.concat(
+        [legacy_melt_financial_df(f"T{i:05d}", df) for i, df in enumerate(statements)]
+    )
+    legacy_mb = legacy_mb.memory_usage(deep=True).sum() / 2**20
+    current_mb = _concat_melted(
+        [_melt_financial_df(f"T{i:05d}", df) for i, df in enumerate(statements)]
+    )
+    current_mb = current_mb.memory_usage(deep=True).sum() / 2**20
+    print("[melted batch memory]")
+    print(f"  strings:     {legacy_mb:.1f} MB")
+    print(f"  categorical: {current_mb:.1f} MB ({legacy_mb / current_mb:.1f}x smaller)")
+
+    values = pd.Series(make_raw_values(n_rows), dtype=object)
+    legacy_s = _best_of(lambda: values.apply(_parse_value), args.repeat)
+    current_s = _best_of(lambda: _parse_values(values), args.repeat)
+    _report("value parsing, one series", n_rows, legacy_s, current_s)
+
+
+if __name__ == "__main__":
+    main()
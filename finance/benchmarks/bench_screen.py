@@ -0,0 +1,106 @@
+"""
+Latency benchmark for cross-sectional screens (/api/screen).
+
+Seeds synthetic statement rows for --tickers tickers (prefixed BENCH, see
+bench_financial_data) into the database in PG_NEON_FINANCE_URL, rebuilds the
+statement_latest rows of income_stmt from them, and times, for random metrics, the top
+--limit tickers by latest value:
+
+- distinct-on: DISTINCT ON (ticker) ... ORDER BY report_date DESC over income_stmt, the
+  query of the documented examples
+- screen: the /api/screen endpoint through Flask's test client, its response cache
+  cleared before every request
+- cached: the same requests once the response cache is warm
+
+and checks the first two return the same tickers. The seeded rows are deleted
+afterwards unless --keep is given.
+
+Point PG_NEON_FINANCE_URL at a local Postgres, not at the production database, with
+the ticker_natural_keys and statement_latest migrations applied (see run_migrations).
+
+Usage:
+    python -m finance.benchmarks.bench_screen [--tickers N] [--metrics N] [--dates N]
+        [--requests N] [--limit N] [--keep]
+"""
+
+import argparse
+import random
+import time
+
+from sqlalchemy import text
+
+from finance.benchmarks.bench_financial_data import cleanup, make_tickers, seed, time_requests
+from finance.src.statement_snapshots import rebuild_latest
+from finance.src.web.app import SCHEMA, api_cache, app, engine
+
+TABLE = "income_stmt"
+
+
+def distinct_on(metric: str, limit: int) -> list[str]:
+    """Top tickers by latest value of metric, computed from the statement table."""
+    query = text(
+        f"""
+        SELECT ticker FROM (
+            SELECT DISTINCT ON (ticker) ticker, value
+            FROM {SCHEMA}.{TABLE}
+            WHERE metric = :metric AND frequency = 'annual' AND value IS NOT NULL
+            ORDER BY ticker, report_date DESC
+        ) latest
+        ORDER BY value DESC, ticker
+        LIMIT :limit
+    """
+    )
+    with engine.connect() as conn:
+        return [row[0] for row in conn.execute(query, {"metric": metric, "limit": limit})]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the /api/screen endpoint")
+    parser.add_argument("--tickers", type=int, default=20000, help="Seeded tickers")
+    parser.add_argument("--metrics", type=int, default=10, help="Metrics per ticker and frequency")
+    parser.add_argument("--dates", type=int, default=5, help="Report dates per metric")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=50, help="Tickers per screen")
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows")
+    args = parser.parse_args()
+
+    tickers = make_tickers(args.tickers)
+    cleanup()
+    start = time.perf_counter()
+    rows = seed(tickers, args.metrics, args.dates)
+    print(f"Seeded {rows} rows for {len(tickers)} tickers in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    rebuild_latest(engine, [TABLE])
+    print(f"Rebuilt statement_latest of {TABLE} in {time.perf_counter() - start:.1f}s")
+
+    try:
+        names = [f"annualMetric{i}" for i in range(args.metrics)]
+        metrics = random.Random(1).choices(names, k=args.requests)
+        client = app.test_client()
+
+        def screen(metric: str) -> list[str]:
+            response = client.get(f"/api/screen?table={TABLE}&metric={metric}&limit={args.limit}")
+            return [row["ticker"] for row in response.json["results"]]
+
+        def uncached_screen(metric: str) -> list[str]:
+            api_cache.clear()
+            return screen(metric)
+
+        if distinct_on(metrics[0], args.limit) != uncached_screen(metrics[0]):
+            raise AssertionError("/api/screen returned other tickers than the DISTINCT ON query")
+        # Warm up the pool and the plan cache
+        for metric in metrics[:3]:
+            distinct_on(metric, args.limit)
+            uncached_screen(metric)
+        time_requests("distinct-on", lambda metric: distinct_on(metric, args.limit), metrics)
+        time_requests("screen", uncached_screen, metrics)
+        for metric in metrics:
+            screen(metric)
+        time_requests("cached", screen, metrics)
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Peak-memory benchmark for large SQL reads.
+
+Seeds synthetic statement rows (see bench_financial_data) into the database in
+PG_NEON_FINANCE_URL and reads all of them back from income_stmt in several ways, each
+in a fresh process, reporting wall time and the process's peak RSS above its RSS
+before the read (from /proc, so Linux only):
+
+- read_sql: pd.read_sql of the whole result
+- fetchall: conn.execute(...).all()
+- read_sql_chunks: PostgresInterface.read_sql_chunks, one DataFrame per chunk
+- stream_rows: PostgresInterface.stream_rows, one list of rows per chunk
+
+Each read counts the rows and sums the values, so the chunked reads hold only one
+chunk at a time. The seeded rows are deleted afterwards unless --keep is given.
+
+Point PG_NEON_FINANCE_URL at a local Postgres, not at the production database.
+
+Usage:
+    python -m finance.benchmarks.bench_sql_reads [--tickers N] [--chunk-rows N] [--keep]
+"""
+
+import argparse
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from sqlalchemy import text
+
+from finance.benchmarks.bench_financial_data import PREFIX, cleanup, make_tickers, seed
+from finance.src.postgres_interface import PostgresInterface
+
+QUERY = text(
+    "SELECT ticker, frequency, report_date, metric, value, insert_datetime "
+    f"FROM finance.income_stmt WHERE ticker LIKE '{PREFIX}%'"
+)
+METHODS = ["read_sql", "fetchall", "read_sql_chunks", "stream_rows"]
+
+
+def _status_mb(field: str) -> float:
+    """VmRSS (current) or VmHWM (peak) RSS of this process, from /proc (Linux)."""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise KeyError(field)
+
+
+def _reset_peak_rss() -> None:
+    """Reset VmHWM to the current RSS, so it measures the read only, not the imports."""
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def measure(method: str, chunk_rows: int) -> tuple[int, float, float]:
+    """Rows read, seconds and peak RSS growth (MB) of one read, in a fresh process."""
+    postgres = PostgresInterface()
+    with postgres.get_engine().connect() as conn:
+        conn.execute(text("SELECT 1"))
+    _reset_peak_rss()
+    baseline = _status_mb("VmRSS")
+    start = time.perf_counter()
+    rows, total = 0, 0.0
+    if method == "read_sql":
+        with postgres.get_engine().connect() as conn:
+            df = pd.read_sql(QUERY, conn)
+        rows, total = len(df), df["value"].sum()
+    elif method == "fetchall":
+        with postgres.get_engine().connect() as conn:
+            result = conn.execute(QUERY).all()
+        rows, total = len(result), sum(row.value for row in result)
+    elif method == "read_sql_chunks":
+        for chunk in postgres.read_sql_chunks(QUERY, chunk_rows=chunk_rows):
+            rows, total = rows + len(chunk), total + chunk["value"].sum()
+    else:
+        for chunk in postgres.stream_rows(QUERY, chunk_rows=chunk_rows):
+            rows, total = rows + len(chunk), total + sum(row.value for row in chunk)
+    return rows, time.perf_counter() - start, _status_mb("VmHWM") - baseline
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark peak memory of full vs chunked SQL reads"
+    )
+    parser.add_argument("--tickers", type=int, default=2000, help="Seeded tickers")
+    parser.add_argument("--metrics", type=int, default=30, help="Metrics per ticker and frequency")
+    parser.add_argument("--dates", type=int, default=5, help="Report dates per metric")
+    parser.add_argument("--chunk-rows", type=int, default=10_000)
+    parser.add_argument("--keep", action="store_true", help="Keep the seeded rows")
+    args = parser.parse_args()
+
+    tickers = make_tickers(args.tickers)
+    cleanup()
+    start = time.perf_counter()
+    rows = seed(tickers, args.metrics, args.dates)
+    print(f"Seeded {rows} rows for {len(tickers)} tickers in {time.perf_counter() - start:.1f}s")
+
+    try:
+        context = multiprocessing.get_context("spawn")
+        print(f"{'method':<16} {'rows':>9} {'time':>8} {'peak RSS':>10}")
+        for method in METHODS:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                read, seconds, rss = pool.submit(measure, method, args.chunk_rows).result()
+            print(f"{method:<16} {read:>9} {seconds:7.2f}s {rss:+8.1f}MB")
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    main()
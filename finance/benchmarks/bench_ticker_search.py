@@ -0,0 +1,86 @@
+"""
+Micro-benchmark for the web app's ticker autocomplete index.
+
+Builds a TickerIndex over synthetic tickers and company names and times queries that
+hit the different ranking steps (ticker prefix, name word prefix, substring, no
+match), next to a linear scan doing what the previous UPPER(ticker) LIKE '%q%'
+query did. No network or database access is needed.
+
+Usage:
+    python -m finance.benchmarks.bench_ticker_search [--tickers N] [--repeat N]
+"""
+
+import argparse
+import random
+import string
+import time
+
+from finance.src.web.ticker_search import TickerIndex
+
+NAME_WORDS = [
+    "Apple",
+    "Micro",
+    "Soft",
+    "Global",
+    "Holdings",
+    "Bank",
+    "Energy",
+    "Motors",
+    "Pharma",
+    "Capital",
+    "Resources",
+    "Systems",
+    "Group",
+    "International",
+    "Mining",
+]
+SUFFIXES = ["", "", "", ".L", ".TO", ".HK", "-B"]
+QUERIES = ["A", "AAP", "MSFT", "HOLD", "INTERNA", ".TO", "ERGY", "ZZZZZZ"]
+
+
+def make_rows(n: int, seed: int = 0) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    rows = {}
+    while len(rows) < n:
+        ticker = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5))) + rng.choice(
+            SUFFIXES
+        )
+        rows[ticker] = " ".join(rng.sample(NAME_WORDS, 3)) + rng.choice(
+            [" Inc.", " Corp.", " plc", ""]
+        )
+    rows.update({"AAPL": "Apple Inc.", "MSFT": "Microsoft Corporation"})
+    return list(rows.items())
+
+
+def linear_scan(rows: list[tuple[str, str]], q: str, limit: int = 20) -> list[str]:
+    """The previous search: tickers containing q, alphabetically."""
+    return sorted(ticker for ticker, _ in rows if q in ticker.upper())[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ticker autocomplete index")
+    parser.add_argument("--tickers", type=int, default=106_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    rows = make_rows(args.tickers)
+    start = time.perf_counter()
+    index = TickerIndex(rows)
+    print(f"Built index over {len(index)} tickers in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'query':<10} {'index':>10} {'scan':>10}  top matches")
+    for q in QUERIES:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            matches = index.search(q)
+        index_ms = (time.perf_counter() - start) * 1000 / args.repeat
+        start = time.perf_counter()
+        for _ in range(max(1, args.repeat // 20)):
+            linear_scan(rows, q)
+        scan_ms = (time.perf_counter() - start) * 1000 / max(1, args.repeat // 20)
+        top = ", ".join(m["ticker"] for m in matches[:4])
+        print(f"{q:<10} {index_ms:8.3f}ms {scan_ms:8.2f}ms  {top}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Local stub of the Yahoo Finance endpoints used by the pipeline.
+
+Serves the crumb endpoints and fundamentals-timeseries responses shaped like
+Yahoo's, with configurable latency and a deterministic share of "active"
+tickers, so fetch engines can be benchmarked without touching Yahoo.
+endpoint_ratios optionally limits, per endpoint (keyed by the first requested
+type), the share of active tickers that endpoint has data for. throttle_ratio is
+the share of timeseries requests answered with HTTP 429, error_ratio the share
+answered with HTTP 404 (an error that is not retried), at random.
+Runs an asyncio HTTP/1.1 (keep-alive) server on a background thread.
+
+Usage:
+    with YahooStub(latency=0.05, active_ratio=0.5) as stub:
+        stub.base_url     # replaces stockdex's FUNDAMENTALS_BASE_URL
+        stub.cookie_url
+        stub.crumb_url
+        use_stub(stub.root_url)  # or point this process's Yahoo clients at it
+"""
+
+import asyncio
+import json
+import random
+import threading
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+from stockdex import config as stockdex_config
+
+from finance.src import yahoo_async
+
+CRUMB = "stubcrumb"
+TIMESERIES_PATH = "/ws/fundamentals-timeseries/v1/finance/timeseries"
+REPORT_DATES = ["2020-09-30", "2021-09-30", "2022-09-30", "2023-09-30"]
+
+
+def is_active_ticker(ticker_symbol: str, active_ratio: float) -> bool:
+    """Deterministically decide whether the stub has data for ticker_symbol."""
+    return zlib.crc32(ticker_symbol.encode()) % 1000 < active_ratio * 1000
+
+
+def has_endpoint_data(ticker_symbol: str, first_type: str, ratio: float) -> bool:
+    """Deterministically decide whether an active ticker has data on one endpoint."""
+    return zlib.crc32(f"{ticker_symbol}:{first_type}".encode()) % 1000 < ratio * 1000
+
+
+def use_stub(root_url: str) -> None:
+    """
+    Point this process's Yahoo clients (stockdex's URLs, yahoo_client, yahoo_async) at
+    the stub serving root_url, e.g. in a process the stub was not started in.
+    """
+    stockdex_config.FUNDAMENTALS_BASE_URL = f"{root_url}{TIMESERIES_PATH}"
+    yahoo_async.YAHOO_COOKIE_URL = f"{root_url}/cookie"
+    yahoo_async.YAHOO_CRUMB_URL = f"{root_url}/v1/test/getcrumb"
+
+
+def timeseries_payload(ticker_symbol: str, types: list[str], active: bool) -> dict:
+    """Build a fundamentals-timeseries response for the requested types."""
+    result = []
+    for i, series_type in enumerate(types):
+        item = {"meta": {"symbol": [ticker_symbol], "type": [series_type]}}
+        if active:
+            item[series_type] = [
+                {
+                    "asOfDate": date,
+                    "reportedValue": {"raw": (i + 1) * 1.5e9 + j, "fmt": f"{(i + 1) * 1.5:.2f}B"},
+                }
+                for j, date in enumerate(REPORT_DATES)
+            ]
+        result.append(item)
+    return {"timeseries": {"result": result, "error": None}}
+
+
+class YahooStub:
+    """Background-thread asyncio HTTP server mimicking the Yahoo endpoints."""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        active_ratio: float = 0.5,
+        host: str = "127.0.0.1",
+        endpoint_ratios: dict[str, float] | None = None,
+        throttle_ratio: float = 0.0,
+        error_ratio: float = 0.0,
+    ):
+        self.latency = latency
+        self.active_ratio = active_ratio
+        self.endpoint_ratios = endpoint_ratios or {}
+        self.throttle_ratio = throttle_ratio
+        self.throttled = 0
+        self.error_ratio = error_ratio
+        self.errors = 0
+        self.host = host
+        self.port: int | None = None
+        self.requests = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._server: asyncio.base_events.Server | None = None
+        self._thread: threading.Thread | None = None
+        self._ready = threading.Event()
+
+    @property
+    def root_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.root_url}{TIMESERIES_PATH}"
+
+    @property
+    def cookie_url(self) -> str:
+        return f"{self.root_url}/cookie"
+
+    @property
+    def crumb_url(self) -> str:
+        return f"{self.root_url}/v1/test/getcrumb"
+
+    def respond(self, path: str) -> tuple[int, str, bytes]:
+        """Return (status, content type, body) for a request path."""
+        parts = urlsplit(path)
+        if parts.path == "/cookie":
+            return 200, "text/plain", b""
+        if parts.path == "/v1/test/getcrumb":
+            return 200, "text/plain", CRUMB.encode()
+        if "/timeseries/" in parts.path:
+            if self.throttle_ratio and random.random() < self.throttle_ratio:
+                self.throttled += 1
+                return 429, "text/plain", b"Too Many Requests"
+            if self.error_ratio and random.random() < self.error_ratio:
+                self.errors += 1
+                return 404, "text/plain", b"Not Found"
+            query = parse_qs(parts.query)
+            ticker_symbol = query.get("symbol", [""])[0]
+            types = [t for t in query.get("type", [""])[0].split(",") if t]
+            active = is_active_ticker(ticker_symbol, self.active_ratio)
+            if active and types and types[0] in self.endpoint_ratios:
+                active = has_endpoint_data(ticker_symbol, types[0], self.endpoint_ratios[types[0]])
+            body = json.dumps(timeseries_payload(ticker_symbol, types, active)).encode()
+            return 200, "application/json", body
+        return 404, "text/plain", b"not found"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                self.requests += 1
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                _, path, _ = request_line.decode("latin-1").split(" ", 2)
+                status, content_type, body = self.respond(path)
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Connection: keep-alive\r\n\r\n".encode("latin-1") + body
+                )
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    def _serve(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._server = self._loop.run_until_complete(
+            asyncio.start_server(self._handle, self.host, 0, backlog=4096)
+        )
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        # Close the keep-alive connections still being served
+        tasks = asyncio.all_tasks(self._loop)
+        for task in tasks:
+            task.cancel()
+        self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+        self._server.close()
+        self._loop.run_until_complete(self._server.wait_closed())
+        self._loop.close()
+
+    def start(self) -> "YahooStub":
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+
+    def __enter__(self) -> "YahooStub":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -6,25 +6,56 @@ using stockdex, and manages the active_tickers table accordingly.
 
 Modes:
 - single: ThreadPoolExecutor for concurrent HTTP calls within one process
-- distributed: ProcessPoolExecutor across CPU cores, each with thread pools
+- distributed: one long-lived ProcessPoolExecutor across CPU cores, each worker
+  with a thread pool, fed continuously and streaming results to the upserter
+- async: one asyncio event loop with a shared async HTTP client (see yahoo_async)
 """
 
-import os
+import asyncio
+import glob
+import io
 import logging
+import os
 import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from itertools import islice
 
 import pandas as pd
 from sqlalchemy import text
-from stockdex import Ticker
 
-from finance.src.postgres_interface import PostgresInterface
+from config import (
+    ACTIVE_TICKERS_ASYNC_CONCURRENCY,
+    ACTIVE_TICKERS_PROBE,
+    ACTIVE_TICKERS_RECHECK_DAYS,
+    CACHE_DIR,
+    METRICS_DIR,
+    METRICS_ENABLED,
+    RUN_STATE_ENABLED,
+)
+from finance.src.liveness_probe import ProbeStats, distinct_methods, probe_ticker
+from finance.src.postgres_interface import PostgresInterface, stream_rows
+from finance.src.rate_limiter import is_throttle_error, log_limiter_summaries
+from finance.src.response_cache import log_response_cache_summary
+from finance.src.run_metrics import current, start_run
+from finance.src.run_state import RunState
+from finance.src.yahoo_async import AsyncYahooProbe, take
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
 TICKERS_FILE = os.path.join(os.path.dirname(__file__), "data", "tickers_list.xlsx")
+# Columns of the tickers file stored in active_tickers
+UNIVERSE_COLUMNS = ["ticker", "name", "exchange", "category_name", "country"]
+# Version of the Feather copy of the tickers file; bumped when load_ticker_universe
+# changes what it stores (v2: upper-case tickers), so older copies are re-parsed
+UNIVERSE_CACHE_VERSION = 2
 BATCH_SIZE = 100
 SCHEMA = "finance"
 MAX_THREADS = 20  # concurrent HTTP requests per process
@@ -38,42 +69,55 @@ YAHOO_METHODS = [
 ]
 
 
-def _check_single_ticker(ticker_symbol: str) -> bool:
+def _check_single_ticker(
+    ticker_symbol: str,
+    exchange: str | None = None,
+    probe: str = ACTIVE_TICKERS_PROBE,
+    stats: ProbeStats | None = None,
+) -> bool:
     """
     Standalone function (picklable for multiprocessing).
-    Returns True if at least one Yahoo endpoint returns data.
+    Returns True if at least one Yahoo endpoint returns data, trying endpoints in the
+    order stats has learned for exchange (see liveness_probe). Raises ThrottledError
+    if Yahoo throttled the probes, so the ticker is not marked inactive.
     """
-    try:
-        t = Ticker(ticker_symbol)
-    except Exception:
-        return False
-
-    for method in YAHOO_METHODS:
-        try:
-            result = getattr(t, method)()
-            if result is not None and not result.empty:
-                return True
-        except Exception:
-            continue
-    return False
-
-
-def _check_batch_distributed(ticker_rows: list[dict]) -> list[dict]:
+    if stats is None:
+        stats = ProbeStats(distinct_methods(YAHOO_METHODS))
+    with current().timer("probe", ticker_symbol):
+        return probe_ticker(ticker_symbol, stats, exchange, probe)
+
+
+def _check_batch_distributed(
+    ticker_rows: list[dict],
+    probe: str = ACTIVE_TICKERS_PROBE,
+    prior: dict | None = None,
+    metrics: bool = False,
+) -> tuple[list[dict], dict, dict | None]:
     """
     Process a batch of ticker rows in a subprocess with threaded HTTP calls.
-    Used by distributed mode.
+    Used by distributed mode. prior is the parent's ProbeStats snapshot, used for
+    endpoint ordering; the stats recorded here are returned with the rows, and so are
+    the run metrics if metrics is set.
     """
+    stats = ProbeStats(distinct_methods(YAHOO_METHODS), prior=prior)
+    run_metrics = start_run("active_tickers", metrics)
     with ThreadPoolExecutor(max_workers=MAX_THREADS) as executor:
         futures = {
-            executor.submit(_check_single_ticker, row["ticker"]): row
+            executor.submit(
+                _check_single_ticker, row["ticker"], row.get("exchange"), probe, stats
+            ): row
             for row in ticker_rows
         }
         results = []
         for future in as_completed(futures):
             row = futures[future]
-            row["is_active"] = future.result()
+            try:
+                row["is_active"] = future.result()
+            except Exception as e:
+                row["is_active"] = None if is_throttle_error(e) else False
+                row["error"] = repr(e)
             results.append(row)
-    return results
+    return results, stats.snapshot(), run_metrics.snapshot()
 
 
 class ETLJob:
@@ -86,6 +130,7 @@ class ETLJob:
     Modes:
     - 'single': One process, multiple threads (good for CI / small machines)
     - 'distributed': Multiple processes × multiple threads (max throughput)
+    - 'async': One process, one event loop, up to max_concurrency tickers in flight
     """
 
     def __init__(
@@ -95,13 +140,29 @@ class ETLJob:
         batch_size: int = BATCH_SIZE,
         mode: str = "single",
         max_threads: int = MAX_THREADS,
+        max_concurrency: int = ACTIVE_TICKERS_ASYNC_CONCURRENCY,
+        probe: str = ACTIVE_TICKERS_PROBE,
+        recheck_days: int | None = ACTIVE_TICKERS_RECHECK_DAYS,
+        run_state: bool = RUN_STATE_ENABLED,
+        resume: bool = True,
+        metrics: bool = METRICS_ENABLED,
+        metrics_dir: str = METRICS_DIR,
     ):
         self.postgres_interface = postgres_interface or PostgresInterface()
         self.engine = self.postgres_interface.get_engine()
         self.tickers_file = tickers_file
         self.batch_size = batch_size
-        self.mode = mode  # 'single' or 'distributed'
+        self.mode = mode  # 'single', 'distributed' or 'async'
         self.max_threads = max_threads
+        self.max_concurrency = max_concurrency
+        self.probe = probe  # 'light' or 'full' (single/distributed modes)
+        self.probe_stats = ProbeStats(distinct_methods(YAHOO_METHODS))
+        self.recheck_days = recheck_days  # None: only check tickers not yet in the table
+        self.run_state = run_state  # record per-ticker outcomes and resume interrupted runs
+        self.resume = resume
+        self.state: RunState | None = None
+        self.metrics = metrics  # per-stage timings and request outcomes (see run_metrics)
+        self.metrics_dir = metrics_dir
 
     def read_tickers_from_excel(self) -> pd.DataFrame:
         """Read tickers from the Excel file."""
@@ -110,19 +171,130 @@ class ETLJob:
         logger.info(f"Read {len(df)} tickers from {self.tickers_file}")
         return df
 
+    def _universe_cache_path(self) -> str:
+        """Feather copy of the tickers file, keyed by the file's name, mtime and size."""
+        stat = os.stat(self.tickers_file)
+        base = os.path.splitext(os.path.basename(self.tickers_file))[0]
+        return os.path.join(
+            CACHE_DIR,
+            f"{base}-v{UNIVERSE_CACHE_VERSION}-{stat.st_mtime_ns}-{stat.st_size}.feather",
+        )
+
+    def load_ticker_universe(self) -> pd.DataFrame:
+        """
+        All tickers of the tickers file (UNIVERSE_COLUMNS, one row per ticker).
+        The Excel file is parsed only when it changed; otherwise the columnar
+        (Feather) copy written on the previous parse is read.
+        """
+        cache_path = self._universe_cache_path()
+        if os.path.exists(cache_path):
+            df = pd.read_feather(cache_path)
+            logger.info(f"Read {len(df)} tickers from {cache_path}")
+            return df
+
+        df = self.read_tickers_from_excel()
+        for column in UNIVERSE_COLUMNS:
+            if column not in df.columns:
+                df[column] = None
+        df = df[UNIVERSE_COLUMNS].astype("string")
+        # Tickers are stored upper-case everywhere, so lookups can use plain indexes on ticker
+        # and the anti-join against active_tickers matches (rows written before are
+        # upper-cased by the ticker_natural_keys migration, see ticker_keys)
+        df["ticker"] = df["ticker"].str.strip().str.upper()
+        df = df.dropna(subset=["ticker"]).drop_duplicates("ticker").reset_index(drop=True)
+
+        # Replace copies of older versions of the file
+        base = os.path.splitext(os.path.basename(self.tickers_file))[0]
+        for stale in glob.glob(os.path.join(CACHE_DIR, f"{base}-*.feather")):
+            os.remove(stale)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_feather(cache_path)
+        return df
+
+    def select_tickers_to_check(
+        self, universe: pd.DataFrame, limit: int | None = None
+    ) -> list[dict]:
+        """
+        Tickers of the universe to check this run, selected in Postgres with an anti-join
+        against active_tickers: tickers not in the table first, then (if recheck_days is
+        set) tickers whose row is older than recheck_days, oldest first.
+        """
+        buffer = io.StringIO()
+        universe[UNIVERSE_COLUMNS].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+
+        query = text(
+            f"""
+            SELECT u.ticker, u.name, u.exchange, u.category_name, u.country,
+                   a.upsert_datetime AS last_checked
+            FROM ticker_universe u
+            LEFT JOIN {SCHEMA}.active_tickers a ON a.ticker = u.ticker
+            WHERE a.ticker IS NULL
+               OR (CAST(:recheck_days AS integer) IS NOT NULL
+                   AND a.upsert_datetime
+                       < NOW() - make_interval(days => CAST(:recheck_days AS integer)))
+            ORDER BY a.upsert_datetime ASC NULLS FIRST, u.ticker
+            LIMIT :limit
+        """
+        )
+
+        with self.engine.begin() as conn, current().timer("priority_query"):
+            conn.execute(
+                text(
+                    """
+                CREATE TEMP TABLE ticker_universe (
+                    ticker text PRIMARY KEY,
+                    name text,
+                    exchange text,
+                    category_name text,
+                    country text
+                ) ON COMMIT DROP
+            """
+                )
+            )
+            cursor = conn.connection.cursor()
+            try:
+                columns = ", ".join(UNIVERSE_COLUMNS)
+                cursor.copy_expert(
+                    f"COPY ticker_universe ({columns}) FROM STDIN WITH (FORMAT csv)", buffer
+                )
+            finally:
+                cursor.close()
+            conn.execute(text("ANALYZE ticker_universe"))
+            params = {"recheck_days": self.recheck_days, "limit": limit}
+            rows = [
+                dict(row._mapping) for chunk in stream_rows(conn, query, params) for row in chunk
+            ]
+
+        new = sum(1 for row in rows if row["last_checked"] is None)
+        logger.info(
+            f"Universe: {len(universe)} tickers | selected {new} new, {len(rows) - new} due for "
+            f"recheck (older than {self.recheck_days} days)"
+            if self.recheck_days is not None
+            else f"Universe: {len(universe)} tickers | selected {new} new (rechecks disabled)"
+        )
+        return rows
+
     def _check_batch_single(self, ticker_rows: list[dict]) -> list[dict]:
         """Check a batch using ThreadPoolExecutor (single mode) with per-ticker timeout."""
         with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
             futures = {
-                executor.submit(_check_single_ticker, row["ticker"]): row
+                executor.submit(
+                    _check_single_ticker,
+                    row["ticker"],
+                    row.get("exchange"),
+                    self.probe,
+                    self.probe_stats,
+                ): row
                 for row in ticker_rows
             }
             for future in as_completed(futures):
                 row = futures[future]
                 try:
                     row["is_active"] = future.result(timeout=TICKER_TIMEOUT)
-                except Exception:
-                    row["is_active"] = False
+                except Exception as e:
+                    row["is_active"] = None if is_throttle_error(e) else False
+                    row["error"] = repr(e)
         return ticker_rows
 
     def upsert_active_tickers_batch(self, records: list[dict]) -> None:
@@ -133,9 +305,12 @@ class ETLJob:
         if not records:
             return
 
-        upsert_sql = text(f"""
-            INSERT INTO {SCHEMA}.active_tickers (ticker, name, exchange, category_name, country, is_active, upsert_datetime)
-            VALUES (:ticker, :name, :exchange, :category_name, :country, :is_active, :upsert_datetime)
+        upsert_sql = text(
+            f"""
+            INSERT INTO {SCHEMA}.active_tickers
+                (ticker, name, exchange, category_name, country, is_active, upsert_datetime)
+            VALUES
+                (:ticker, :name, :exchange, :category_name, :country, :is_active, :upsert_datetime)
             ON CONFLICT (ticker) DO UPDATE SET
                 name = EXCLUDED.name,
                 exchange = EXCLUDED.exchange,
@@ -143,7 +318,8 @@ class ETLJob:
                 country = EXCLUDED.country,
                 is_active = EXCLUDED.is_active,
                 upsert_datetime = EXCLUDED.upsert_datetime
-        """)
+        """
+        )
 
         now = datetime.utcnow()
         db_records = [
@@ -159,95 +335,249 @@ class ETLJob:
             for r in records
         ]
 
-        with self.engine.begin() as conn:
+        with self.engine.begin() as conn, current().timer("upsert"):
             conn.execute(upsert_sql, db_records)
 
     def run_active_tickers_check(self, max_batches: int | None = None) -> None:
         """
-        Main method: reads tickers, skips already-checked ones, checks in parallel,
-        and upserts results.
+        Main method: loads the ticker universe, selects new tickers and those due for a
+        recheck, checks them in parallel, and upserts results.
 
         Parameters
         ----------
         max_batches : int | None
             If set, stop after this many batches.
         """
-        df = self.read_tickers_from_excel()
-
-        # Skip tickers already in the active_tickers table
-        with self.engine.connect() as conn:
-            existing = pd.read_sql(
-                text(f"SELECT ticker FROM {SCHEMA}.active_tickers"), conn
-            )
-        existing_set = set(existing["ticker"].str.upper()) if not existing.empty else set()
-        before = len(df)
-        df = df[~df["ticker"].str.upper().isin(existing_set)].reset_index(drop=True)
-        logger.info(f"Skipped {before - len(df)} already in DB, {len(df)} remaining")
-
-        total_tickers = len(df)
+        metrics = start_run("active_tickers", self.metrics)
+        universe = self.load_ticker_universe()
+        limit = max_batches * self.batch_size if max_batches else None
+        if self.run_state:
+            all_rows = self._start_run_state(universe, limit)
+        else:
+            all_rows = self.select_tickers_to_check(universe, limit=limit)
+
+        total_tickers = len(all_rows)
         if total_tickers == 0:
-            logger.info("No new tickers to check.")
+            logger.info("No tickers to check.")
+            if self.state is not None:
+                self.state.finish()
+            metrics.write(self.metrics_dir)
             return
 
-        # Convert to list of dicts for parallel processing
-        all_rows = df.to_dict("records")
         total_batches = (total_tickers + self.batch_size - 1) // self.batch_size
         logger.info(
             f"Mode: {self.mode} | threads={self.max_threads} | "
+            f"{f'concurrency={self.max_concurrency} | ' if self.mode == 'async' else ''}"
+            f"{f'probe={self.probe} | ' if self.mode != 'async' else ''}"
             f"{total_tickers} tickers, batch_size={self.batch_size}, ~{total_batches} batches"
         )
 
-        batches_done = 0
-        total_active = 0
-        total_inactive = 0
+        # Async mode keeps one event loop and HTTP session for the whole run. They are
+        # set up inside the try so a failed crumb fetch still closes them and finishes
+        # the run state and metrics.
+        loop = probe = None
+        completed = False
+        totals = None
+        try:
+            if self.mode == "async":
+                loop = asyncio.new_event_loop()
+                probe = AsyncYahooProbe(
+                    self.probe_stats.methods,
+                    max_concurrency=self.max_concurrency,
+                    attempt_timeout=TICKER_TIMEOUT,
+                    stats=self.probe_stats,
+                )
+                loop.run_until_complete(probe.open())
+            totals = self._run_batches(all_rows, total_batches, max_batches, loop, probe)
+            completed = True
+        finally:
+            if loop is not None:
+                if probe is not None:
+                    loop.run_until_complete(probe.close())
+                loop.close()
+            if self.state is not None:
+                self.state.finish(completed)
+            metrics.write(self.metrics_dir, totals, completed)
+        self.probe_stats.log_summary()
+        log_limiter_summaries()
+        log_response_cache_summary()
+
+    def _start_run_state(self, universe: pd.DataFrame, limit: int | None) -> list[dict]:
+        """
+        Start the run state and return the ticker rows to check: the remaining tickers
+        of an interrupted run (looked up in universe), or a fresh selection.
+        """
+        self.state = RunState(self.engine, "active_tickers")
+        selected = {}
 
-        for i in range(0, total_tickers, self.batch_size):
-            batch_start = time.time()
-            batch_rows = all_rows[i : i + self.batch_size]
-
-            if self.mode == "distributed":
-                # Split batch across processes
-                num_workers = min(os.cpu_count() or 4, 4)
-                chunk_size = max(1, len(batch_rows) // num_workers)
-                chunks = [
-                    batch_rows[j : j + chunk_size]
-                    for j in range(0, len(batch_rows), chunk_size)
-                ]
-                results = []
-                with ProcessPoolExecutor(max_workers=num_workers) as proc_executor:
-                    futures = [
-                        proc_executor.submit(_check_batch_distributed, chunk)
-                        for chunk in chunks
-                    ]
-                    for f in as_completed(futures):
-                        results.extend(f.result())
+        def select() -> list[str]:
+            selected.update(
+                (row["ticker"], row) for row in self.select_tickers_to_check(universe, limit=limit)
+            )
+            return list(selected)
+
+        tickers = self.state.start(select, resume=self.resume)
+        if not self.state.resumed:
+            return [selected[ticker] for ticker in tickers]
+        # Tickers dropped from the tickers file since the run started are skipped
+        rows = (
+            universe[UNIVERSE_COLUMNS]
+            .set_index("ticker", drop=False)
+            .reindex(tickers)
+            .dropna(subset=["ticker"])
+        )
+        return [
+            {**row, "last_checked": None}
+            for row in rows.astype(object).where(rows.notna(), None).to_dict("records")
+        ]
+
+    def _record_results(self, results: list[dict]) -> None:
+        """Record checked rows in the run state and write it (after their upsert)."""
+        for row in results:
+            if row["is_active"] is None:
+                status = "throttled"
+            elif row.get("error"):
+                status = "error"
             else:
-                # Single mode: threaded within this process
-                results = self._check_batch_single(batch_rows)
+                status = "done" if row["is_active"] else "no_data"
+            self.state.record(row["ticker"], status, row.get("error"))
+        self.state.flush()
 
-            # Upsert results
-            self.upsert_active_tickers_batch(results)
+    def _iter_checked_batches(
+        self,
+        all_rows: list[dict],
+        loop: asyncio.AbstractEventLoop | None = None,
+        probe: AsyncYahooProbe | None = None,
+    ):
+        """Yield checked rows in batches of batch_size, using the configured mode."""
+        if self.mode == "distributed":
+            yield from self._iter_distributed_batches(all_rows)
+            return
+        if self.mode == "async":
+            yield from self._iter_async_batches(all_rows, loop, probe)
+            return
+
+        for start in range(0, len(all_rows), self.batch_size):
+            # Single mode: threaded within this process
+            end = start + self.batch_size
+            yield self._check_batch_single(all_rows[start:end])
+
+    def _iter_async_batches(
+        self, all_rows: list[dict], loop: asyncio.AbstractEventLoop, probe: AsyncYahooProbe
+    ):
+        """
+        Async mode: up to max_concurrency checks run at once across all_rows (see
+        AsyncYahooProbe.check_rows), not per batch, and checked rows are yielded in
+        batches of batch_size in the order they finish. The event loop runs while a
+        batch is collected; checks in flight resume once the caller has upserted it.
+        """
+        checked = probe.check_rows(all_rows)
+        try:
+            while batch := loop.run_until_complete(take(checked, self.batch_size)):
+                yield batch
+        finally:
+            loop.run_until_complete(checked.aclose())
+
+    def _iter_distributed_batches(self, all_rows: list[dict]):
+        """
+        Distributed mode: one process pool lives for the whole run. Tickers are fed to
+        it in small chunks with a bounded number of chunks in flight, and checked rows
+        are yielded in batches of batch_size as chunks complete. While the caller
+        upserts a batch, the workers keep checking the chunks already queued.
+        """
+        num_workers = min(os.cpu_count() or 4, 4)
+        chunk_size = max(1, min(self.max_threads, self.batch_size))
+        max_in_flight = num_workers * 2
+        unsubmitted = iter(all_rows)
+        chunks = iter(lambda: list(islice(unsubmitted, chunk_size)), [])
+
+        executor = ProcessPoolExecutor(max_workers=num_workers)
+
+        def submit(chunk: list[dict]):
+            # Each chunk carries the stats gathered so far, so workers order endpoints too
+            return executor.submit(
+                _check_batch_distributed,
+                chunk,
+                self.probe,
+                self.probe_stats.snapshot(),
+                self.metrics,
+            )
+
+        try:
+            in_flight = {submit(chunk) for chunk in islice(chunks, max_in_flight)}
+            results = []
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    rows, stats, metrics = future.result()
+                    results.extend(rows)
+                    self.probe_stats.merge(stats)
+                    current().merge(metrics)
+                    for chunk in islice(chunks, 1):
+                        in_flight.add(submit(chunk))
+                size = self.batch_size
+                while len(results) >= size or (results and not in_flight):
+                    yield results[:size]
+                    results = results[size:]
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run_batches(
+        self,
+        all_rows: list[dict],
+        total_batches: int,
+        max_batches: int | None,
+        loop: asyncio.AbstractEventLoop | None = None,
+        probe: AsyncYahooProbe | None = None,
+    ) -> dict:
+        """
+        Check and upsert all_rows batch by batch with the configured mode. Returns the run
+        totals.
+        """
+        total_tickers = len(all_rows)
+        batches_done = 0
+        tickers_done = 0
+        total_active = 0
+        total_inactive = 0
+        total_throttled = 0
+
+        batch_start = time.time()
+        batches = self._iter_checked_batches(all_rows, loop, probe)
+        for results in batches:
+            # Throttled tickers (is_active None) are not written, so the next run rechecks them
+            checked = [r for r in results if r["is_active"] is not None]
+            self.upsert_active_tickers_batch(checked)
+            if self.state is not None:
+                self._record_results(results)
             batches_done += 1
+            tickers_done += len(results)
 
-            batch_active = sum(1 for r in results if r["is_active"])
-            batch_inactive = len(results) - batch_active
+            batch_active = sum(1 for r in checked if r["is_active"])
+            batch_inactive = len(checked) - batch_active
+            batch_throttled = len(results) - len(checked)
             total_active += batch_active
             total_inactive += batch_inactive
+            total_throttled += batch_throttled
             elapsed = time.time() - batch_start
+            current().observe("batch", elapsed)
 
             logger.info(
                 f"Batch {batches_done}/{total_batches} | "
-                f"{batch_active} active, {batch_inactive} inactive | "
+                f"{batch_active} active, {batch_inactive} inactive, {batch_throttled} throttled | "
                 f"{elapsed:.1f}s | "
-                f"Progress: {min(i + self.batch_size, total_tickers)}/{total_tickers} "
-                f"({min(i + self.batch_size, total_tickers) / total_tickers * 100:.1f}%)"
+                f"Progress: {tickers_done}/{total_tickers} "
+                f"({tickers_done / total_tickers * 100:.1f}%)"
             )
 
             if max_batches and batches_done >= max_batches:
                 logger.info(f"Reached max_batches={max_batches}, stopping.")
+                batches.close()
                 break
+            batch_start = time.time()
 
         logger.info(
             f"Complete | Total: {total_active + total_inactive}, "
-            f"Active: {total_active}, Inactive: {total_inactive}"
+            f"Active: {total_active}, Inactive: {total_inactive}, "
+            f"Throttled (not written): {total_throttled}"
         )
+        return {"active": total_active, "inactive": total_inactive, "throttled": total_throttled}
@@ -0,0 +1,209 @@
+"""
+Streaming fetch -> transform -> load pipeline for the financial data ETL.
+
+In batch mode a batch is fetched, then melted, then written, so Yahoo sits idle while
+Postgres writes and the other way around. StagePipeline runs the stages concurrently:
+fetch threads, one transform thread and the loader (the calling thread), connected by
+bounded queues. The loader writes what has accumulated once it reaches a row count or
+has waited long enough. When Postgres is slower than Yahoo the queues fill up and the
+fetch threads block (back-pressure) instead of buffering the run in memory.
+
+Used by FinancialDataETL and MultiTableFinancialETL with --pipeline.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Iterable, Iterator
+
+from config import ETL_FLUSH_ROWS, ETL_FLUSH_SECONDS, ETL_PIPELINE_QUEUE_SIZE
+from finance.src.rate_limiter import ThrottledError
+from finance.src.run_state import RunState
+
+logger = logging.getLogger(__name__)
+
+# End-of-stream marker put on a queue by each producer when it finishes
+_DONE = object()
+
+
+class StagePipeline:
+    """
+    Three-stage pipeline over a list of tickers.
+
+    fetch(ticker) returns the raw data or None (no data) and may raise ThrottledError;
+    transform(ticker, raw) returns a result or None; load(results) writes a list of
+    results; size(result) is its row count, used for the flush threshold. If state is
+    given, every ticker's outcome is recorded in it and it is flushed after each load.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable,
+        transform: Callable,
+        load: Callable[[list], None],
+        size: Callable[[object], int],
+        max_threads: int,
+        queue_size: int = ETL_PIPELINE_QUEUE_SIZE,
+        flush_rows: int = ETL_FLUSH_ROWS,
+        flush_seconds: float = ETL_FLUSH_SECONDS,
+        state: RunState | None = None,
+    ):
+        self.fetch = fetch
+        self.transform = transform
+        self.load = load
+        self.size = size
+        self.max_threads = max(1, max_threads)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.state = state
+        self.counts = {"fetched": 0, "with_data": 0, "throttled": 0, "flushes": 0}
+        self._raw: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._results: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._error: Exception | None = None
+
+    def queue_depths(self) -> str:
+        """Items waiting between stages, e.g. for flush log lines ('fetched 3, melted 0')."""
+        return f"fetched {self._raw.qsize()}, melted {self._results.qsize()}"
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.counts[key] += 1
+
+    def _record(self, ticker: str, status: str, error: str | None = None) -> None:
+        if self.state is not None:
+            self.state.record(ticker, status, error)
+
+    def _put(self, q: queue.Queue, item) -> None:
+        """Blocking put that gives up once the pipeline is stopped."""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, q: queue.Queue):
+        """Blocking get that returns _DONE once the pipeline is stopped."""
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fetch_worker(self, tickers: Iterator[str]) -> None:
+        try:
+            while not self._stop.is_set():
+                # tickers may be a generator that claims work from the database
+                with self._lock:
+                    try:
+                        ticker = next(tickers, None)
+                    except Exception as e:
+                        self._error = e
+                        self._stop.set()
+                        return
+                if ticker is None:
+                    return
+                try:
+                    raw = self.fetch(ticker)
+                except ThrottledError as e:
+                    self._count("throttled")
+                    self._record(ticker, "throttled", str(e))
+                    continue
+                except Exception as e:
+                    logger.debug(f"Failed to fetch {ticker}: {e}")
+                    self._count("fetched")
+                    self._record(ticker, "error", repr(e))
+                    continue
+                self._count("fetched")
+                if raw is None:
+                    self._record(ticker, "no_data")
+                else:
+                    self._put(self._raw, (ticker, raw))
+        finally:
+            self._put(self._raw, _DONE)
+
+    def _transform_worker(self) -> None:
+        try:
+            finished = 0
+            while finished < self.max_threads:
+                item = self._get(self._raw)
+                if item is _DONE:
+                    finished += 1
+                    continue
+                ticker, raw = item
+                try:
+                    result = self.transform(ticker, raw)
+                except Exception as e:
+                    logger.debug(f"Failed to transform data for {ticker}: {e}")
+                    self._record(ticker, "error", repr(e))
+                    continue
+                if result is None:
+                    self._record(ticker, "no_data")
+                else:
+                    self._count("with_data")
+                    self._put(self._results, (ticker, result))
+        finally:
+            self._put(self._results, _DONE)
+
+    def _load(self, pending: list[tuple[str, object]]) -> None:
+        """Write the accumulated (ticker, result) pairs and record the tickers as done."""
+        self.load([result for _, result in pending])
+        self.counts["flushes"] += 1
+        if self.state is not None:
+            for ticker, _ in pending:
+                self.state.record(ticker, "done")
+            self.state.flush()
+
+    def run(self, tickers: Iterable[str]) -> dict:
+        """
+        Process tickers through all stages and return the counts (tickers fetched, with
+        data and throttled, number of flushes). tickers is consumed lazily by the fetch
+        threads. Exceptions from load or from iterating tickers stop the pipeline and
+        propagate.
+        """
+        tickers = iter(tickers)
+        threads = [
+            threading.Thread(target=self._fetch_worker, args=(tickers,), daemon=True)
+            for _ in range(self.max_threads)
+        ]
+        threads.append(threading.Thread(target=self._transform_worker, daemon=True))
+        for thread in threads:
+            thread.start()
+
+        pending, pending_rows = [], 0
+        flushed_at = time.monotonic()
+        try:
+            while True:
+                # Wakes up at least every 0.1s to notice a failed stage, whose end-of-stream
+                # marker is dropped once the pipeline is stopped
+                timeout = max(0.0, self.flush_seconds - (time.monotonic() - flushed_at))
+                try:
+                    item = self._results.get(timeout=min(timeout, 0.1))
+                except queue.Empty:
+                    item = None
+                if item is _DONE or self._stop.is_set():
+                    break
+                if item is not None:
+                    pending.append(item)
+                    pending_rows += self.size(item[1])
+                due = time.monotonic() - flushed_at >= self.flush_seconds
+                if pending and (pending_rows >= self.flush_rows or due):
+                    self._load(pending)
+                    pending, pending_rows = [], 0
+                    flushed_at = time.monotonic()
+                elif due:
+                    # Nothing to write yet; restart the timer instead of spinning
+                    flushed_at = time.monotonic()
+            if self._error is not None:
+                raise self._error
+            if pending:
+                self._load(pending)
+        finally:
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        return self.counts
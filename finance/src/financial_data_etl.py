@@ -3,265 +3,861 @@ Financial data ETL job module.
 
 Fetches financial statement data (income_stmt, cash_flow, balance_sheet, financials)
 from Yahoo Finance via stockdex for active tickers and upserts into Postgres.
+Requests go through the shared adaptive rate limiter (see rate_limiter); tickers
+that stay throttled are skipped and picked up again by a later run.
 
 Prioritization:
 1. Tickers NOT yet present in the target table (new tickers first)
-2. Tickers with the oldest insert_datetime (stale data refreshed)
+2. Tickers with the oldest last load (stale data refreshed)
+The prioritized work queue is read once per run. Once their migrations are applied,
+the last load per (table, ticker, frequency) is kept in the statement_freshness table,
+which the work queue is then read from, and the latest non-null value per (table,
+ticker, frequency, metric) in the statement_latest table, both updated in the same
+transaction as every upsert (see statement_snapshots).
+
+Melted rows carry ticker, frequency and metric as categoricals. Tables migrated to
+dictionary-encoded storage (see statement_encoding) are written with integer ids.
 """
 
+import io
 import logging
 import time
-from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from itertools import chain
+from typing import Iterable
 
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 from sqlalchemy import text
-from stockdex import Ticker
 
-from config import SCHEMA, ETL_BATCH_SIZE, ETL_THREADS, FINANCIAL_TABLES
-from finance.src.postgres_interface import PostgresInterface
+from config import (
+    ETL_BATCH_SIZE,
+    ETL_LOAD_METHOD,
+    ETL_PIPELINE,
+    ETL_SHARDED,
+    ETL_THREADS,
+    FINANCIAL_TABLES,
+    METRICS_DIR,
+    METRICS_ENABLED,
+    RUN_STATE_ENABLED,
+    SCHEMA,
+)
+from finance.src.etl_pipeline import StagePipeline
+from finance.src.postgres_interface import PostgresInterface, stream_rows
+from finance.src.rate_limiter import ThrottledError, log_limiter_summaries
+from finance.src.response_cache import log_response_cache_summary
+from finance.src.run_metrics import current, start_run
+from finance.src.run_state import RunState
+from finance.src.schema_migrations import require_migration
+from finance.src.statement_encoding import (
+    FREQUENCY_IDS,
+    StatementLayout,
+    encode_frame,
+    statement_layout,
+)
+from finance.src.statement_snapshots import last_load_sql, update_freshness, update_latest
+from finance.src.ticker_keys import TICKER_KEYS_MIGRATION
+from finance.src.work_leases import UNLEASED_FILTER, claimed_batches, finish_leases, new_worker_id
+from finance.src.yahoo_client import fetch_statement
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+# Suffix multipliers used by stockdex's human-readable ("fmt") values
+SUFFIX_MULTIPLIERS = {"T": 1e12, "B": 1e9, "M": 1e6, "K": 1e3}
+
+# Columns written to the financial statement tables, in order
+LOAD_COLUMNS = ["ticker", "frequency", "report_date", "metric", "value", "insert_datetime"]
+# Natural key of a financial statement row (used by incremental upserts)
+NATURAL_KEY = ["ticker", "frequency", "report_date", "metric"]
+# Categorical columns of melted rows
+CATEGORICAL_COLUMNS = ["ticker", "frequency", "metric"]
+FREQUENCY_DTYPE = pd.CategoricalDtype(list(FREQUENCY_IDS))
+
 
 def _fetch_financial_data(ticker_symbol: str, stockdex_method: str) -> pd.DataFrame | None:
     """
-    Fetch financial data for a single ticker using the specified stockdex method.
-    Returns a melted (long-format) DataFrame or None on failure.
+    Fetch financial data for a single ticker as stockdex_method would (rate-limited,
+    see yahoo_client). Returns the wide DataFrame or None if there is no data.
+    Raises ThrottledError if Yahoo throttled every attempt; other errors propagate so
+    the run state can record them.
     """
+    df = fetch_statement(ticker_symbol, stockdex_method)
+    if df is None or df.empty:
+        return None
+    return df
+
+
+def _fetch_all_financial_data(
+    ticker_symbol: str, stockdex_methods: dict[str, str]
+) -> dict[str, pd.DataFrame]:
+    """
+    Fetch several financial statements for one ticker.
+    stockdex_methods maps table name -> stockdex method.
+    Returns {table_name: DataFrame} for the statements that returned data. If none
+    did, raises ThrottledError if at least one was throttled, else the last error.
+    """
+    results = {}
+    throttled = error = None
+    for table_name, stockdex_method in stockdex_methods.items():
+        try:
+            df = _fetch_financial_data(ticker_symbol, stockdex_method)
+        except ThrottledError as e:
+            throttled = e
+            continue
+        except Exception as e:
+            error = e
+            continue
+        if df is not None:
+            results[table_name] = df
+    if not results and (throttled or error) is not None:
+        raise throttled or error
+    return results
+
+
+def _parse_value(v) -> float | None:
+    """
+    Parse a single stockdex value ('99.80B', '1,234', '--', 12.5) into a float.
+    Scalar reference implementation of _parse_values, kept for benchmarking.
+    """
+    if pd.isna(v) or v == "" or v == "--":
+        return None
+    v = str(v).strip().replace(",", "")
+    for suffix, mult in SUFFIX_MULTIPLIERS.items():
+        if v.endswith(suffix):
+            try:
+                return float(v[:-1]) * mult
+            except ValueError:
+                return None
     try:
-        t = Ticker(ticker_symbol)
-        df = getattr(t, stockdex_method)()
-        if df is None or df.empty:
-            return None
-        return df
-    except Exception:
+        return float(v)
+    except ValueError:
         return None
 
 
+def _parse_values(values: np.ndarray | pd.Series) -> np.ndarray:
+    """
+    Vectorized equivalent of _parse_value over an array of raw stockdex values.
+
+    Suffixed and plain numbers ('99.80B', '-1.23M', '1,234') are parsed with NumPy
+    string ufuncs and a single float cast. If any cell does not fit that shape,
+    the cells are parsed one by one with _parse_value so results stay identical.
+    Unparseable values become NaN.
+    """
+    raw = np.asarray(values)
+    if pd.api.types.is_numeric_dtype(raw.dtype):
+        return raw.astype("float64")
+
+    present = ~pd.isna(raw)
+    strings = np.char.strip(raw.astype(str))
+    has_comma = np.char.find(strings, ",") >= 0
+    if has_comma.any():
+        strings[has_comma] = np.char.replace(strings[has_comma], ",", "")
+
+    body = np.char.rstrip(strings, "".join(SUFFIX_MULTIPLIERS))
+    candidates = (
+        present
+        & (np.char.str_len(strings) - np.char.str_len(body) <= 1)
+        & (strings != "")
+        & (strings != "--")
+    )
+
+    multiplier = np.ones(len(strings))
+    for suffix, mult in SUFFIX_MULTIPLIERS.items():
+        multiplier[np.char.endswith(strings, suffix)] = mult
+
+    parsed = np.full(len(strings), np.nan)
+    try:
+        parsed[candidates] = body[candidates].astype("float64") * multiplier[candidates]
+    except ValueError:
+        parsed = np.array([_parse_value(v) for v in raw], dtype="float64")
+    return parsed
+
+
 def _melt_financial_df(ticker_symbol: str, df: pd.DataFrame) -> pd.DataFrame:
     """
     Convert a financial DataFrame from stockdex into long format:
     ticker, frequency, report_date, metric, value, insert_datetime
+    with ticker, frequency and metric as categoricals (one string per distinct value).
 
     stockdex returns: index=dates (e.g. '2022-09-30'), columns=metrics,
     values=strings like '99.80B', '1.23M', '456.78K' or plain numbers.
     """
-    # Index is dates, columns are metric names
-    df = df.copy()
-    df.index.name = "report_date"
-    df = df.reset_index()
-
-    # Melt: report_date stays, all metric columns become rows
-    metric_cols = [c for c in df.columns if c != "report_date"]
-    melted = df.melt(id_vars=["report_date"], value_vars=metric_cols, var_name="metric", value_name="value_raw")
-
-    # Parse values: handle suffixes like B, M, K, T
-    def parse_value(v):
-        if pd.isna(v) or v == "" or v == "--":
-            return None
-        v = str(v).strip().replace(",", "")
-        multipliers = {"T": 1e12, "B": 1e9, "M": 1e6, "K": 1e3}
-        for suffix, mult in multipliers.items():
-            if v.endswith(suffix):
-                try:
-                    return float(v[:-1]) * mult
-                except ValueError:
-                    return None
-        try:
-            return float(v)
-        except ValueError:
-            return None
-
-    melted["value"] = melted["value_raw"].apply(parse_value)
-    melted = melted.dropna(subset=["value"])
+    # Index is dates, columns are metric names. Flatten column by column (the same
+    # row order as DataFrame.melt) so every per-date and per-metric attribute is
+    # computed once and broadcast with np.tile / np.repeat.
+    n_dates, n_metrics = df.shape
+    values = _parse_values(df.to_numpy().ravel(order="F"))
 
     # Parse report_date
-    melted["report_date"] = pd.to_datetime(melted["report_date"], errors="coerce").dt.date
-    melted = melted.dropna(subset=["report_date"])
+    dates = pd.to_datetime(pd.Series(df.index), errors="coerce")
+    report_dates = np.tile(dates.dt.date.to_numpy(dtype=object), n_metrics)
+    valid_dates = np.tile(dates.notna().to_numpy(), n_metrics)
 
     # Determine frequency from metric name prefix (annual/quarterly)
-    melted["frequency"] = melted["metric"].apply(
-        lambda m: "quarterly" if m.startswith("quarterly") else "annual"
+    metrics = np.asarray(df.columns, dtype=object)
+    is_quarterly = np.array([str(m).startswith("quarterly") for m in metrics], dtype=np.int8)
+
+    keep = ~np.isnan(values) & valid_dates
+    n_rows = int(keep.sum())
+    if df.columns.is_unique:
+        metric = pd.Categorical.from_codes(
+            np.repeat(np.arange(n_metrics), n_dates)[keep], metrics, validate=False
+        )
+    else:
+        metric = pd.Categorical(np.repeat(metrics, n_dates)[keep])
+    return pd.DataFrame(
+        {
+            "ticker": pd.Categorical.from_codes(
+                np.zeros(n_rows, dtype=np.int8), [ticker_symbol], validate=False
+            ),
+            "frequency": pd.Categorical.from_codes(
+                np.repeat(is_quarterly, n_dates)[keep], dtype=FREQUENCY_DTYPE, validate=False
+            ),
+            "report_date": report_dates[keep],
+            "metric": metric,
+            "value": values[keep],
+            "insert_datetime": datetime.utcnow(),
+        }
     )
 
-    melted["ticker"] = ticker_symbol
-    melted["insert_datetime"] = datetime.utcnow()
 
-    return melted[["ticker", "frequency", "report_date", "metric", "value", "insert_datetime"]]
+def _concat_melted(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate melted rows, keeping CATEGORICAL_COLUMNS categorical across tickers."""
+    df = pd.concat([d.drop(columns=CATEGORICAL_COLUMNS) for d in dfs], ignore_index=True)
+    for column in CATEGORICAL_COLUMNS:
+        df[column] = union_categoricals([d[column] for d in dfs])
+    return df[LOAD_COLUMNS]
 
 
-class FinancialDataETL:
+def _replace_ticker_rows(conn, layout: StatementLayout, df: pd.DataFrame, frequency=None) -> dict:
     """
-    ETL job that fetches financial data for active tickers and upserts into
-    the corresponding Postgres table (income_stmt, cash_flow, balance_sheet, financials).
+    Replace the rows of df's tickers in the layout's table on an open connection.
+    Uses DELETE + INSERT (simpler than ON CONFLICT for multi-column keys), scoped by
+    frequency if set, so callers control the transaction boundary.
+    Returns load counts (see _load_counts).
+    """
+    if df.empty:
+        return _load_counts()
 
-    Prioritization:
-    1. Active tickers NOT in the target table yet
-    2. Active tickers with oldest insert_datetime in the target table
+    tickers = df[layout.ticker].unique().tolist()
+
+    # Delete existing data for these tickers (scoped by frequency if set)
+    if frequency:
+        delete_sql = text(
+            f"DELETE FROM {SCHEMA}.{layout.table} "
+            f"WHERE {layout.ticker} = ANY(:tickers) AND {layout.frequency} = :frequency"
+        )
+        conn.execute(delete_sql, {"tickers": tickers, "frequency": frequency})
+    else:
+        delete_sql = text(
+            f"DELETE FROM {SCHEMA}.{layout.table} WHERE {layout.ticker} = ANY(:tickers)"
+        )
+        conn.execute(delete_sql, {"tickers": tickers})
+
+    # Insert new data
+    records = df[layout.columns].to_dict("records")
+    insert_sql = text(
+        f"""
+        INSERT INTO {SCHEMA}.{layout.table}
+        ({', '.join(layout.columns)})
+        VALUES ({', '.join(f':{column}' for column in layout.columns)})
+    """
+    )
+    conn.execute(insert_sql, records)
+
+    return _load_counts(inserted=len(df))
+
+
+def _copy_to_stage(conn, layout: StatementLayout, df: pd.DataFrame) -> str:
+    """
+    Stream df into a session-local temp staging table shaped like the layout's table
+    using PostgreSQL COPY. The staging table is emptied on commit. Returns its name.
+    """
+    stage = f"{layout.table}_stage"
+    conn.execute(
+        text(
+            f"""
+        CREATE TEMP TABLE IF NOT EXISTS {stage}
+        (LIKE {SCHEMA}.{layout.table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+    """
+        )
+    )
+
+    buffer = io.StringIO()
+    df[layout.columns].to_csv(buffer, index=False, header=False)
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY {stage} ({', '.join(layout.columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+        )
+    finally:
+        cursor.close()
+    return stage
+
+
+def _copy_replace_ticker_rows(
+    conn, layout: StatementLayout, df: pd.DataFrame, frequency=None
+) -> dict:
+    """
+    Same result as _replace_ticker_rows, but streams df into a temp staging table
+    with PostgreSQL COPY, then deletes the tickers' rows and re-inserts them from
+    staging, instead of binding every row as executemany parameters.
+    Returns load counts (see _load_counts).
+    """
+    if df.empty:
+        return _load_counts()
+
+    stage = _copy_to_stage(conn, layout, df)
+
+    # Delete existing rows for the staged tickers, then insert the staged rows. Two
+    # statements: in one, the insert would still see the deleted keys of the natural-key
+    # unique index (always present on dictionary-encoded tables). The tickers are bound
+    # as a list, so the delete is pruned to their partitions on partitioned tables.
+    frequency_filter = f"AND {layout.frequency} = :frequency" if frequency else ""
+    columns = ", ".join(layout.columns)
+    conn.execute(
+        text(
+            f"""
+            DELETE FROM {SCHEMA}.{layout.table}
+            WHERE {layout.ticker} = ANY(:tickers) {frequency_filter}
+        """
+        ),
+        {"tickers": df[layout.ticker].unique().tolist(), "frequency": frequency},
+    )
+    conn.execute(
+        text(f"INSERT INTO {SCHEMA}.{layout.table} ({columns}) SELECT {columns} FROM {stage}")
+    )
+
+    return _load_counts(inserted=len(df))
+
+
+def _incremental_upsert_rows(
+    conn, layout: StatementLayout, df: pd.DataFrame, frequency=None
+) -> dict:
+    """
+    Upsert df on the natural key (ticker, frequency, report_date, metric): new keys
+    are inserted, keys whose value changed are updated, and unchanged rows are left
+    untouched (no rewrite, no index churn). Rows no longer returned by Yahoo are kept.
+    Of rows sharing a key, the last one is loaded. frequency is unused: only keys
+    present in df are touched. Returns load counts (see _load_counts).
+    """
+    if df.empty:
+        return _load_counts()
+
+    # ON CONFLICT needs the unique index on the natural key, created by the migration
+    require_migration(conn, TICKER_KEYS_MIGRATION, "The incremental load method")
+    # ON CONFLICT cannot update a row twice in one statement, and the counts are per key
+    df = df.drop_duplicates(subset=layout.key, keep="last")
+    stage = _copy_to_stage(conn, layout, df)
+
+    key = ", ".join(layout.key)
+    # Count the staged keys already stored to split the upsert's rows into inserted and
+    # updated (RETURNING xmax is not available on partitioned tables)
+    existing = conn.execute(
+        text(
+            f"""
+        SELECT COUNT(*) FROM {stage} s JOIN {SCHEMA}.{layout.table} t USING ({key})
+    """
+        )
+    ).scalar_one()
+    written = conn.execute(
+        text(
+            f"""
+        INSERT INTO {SCHEMA}.{layout.table} AS t ({', '.join(layout.columns)})
+        SELECT {', '.join(layout.columns)} FROM {stage}
+        ON CONFLICT ({key}) DO UPDATE SET
+            value = EXCLUDED.value,
+            insert_datetime = EXCLUDED.insert_datetime
+        WHERE t.value IS DISTINCT FROM EXCLUDED.value
+    """
+        )
+    ).rowcount
+    inserted = len(df) - existing
+    updated = written - inserted
+
+    return _load_counts(inserted=inserted, updated=updated, unchanged=len(df) - inserted - updated)
+
+
+def _record(state: RunState | None, ticker: str, status: str, error: str | None = None) -> None:
+    """Record a ticker's outcome in the run state, if the run keeps one."""
+    if state is not None:
+        state.record(ticker, status, error)
+
+
+def _load_counts(inserted: int = 0, updated: int = 0, unchanged: int = 0) -> dict:
+    """Per-batch load counts returned by every loader in LOAD_METHODS."""
+    return {"inserted": inserted, "updated": updated, "unchanged": unchanged}
+
+
+def _layout_rows(
+    engine, table_name: str, df: pd.DataFrame
+) -> tuple[StatementLayout, pd.DataFrame]:
+    """table_name's layout and df's rows as written to it (ids, for encoded tables)."""
+    layout = statement_layout(engine, table_name)
+    return layout, encode_frame(engine, df) if layout.encoded and not df.empty else df
+
+
+# Load method name -> loader(conn, layout, df, frequency) -> load counts
+LOAD_METHODS = {
+    "insert": _replace_ticker_rows,
+    "copy": _copy_replace_ticker_rows,
+    "incremental": _incremental_upsert_rows,
+}
+
+
+def _format_load_timing(load_method: str, counts: dict, seconds: float) -> str:
+    """
+    Format load counts and timing for batch log lines, e.g.
+    'incremental 1200 rows (40 inserted, 3 updated, 1157 unchanged) in 0.31s (3871 rows/s)'.
+    """
+    rows = sum(counts.values())
+    rate = rows / seconds if seconds > 0 else 0.0
+    return (
+        f"{load_method} {rows} rows ({counts['inserted']} inserted, {counts['updated']} updated, "
+        f"{counts['unchanged']} unchanged) in {seconds:.2f}s ({rate:.0f} rows/s)"
+    )
+
+
+class _FinancialETLBase:
+    """
+    Run loop shared by the financial data ETL jobs: builds the work queue of their
+    target tables (from statement_freshness, a run state or the lease table), then
+    fetches, melts and upserts it batch by batch or as a streaming pipeline.
+
+    Subclasses implement the table-specific hooks: _fetch(ticker) -> raw data or None,
+    _transform(ticker, raw) -> melted result or None, _load(results) -> rows written
+    per table, and _result_rows(result) -> row count.
+
+    Prioritization (across all target tables):
+    1. Active tickers missing from at least one target table
+    2. Active tickers whose stalest table has the oldest last load
     """
 
     def __init__(
         self,
-        table_name: str,
+        table_names: list[str],
+        label: str,
         postgres_interface: PostgresInterface | None = None,
         batch_size: int = ETL_BATCH_SIZE,
         max_threads: int = ETL_THREADS,
         frequency: str | None = None,
+        load_method: str = ETL_LOAD_METHOD,
+        pipeline: bool = ETL_PIPELINE,
+        sharded: bool = ETL_SHARDED,
+        run_state: bool = RUN_STATE_ENABLED,
+        resume: bool = True,
+        metrics: bool = METRICS_ENABLED,
+        metrics_dir: str = METRICS_DIR,
     ):
-        if table_name not in FINANCIAL_TABLES:
-            raise ValueError(f"Unknown table: {table_name}. Must be one of {list(FINANCIAL_TABLES.keys())}")
         if frequency and frequency not in ("annual", "quarterly"):
             raise ValueError(f"Unknown frequency: {frequency}. Must be 'annual' or 'quarterly'.")
+        if load_method not in LOAD_METHODS:
+            raise ValueError(
+                f"Unknown load method: {load_method}. Must be one of {list(LOAD_METHODS)}"
+            )
 
-        self.table_name = table_name
-        self.stockdex_method = FINANCIAL_TABLES[table_name]
+        self.table_names = table_names
+        self.label = label
+        # Lease table job name: workers of the same tables and frequency share a queue
+        self.job = f"{label}:{frequency or 'all'}"
         self.postgres_interface = postgres_interface or PostgresInterface()
         self.engine = self.postgres_interface.get_engine()
         self.batch_size = batch_size
         self.max_threads = max_threads
         self.frequency = frequency
-
-    def get_priority_tickers(self) -> list[str]:
+        self.load_method = load_method
+        self.pipeline = pipeline
+        self.sharded = sharded
+        # Sharded runs recover through the lease table instead
+        self.run_state = run_state and not sharded
+        self.resume = resume
+        self.state: RunState | None = None
+        self.metrics = metrics  # per-stage timings and request outcomes (see run_metrics)
+        self.metrics_dir = metrics_dir
+        self.load_seconds = 0.0
+        self.load_counts = _load_counts()
+
+    def _priority_sql(self, unleased: bool = False) -> str:
         """
-        Get batch_size tickers to process, prioritizing:
-        1. Active tickers NOT yet in the target table
-        2. Active tickers with oldest insert_datetime in the target table
+        Priority query over active_tickers (alias a), without LIMIT: due tickers, those
+        missing the most tables first, then the oldest. unleased skips tickers claimed
+        by other workers.
         """
-        query = text(f"""
-            WITH active AS (
-                SELECT ticker FROM {SCHEMA}.active_tickers WHERE is_active = true
-            ),
-            existing AS (
-                SELECT ticker, MAX(insert_datetime) as last_insert
-                FROM {SCHEMA}.{self.table_name}
-                {"WHERE frequency = '" + self.frequency + "'" if self.frequency else ""}
+        with self.engine.connect() as conn:
+            last_loads = last_load_sql(conn, self.table_names, self.frequency)
+        return f"""
+            WITH existing AS ({last_loads}),
+            freshness AS (
+                SELECT ticker,
+                       COUNT(*) as tables_present,
+                       MIN(last_insert) as oldest_insert
+                FROM existing
                 GROUP BY ticker
             )
             SELECT a.ticker
-            FROM active a
-            LEFT JOIN existing e ON a.ticker = e.ticker
-            WHERE e.last_insert IS NULL
-               OR e.last_insert < NOW() - INTERVAL '3 months'
+            FROM {SCHEMA}.active_tickers a
+            LEFT JOIN freshness f ON a.ticker = f.ticker
+            WHERE a.is_active = true
+              AND (COALESCE(f.tables_present, 0) < :table_count
+               OR f.oldest_insert < NOW() - INTERVAL '3 months')
+              {UNLEASED_FILTER if unleased else ""}
             ORDER BY
-                CASE WHEN e.ticker IS NULL THEN 0 ELSE 1 END,  -- new tickers first
-                e.last_insert ASC NULLS FIRST                    -- then oldest data
-            LIMIT :batch_size
-        """)
+                COALESCE(f.tables_present, 0) ASC,  -- tickers missing the most tables first
+                f.oldest_insert ASC NULLS FIRST,    -- then oldest data
+                a.ticker
+        """
 
-        with self.engine.connect() as conn:
-            result = conn.execute(query, {"batch_size": self.batch_size})
-            tickers = [row[0] for row in result]
+    def _priority_params(self) -> dict:
+        return {
+            "table_names": self.table_names,
+            "table_count": len(self.table_names),
+            "frequency": self.frequency,
+        }
 
-        return tickers
-
-    def upsert_financial_data(self, df: pd.DataFrame) -> int:
+    def get_priority_tickers(self, limit: int | None = None) -> list[str]:
         """
-        Upsert financial data into the target table.
-        Uses DELETE + INSERT for the affected tickers (simpler than ON CONFLICT for multi-column keys).
-        Returns number of rows inserted.
+        Get the run's work queue (up to limit tickers, all if None), prioritizing:
+        1. Active tickers missing from any target table (missing from all first)
+        2. Active tickers with the oldest per-table last load
+        Reads the statement_freshness table once it is migrated, so the statement tables
+        are not scanned.
         """
-        if df.empty:
-            return 0
+        params = {**self._priority_params(), "limit": limit}
+        with self.engine.connect() as conn, current().timer("priority_query"):
+            query = text(f"{self._priority_sql()} LIMIT :limit")
+            tickers = [row[0] for chunk in stream_rows(conn, query, params) for row in chunk]
 
-        tickers = df["ticker"].unique().tolist()
+        return tickers
 
+    def _load_tables(self, dfs: dict[str, pd.DataFrame]) -> dict[str, int]:
+        """
+        Upsert dfs (table name -> melted rows) into their tables in one transaction,
+        using the configured load method, and keep the tables' freshness and latest-value
+        rows current. Returns rows written (inserted + updated) per table; the summed
+        load counts and load time are kept in self.load_counts and self.load_seconds.
+        """
+        self.load_counts = _load_counts()
+        self.load_seconds = 0.0
+        if not dfs:
+            return {}
+
+        load_start = time.time()
+        rows_written = {}
+        encoded = {name: _layout_rows(self.engine, name, df) for name, df in dfs.items()}
         with self.engine.begin() as conn:
-            # Delete existing data for these tickers (scoped by frequency if set)
-            if self.frequency:
-                delete_sql = text(f"DELETE FROM {SCHEMA}.{self.table_name} WHERE ticker = ANY(:tickers) AND frequency = :frequency")
-                conn.execute(delete_sql, {"tickers": tickers, "frequency": self.frequency})
-            else:
-                delete_sql = text(f"DELETE FROM {SCHEMA}.{self.table_name} WHERE ticker = ANY(:tickers)")
-                conn.execute(delete_sql, {"tickers": tickers})
-
-            # Insert new data
-            records = df.to_dict("records")
-            insert_sql = text(f"""
-                INSERT INTO {SCHEMA}.{self.table_name}
-                (ticker, frequency, report_date, metric, value, insert_datetime)
-                VALUES (:ticker, :frequency, :report_date, :metric, :value, :insert_datetime)
-            """)
-            conn.execute(insert_sql, records)
-
-        return len(df)
-
-    def _process_ticker(self, ticker_symbol: str) -> pd.DataFrame | None:
-        """Fetch and melt data for a single ticker."""
-        raw_df = _fetch_financial_data(ticker_symbol, self.stockdex_method)
-        if raw_df is None:
-            return None
-        try:
-            return _melt_financial_df(ticker_symbol, raw_df)
-        except Exception as e:
-            logger.debug(f"Failed to melt data for {ticker_symbol}: {e}")
+            for table_name, df in dfs.items():
+                layout, rows = encoded[table_name]
+                counts = LOAD_METHODS[self.load_method](
+                    conn, layout, rows, layout.frequency_value(self.frequency)
+                )
+                update_freshness(conn, table_name, df)
+                update_latest(conn, table_name, df, self.frequency)
+                rows_written[table_name] = counts["inserted"] + counts["updated"]
+                for key, value in counts.items():
+                    self.load_counts[key] += value
+        self.load_seconds = time.time() - load_start
+        current().observe("upsert", self.load_seconds)
+        return rows_written
+
+    def _process_ticker(self, ticker_symbol: str):
+        """Fetch and melt a single ticker (batch mode); None if it has no data."""
+        raw = self._fetch(ticker_symbol)
+        if raw is None:
             return None
+        return self._transform(ticker_symbol, raw)
+
+    def _load_summary(self, written: dict[str, int]) -> str:
+        """Rows written for log lines, per table when the job has several."""
+        summary = f"{sum(written.values())} rows written"
+        if len(self.table_names) > 1:
+            summary += f" ({', '.join(f'{t}={n}' for t, n in written.items()) or 'none'})"
+        return summary
 
     def run(self, max_batches: int | None = None) -> None:
         """
-        Main entry point. Fetches priority tickers, gets their financial data
-        in parallel, and upserts into the target table.
+        Main entry point. Builds the work queue, then fetches, melts and upserts it
+        batch by batch, or as a streaming pipeline if self.pipeline is set.
         """
+        if self.sharded:
+            # Claim one batch at a time through the lease table, shared with other workers
+            worker_id = new_worker_id()
+            metrics = start_run(self.job, self.metrics, worker=worker_id)
+            logger.info(f"[{self.label}] Worker {worker_id} claiming batches of {self.batch_size}")
+            batches = claimed_batches(
+                self.engine,
+                self.job,
+                worker_id,
+                self._priority_sql(unleased=True),
+                self._priority_params(),
+                self.batch_size,
+                max_batches,
+            )
+        else:
+            # The work queue is computed once per run; batches are consecutive slices of it.
+            # With a run state, an interrupted run's remaining queue is resumed instead.
+            metrics = start_run(self.job, self.metrics)
+            limit = max_batches * self.batch_size if max_batches else None
+            if self.run_state:
+                self.state = RunState(self.engine, self.job)
+                queue = self.state.start(
+                    lambda: self.get_priority_tickers(limit=limit), resume=self.resume
+                )
+            else:
+                queue = self.get_priority_tickers(limit=limit)
+            logger.info(f"[{self.label}] {len(queue)} tickers queued")
+            size = self.batch_size
+            batches = (queue[slice(start, start + size)] for start in range(0, len(queue), size))
+
+        completed = False
+        totals = None
+        try:
+            if self.pipeline:
+                totals = self._run_pipeline(chain.from_iterable(batches))
+            else:
+                totals = self._run_batches(batches, max_batches)
+            completed = True
+        finally:
+            if self.sharded:
+                finish_leases(self.engine, self.job, worker_id, completed)
+            if self.state is not None:
+                self.state.finish(completed)
+            metrics.write(self.metrics_dir, totals, completed)
+
+        logger.info(
+            f"[{self.label}] Complete | "
+            f"Tickers processed: {totals['processed']}, "
+            f"With data: {totals['with_data']}, "
+            f"Throttled: {totals['throttled']}, "
+            f"Total rows written: {totals['rows_written']}"
+        )
+        log_limiter_summaries()
+        log_response_cache_summary()
+
+    def _run_batches(self, batches: Iterable[list[str]], max_batches: int | None) -> dict:
+        """Fetch each batch in parallel, then upsert it. Returns the run totals."""
         batches_done = 0
-        total_rows_inserted = 0
+        total_rows_written = 0
         total_tickers_processed = 0
         total_tickers_with_data = 0
+        total_throttled = 0
 
-        while True:
-            tickers = self.get_priority_tickers()
-            if not tickers:
-                logger.info(f"[{self.table_name}] No more active tickers to process.")
-                break
-
+        for tickers in batches:
             batch_start = time.time()
-            all_dfs = []
+            results = {}
+            throttled = 0
 
-            # Fetch data in parallel
+            # Fetch data in parallel, one worker pass per ticker for all tables
             with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
                 futures = {
-                    executor.submit(self._process_ticker, ticker): ticker
-                    for ticker in tickers
+                    executor.submit(self._process_ticker, ticker): ticker for ticker in tickers
                 }
                 for future in as_completed(futures):
                     ticker = futures[future]
                     try:
-                        result_df = future.result(timeout=30)
-                        if result_df is not None and not result_df.empty:
-                            all_dfs.append(result_df)
-                            total_tickers_with_data += 1
-                    except Exception:
-                        pass
+                        result = future.result(timeout=30)
+                    except ThrottledError as e:
+                        throttled += 1
+                        _record(self.state, ticker, "throttled", str(e))
+                        continue
+                    except Exception as e:
+                        _record(self.state, ticker, "error", repr(e))
+                        continue
+                    if result is not None:
+                        results[ticker] = result
+                    else:
+                        _record(self.state, ticker, "no_data")
 
             total_tickers_processed += len(tickers)
+            total_tickers_with_data += len(results)
+            total_throttled += throttled
 
             # Combine and upsert
-            if all_dfs:
-                combined_df = pd.concat(all_dfs, ignore_index=True)
-                if self.frequency:
-                    combined_df = combined_df[combined_df["frequency"] == self.frequency]
-                rows_inserted = self.upsert_financial_data(combined_df)
-                total_rows_inserted += rows_inserted
-            else:
-                rows_inserted = 0
+            written = self._load(list(results.values()))
+            for ticker in results:
+                _record(self.state, ticker, "done")
+            if self.state is not None:
+                self.state.flush()
+            total_rows_written += sum(written.values())
 
             batches_done += 1
             elapsed = time.time() - batch_start
+            current().observe("batch", elapsed)
 
             logger.info(
-                f"[{self.table_name}] Batch {batches_done} | "
-                f"{len(tickers)} tickers fetched, {len(all_dfs)} had data | "
-                f"{rows_inserted} rows inserted | "
+                f"[{self.label}] Batch {batches_done} | "
+                f"{len(tickers)} tickers fetched, {len(results)} had data, "
+                f"{throttled} throttled | {self._load_summary(written)} | "
+                f"{_format_load_timing(self.load_method, self.load_counts, self.load_seconds)} | "
                 f"{elapsed:.1f}s"
             )
 
-            if max_batches and batches_done >= max_batches:
-                logger.info(f"[{self.table_name}] Reached max_batches={max_batches}, stopping.")
-                break
+        if max_batches and batches_done >= max_batches:
+            logger.info(f"[{self.label}] Reached max_batches={max_batches}, stopping.")
+        else:
+            logger.info(f"[{self.label}] No more active tickers to process.")
 
-        logger.info(
-            f"[{self.table_name}] Complete | "
-            f"Tickers processed: {total_tickers_processed}, "
-            f"With data: {total_tickers_with_data}, "
-            f"Total rows inserted: {total_rows_inserted}"
+        return {
+            "processed": total_tickers_processed,
+            "with_data": total_tickers_with_data,
+            "throttled": total_throttled,
+            "rows_written": total_rows_written,
+        }
+
+    def _run_pipeline(self, tickers: Iterable[str]) -> dict:
+        """
+        Fetch, melt and upsert tickers concurrently (see etl_pipeline.StagePipeline),
+        writing whenever ETL_FLUSH_ROWS rows or ETL_FLUSH_SECONDS have accumulated.
+        Returns the run totals.
+        """
+        rows_written = 0
+        flushed_at = time.time()
+
+        def load(results: list) -> None:
+            nonlocal rows_written, flushed_at
+            written = self._load(results)
+            rows_written += sum(written.values())
+            logger.info(
+                f"[{self.label}] Flush {pipeline.counts['flushes'] + 1} | "
+                f"{len(results)} tickers, {self._load_summary(written)} | "
+                f"{_format_load_timing(self.load_method, self.load_counts, self.load_seconds)} | "
+                f"queued: {pipeline.queue_depths()} | {time.time() - flushed_at:.1f}s"
+            )
+            current().observe("flush", time.time() - flushed_at)
+            flushed_at = time.time()
+
+        pipeline = StagePipeline(
+            fetch=self._fetch,
+            transform=self._transform,
+            load=load,
+            size=self._result_rows,
+            max_threads=self.max_threads,
+            state=self.state,
         )
+        counts = pipeline.run(tickers)
+        return {
+            "processed": counts["fetched"] + counts["throttled"],
+            "with_data": counts["with_data"],
+            "throttled": counts["throttled"],
+            "rows_written": rows_written,
+        }
+
+
+class FinancialDataETL(_FinancialETLBase):
+    """
+    ETL job that fetches financial data for active tickers and upserts into
+    the corresponding Postgres table (income_stmt, cash_flow, balance_sheet, financials).
+
+    Prioritization:
+    1. Active tickers NOT in the target table yet
+    2. Active tickers with the oldest last load in the target table
+    """
+
+    def __init__(self, table_name: str, **kwargs):
+        if table_name not in FINANCIAL_TABLES:
+            raise ValueError(
+                f"Unknown table: {table_name}. Must be one of {list(FINANCIAL_TABLES.keys())}"
+            )
+        super().__init__([table_name], table_name, **kwargs)
+        self.table_name = table_name
+        self.stockdex_method = FINANCIAL_TABLES[table_name]
+
+    def upsert_financial_data(self, df: pd.DataFrame) -> int:
+        """
+        Upsert financial data into the target table using the configured load method
+        ('insert': executemany DELETE + INSERT, 'copy': COPY into a staging table,
+        'incremental': ON CONFLICT upsert of new/changed rows only).
+        Returns number of rows written (inserted + updated); the per-batch counts and
+        load time are kept in self.load_counts and self.load_seconds.
+        """
+        written = self._load_tables({self.table_name: df} if not df.empty else {})
+        return written.get(self.table_name, 0)
+
+    def _fetch(self, ticker_symbol: str) -> pd.DataFrame | None:
+        """Fetch stage: the ticker's raw statement, or None if it has no data."""
+        with current().timer("fetch", ticker_symbol):
+            return _fetch_financial_data(ticker_symbol, self.stockdex_method)
+
+    def _transform(self, ticker_symbol: str, raw_df: pd.DataFrame) -> pd.DataFrame | None:
+        """Transform stage: melt one ticker's statement, keeping the target frequency."""
+        with current().timer("melt", ticker_symbol):
+            df = _melt_financial_df(ticker_symbol, raw_df)
+        if self.frequency:
+            df = df[df["frequency"] == self.frequency]
+        return df if not df.empty else None
+
+    def _load(self, dfs: list[pd.DataFrame]) -> dict[str, int]:
+        """Load stage: upsert the melted rows of several tickers."""
+        rows = _concat_melted(dfs) if dfs else pd.DataFrame()
+        return {self.table_name: self.upsert_financial_data(rows)}
+
+    @staticmethod
+    def _result_rows(df: pd.DataFrame) -> int:
+        return len(df)
+
+
+class MultiTableFinancialETL(_FinancialETLBase):
+    """
+    ETL job that fetches every financial statement table for a ticker in one worker
+    pass and upserts all tables in a single transaction
+    per batch, instead of running one FinancialDataETL job per table.
+    """
+
+    def __init__(self, table_names: list[str] | None = None, **kwargs):
+        table_names = table_names or list(FINANCIAL_TABLES.keys())
+        unknown = [t for t in table_names if t not in FINANCIAL_TABLES]
+        if unknown:
+            raise ValueError(
+                f"Unknown table(s): {unknown}. Must be in {list(FINANCIAL_TABLES.keys())}"
+            )
+        label = "all" if set(table_names) == set(FINANCIAL_TABLES) else ",".join(table_names)
+        super().__init__(table_names, label, **kwargs)
+        self.stockdex_methods = {t: FINANCIAL_TABLES[t] for t in table_names}
+
+    def upsert_financial_data(self, dfs: dict[str, pd.DataFrame]) -> dict[str, int]:
+        """
+        Upsert financial data into every target table in one transaction, using the
+        configured load method. Returns number of rows written (inserted + updated) per
+        table; the summed load counts and load time are kept in self.load_counts and
+        self.load_seconds.
+        """
+        return self._load_tables(dfs)
+
+    def _fetch(self, ticker_symbol: str) -> dict[str, pd.DataFrame] | None:
+        """Fetch stage: the ticker's raw statements, or None if none has data."""
+        with current().timer("fetch", ticker_symbol):
+            return _fetch_all_financial_data(ticker_symbol, self.stockdex_methods) or None
+
+    def _transform(
+        self, ticker_symbol: str, raw_dfs: dict[str, pd.DataFrame]
+    ) -> dict[str, pd.DataFrame] | None:
+        """Transform stage: melt one ticker's statements, keeping the target frequency."""
+        melted = {}
+        with current().timer("melt", ticker_symbol):
+            for table_name, raw_df in raw_dfs.items():
+                try:
+                    df = _melt_financial_df(ticker_symbol, raw_df)
+                except Exception as e:
+                    logger.debug(f"Failed to melt {table_name} data for {ticker_symbol}: {e}")
+                    continue
+                if self.frequency:
+                    df = df[df["frequency"] == self.frequency]
+                if not df.empty:
+                    melted[table_name] = df
+        return melted or None
+
+    def _load(self, results: list[dict[str, pd.DataFrame]]) -> dict[str, int]:
+        """Load stage: upsert the melted rows of several tickers, combined per table."""
+        combined = {}
+        for table_name in self.stockdex_methods:
+            dfs = [result[table_name] for result in results if table_name in result]
+            if dfs:
+                combined[table_name] = _concat_melted(dfs)
+        return self.upsert_financial_data(combined)
+
+    @staticmethod
+    def _result_rows(result: dict[str, pd.DataFrame]) -> int:
+        return sum(len(df) for df in result.values())
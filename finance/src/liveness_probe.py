@@ -0,0 +1,177 @@
+"""
+Endpoint ordering and statistics for ticker liveness probes.
+
+A ticker is active if any of the Yahoo endpoints in etl_job.YAHOO_METHODS returns
+data. Probes stop at the first hit, so the order matters: ProbeStats records, per
+endpoint, how often it answers with data and how long it takes, overall and per
+exchange, and orders the endpoints for the next ticker so the one most likely to hit
+on that exchange (ties broken by latency) is tried first. Endpoints that request
+exactly the same URL (stockdex's yahoo_api_financials and
+yahoo_api_income_statement) are probed once.
+
+Both probes request the fundamentals-timeseries API through the rate-limited
+yahoo_client: the 'light' probe checks the raw response for data, the 'full' probe
+builds the statement DataFrame from it, as the financial data ETL does. Either way, a
+ticker whose endpoints were throttled without any hit raises ThrottledError: its
+status is unknown, not inactive.
+
+Used by ETLJob (all modes) and AsyncYahooProbe.
+"""
+
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from finance.src.rate_limiter import ThrottledError, is_throttle_error
+from finance.src.yahoo_async import build_timeseries_url, has_timeseries_data
+from finance.src.yahoo_client import fetch_statement, get_timeseries
+
+logger = logging.getLogger(__name__)
+
+PROBE_TYPES = ("full", "light")
+UNKNOWN_EXCHANGE = "unknown"
+
+
+def distinct_methods(methods: list[str]) -> list[str]:
+    """Drop methods that request the same URL as an earlier one in methods."""
+    seen = set()
+    distinct = []
+    for method in methods:
+        url = build_timeseries_url("PROBE", method)
+        if url not in seen:
+            seen.add(url)
+            distinct.append(method)
+    return distinct
+
+
+def _exchange_key(exchange) -> str:
+    """Exchange name as a counter key; missing values (None, NaN from Excel) are grouped."""
+    return exchange if isinstance(exchange, str) and exchange else UNKNOWN_EXCHANGE
+
+
+def _empty_counts() -> dict:
+    return {"attempts": 0, "hits": 0, "seconds": 0.0}
+
+
+class ProbeStats:
+    """
+    Thread-safe per-endpoint hit and latency counters, overall and per exchange.
+
+    prior is a snapshot() from another ProbeStats (e.g. the parent process in
+    distributed mode): it informs order() but is not part of this object's snapshot(),
+    so workers can send back only what they recorded.
+    """
+
+    def __init__(self, methods: list[str], prior: dict | None = None):
+        self.methods = list(methods)
+        self._lock = threading.Lock()
+        self._counts: dict = defaultdict(lambda: defaultdict(_empty_counts))
+        self._prior = prior or {}
+
+    def record(self, exchange: str | None, method: str, hit: bool, seconds: float) -> None:
+        exchange = _exchange_key(exchange)
+        with self._lock:
+            for key in (exchange, None):
+                counts = self._counts[key][method]
+                counts["attempts"] += 1
+                counts["hits"] += int(hit)
+                counts["seconds"] += seconds
+
+    def _get(self, exchange: str | None, method: str) -> dict:
+        counts = dict(self._counts.get(exchange, {}).get(method, _empty_counts()))
+        prior = self._prior.get(exchange, {}).get(method)
+        if prior:
+            for field in counts:
+                counts[field] += prior[field]
+        return counts
+
+    def order(self, exchange: str | None = None) -> list[str]:
+        """
+        Endpoints sorted by (smoothed) hit rate on exchange, then by mean latency.
+        Exchanges with no history use the overall counters; with no history at all the
+        configured order is kept.
+        """
+        exchange = _exchange_key(exchange)
+        with self._lock:
+            seen = any(self._get(exchange, m)["attempts"] for m in self.methods)
+            key = exchange if seen else None
+            counts = {m: self._get(key, m) for m in self.methods}
+
+        def score(item: tuple[int, str]) -> tuple:
+            position, method = item
+            c = counts[method]
+            hit_rate = (c["hits"] + 1) / (c["attempts"] + 2)
+            latency = c["seconds"] / c["attempts"] if c["attempts"] else 0.0
+            return (-hit_rate, latency, position)
+
+        return [method for _, method in sorted(enumerate(self.methods), key=score)]
+
+    def snapshot(self) -> dict:
+        """Plain-dict copy of the recorded counters (picklable), keyed by exchange then method."""
+        with self._lock:
+            return {
+                exchange: {method: dict(c) for method, c in methods.items()}
+                for exchange, methods in self._counts.items()
+            }
+
+    def merge(self, snapshot: dict) -> None:
+        """Add the counters of another ProbeStats.snapshot() into this one."""
+        with self._lock:
+            for exchange, methods in snapshot.items():
+                for method, c in methods.items():
+                    counts = self._counts[exchange][method]
+                    for field in counts:
+                        counts[field] += c[field]
+
+    def log_summary(self) -> None:
+        """Log hit rate and mean latency per endpoint over the whole run."""
+        with self._lock:
+            overall = {m: dict(c) for m, c in self._counts.get(None, {}).items()}
+        total = sum(c["attempts"] for c in overall.values())
+        if not total:
+            return
+        logger.info(f"Probe stats | {total} requests")
+        for method in self.methods:
+            c = overall.get(method)
+            if not c or not c["attempts"]:
+                continue
+            logger.info(
+                f"  {method}: {c['attempts']} requests, "
+                f"hit rate {c['hits'] / c['attempts'] * 100:.1f}%, "
+                f"mean {c['seconds'] / c['attempts'] * 1000:.0f}ms"
+            )
+
+
+def _has_data(ticker_symbol: str, method: str, probe: str) -> bool:
+    if probe == "light":
+        return has_timeseries_data(get_timeseries(ticker_symbol, method))
+    return not fetch_statement(ticker_symbol, method).empty
+
+
+def probe_ticker(
+    ticker_symbol: str,
+    stats: ProbeStats,
+    exchange: str | None = None,
+    probe: str = "light",
+) -> bool:
+    """
+    Return True if at least one endpoint returns data for ticker_symbol, trying
+    endpoints in stats.order(exchange) and recording each attempt in stats.
+    Raises ThrottledError if no endpoint had data and at least one was throttled.
+    """
+    throttled = None
+    for method in stats.order(exchange):
+        start = time.perf_counter()
+        try:
+            hit = _has_data(ticker_symbol, method, probe)
+        except Exception as e:
+            hit = False
+            if is_throttle_error(e):
+                throttled = e
+        stats.record(exchange, method, hit, time.perf_counter() - start)
+        if hit:
+            return True
+    if throttled is not None:
+        raise ThrottledError(f"{ticker_symbol}: {throttled}") from throttled
+    return False
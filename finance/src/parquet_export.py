@@ -0,0 +1,298 @@
+"""
+Parquet export of the statement tables for analytics.
+
+Each table is streamed out of Postgres in chunks (see postgres_interface.read_sql_chunks)
+and written as Hive-partitioned Parquet, one file per frequency and report year:
+
+    <out_dir>/<table>/<layout>/frequency=annual/year=2023/data.parquet
+
+Layouts:
+
+- long: the table's rows (ticker, report_date, metric, value, insert_datetime) with
+  ticker and metric dictionary-encoded, so repeated strings are stored once per row
+  group and load as categoricals.
+- wide: one row per ticker and report date with one column per metric, so
+  cross-sectional screens need no pivot at query time.
+
+Exports are incremental: a JSON state file in out_dir records, per table and layout,
+when the last export started. The next export rewrites only the partitions that have
+rows with a newer insert_datetime (minus PARQUET_EXPORT_OVERLAP_MINUTES, for rows
+committed after the previous export started). The touched partitions are found from
+the rows inserted since then, and read with one query per frequency over the
+report_date range of its touched years. Partitions are written to a temporary file
+and renamed, so readers never see a partial file.
+
+Deletions are not detected by incremental exports, which only see inserted or updated
+rows. The insert and copy load methods replace a ticker's rows, so a partition where
+the ticker no longer has any rows (e.g. a report year Yahoo stopped returning) keeps
+them until it is rewritten for another reason; so do rows deleted by hand. A full
+export (full=True, --full) rewrites every partition and removes the partitions that no
+longer have rows: run one after deleting rows, and periodically.
+"""
+
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import itemgetter
+from typing import Iterator
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+from config import (
+    FINANCIAL_TABLES,
+    PARQUET_EXPORT_CHUNK_ROWS,
+    PARQUET_EXPORT_OVERLAP_MINUTES,
+    SCHEMA,
+)
+from finance.src.postgres_interface import read_sql_chunks
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+LAYOUTS = ("long", "wide")
+STATE_FILE = "_export_state.json"
+
+LONG_SCHEMA = pa.schema(
+    [
+        ("ticker", pa.dictionary(pa.int32(), pa.string())),
+        ("report_date", pa.date32()),
+        ("metric", pa.dictionary(pa.int32(), pa.string())),
+        ("value", pa.float64()),
+        ("insert_datetime", pa.timestamp("us")),
+    ]
+)
+
+
+def _wide_schema(metrics: list[str]) -> pa.Schema:
+    return pa.schema(
+        [
+            ("ticker", pa.string()),
+            ("report_date", pa.date32()),
+            ("insert_datetime", pa.timestamp("us")),
+        ]
+        + [(metric, pa.float64()) for metric in metrics]
+    )
+
+
+def _load_state(out_dir: str) -> dict:
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _save_state(out_dir: str, state: dict) -> None:
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, STATE_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(f"{path}.tmp", path)
+
+
+def _touched_partitions(conn, table_name: str, since: datetime | None) -> list[tuple[str, int]]:
+    """(frequency, year) of the partitions with rows inserted after since (all if None)."""
+    # Only the new rows are grouped, not the whole table
+    since_filter = "WHERE insert_datetime > :since" if since else ""
+    result = conn.execute(
+        text(
+            f"""
+            SELECT DISTINCT frequency, CAST(EXTRACT(YEAR FROM report_date) AS INTEGER) AS year
+            FROM {SCHEMA}.{table_name}
+            {since_filter}
+            ORDER BY 1, 2
+        """
+        ),
+        {"since": since},
+    )
+    return [(row.frequency, row.year) for row in result if row.year is not None]
+
+
+# Rows of one frequency in a range of report years, as plain predicates on the stored
+# columns (no expression over report_date), so the planner can use indexes and
+# partition pruning. One query per frequency reads all of its touched partitions.
+YEARS_FILTER = """
+    frequency = :frequency
+    AND report_date >= make_date(:first_year, 1, 1)
+    AND report_date < make_date(:last_year + 1, 1, 1)
+"""
+
+
+def _years_params(frequency: str, years: list[int]) -> dict:
+    return {"frequency": frequency, "first_year": min(years), "last_year": max(years)}
+
+
+def _partition_metrics(conn, table_name: str, frequency: str, years: list[int]) -> dict:
+    """Report year -> sorted metrics of frequency's partitions, their wide layout's columns."""
+    result = conn.execute(
+        text(
+            f"""
+            SELECT CAST(EXTRACT(YEAR FROM report_date) AS INTEGER) AS year,
+                   array_agg(DISTINCT metric ORDER BY metric) AS metrics
+            FROM {SCHEMA}.{table_name}
+            WHERE {YEARS_FILTER}
+            GROUP BY 1
+        """
+        ),
+        _years_params(frequency, years),
+    )
+    return {row.year: row.metrics for row in result}
+
+
+def _stream_partitions(
+    conn, table_name: str, frequency: str, years: list[int], chunk_rows: int
+) -> Iterator[tuple[int, pd.DataFrame]]:
+    """
+    Yield (year, rows) chunks of frequency's partitions of the given report years, year
+    by year. Rows of one ticker and report date are never split across chunks.
+    """
+    query = text(
+        f"""
+        SELECT CAST(EXTRACT(YEAR FROM report_date) AS INTEGER) AS year,
+               ticker, report_date, metric, value, insert_datetime
+        FROM {SCHEMA}.{table_name}
+        WHERE {YEARS_FILTER}
+        ORDER BY year, ticker, report_date, metric
+    """
+    )
+    carry = None
+    for chunk in read_sql_chunks(conn, query, _years_params(frequency, years), chunk_rows):
+        # Years in the range that have no new rows are left as they are
+        chunk = chunk[chunk["year"].isin(years)]
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
+            continue
+        # Hold back the last ticker/report date; the next chunk may have more of its rows
+        last = chunk.iloc[-1]
+        tail = (chunk["ticker"] == last["ticker"]) & (chunk["report_date"] == last["report_date"])
+        carry, chunk = chunk[tail], chunk[~tail]
+        for year, rows in chunk.groupby("year", sort=False):
+            yield int(year), rows
+    if carry is not None:
+        yield int(carry["year"].iloc[0]), carry
+
+
+def _long_table(rows: pd.DataFrame) -> pa.Table:
+    return pa.Table.from_pandas(rows[LONG_SCHEMA.names], schema=LONG_SCHEMA, preserve_index=False)
+
+
+def _wide_table(rows: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    # (ticker, report_date, metric) is unique within a partition (natural key)
+    wide = rows.pivot(index=["ticker", "report_date"], columns="metric", values="value")
+    wide = wide.reindex(columns=schema.names[3:])
+    wide.insert(
+        0, "insert_datetime", rows.groupby(["ticker", "report_date"])["insert_datetime"].max()
+    )
+    return pa.Table.from_pandas(wide.reset_index(), schema=schema, preserve_index=False)
+
+
+class _PartitionWriter:
+    """Writes one partition's chunks to a temporary file, renamed into place on close()."""
+
+    def __init__(self, path: str, schema: pa.Schema):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.schema = schema
+        self.rows = 0
+        self._writer = pq.ParquetWriter(f"{path}.tmp", schema, compression="zstd")
+
+    def write(self, table: pa.Table) -> None:
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self) -> None:
+        self._writer.close()
+        os.replace(f"{self.path}.tmp", self.path)
+
+
+def export_table(
+    engine,
+    table_name: str,
+    out_dir: str,
+    layout: str = "long",
+    full: bool = False,
+    chunk_rows: int = PARQUET_EXPORT_CHUNK_ROWS,
+) -> dict:
+    """
+    Export table_name to out_dir in layout, rewriting the partitions touched since the
+    previous export (every partition if full, or on the first export). Returns counts
+    of partitions and rows written.
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout {layout!r}, expected one of {LAYOUTS}")
+    state = _load_state(out_dir)
+    key = f"{table_name}/{layout}"
+    previous = state.get(key)
+    since = None
+    if previous and not full:
+        since = datetime.fromisoformat(previous) - timedelta(
+            minutes=PARQUET_EXPORT_OVERLAP_MINUTES
+        )
+    # insert_datetime is naive UTC (see _melt_financial_df)
+    started = datetime.utcnow()
+    table_dir = os.path.join(out_dir, table_name, layout)
+
+    with engine.connect() as conn:
+        # Every partition is read to the end: plan the cursors for all rows, not the
+        # first ones (a fast-start plan can nest-loop the encoded view's joins)
+        conn.execute(text("SET LOCAL cursor_tuple_fraction = 1.0"))
+        touched = _touched_partitions(conn, table_name, since)
+        logger.info(
+            f"[{table_name}] Exporting {len(touched)} {layout} partitions "
+            + (f"touched since {since:%Y-%m-%d %H:%M}" if since else "(full export)")
+        )
+        years_by_frequency: dict[str, list[int]] = {}
+        for frequency, year in touched:
+            years_by_frequency.setdefault(frequency, []).append(year)
+        written, rows = 0, 0
+        for frequency, years in years_by_frequency.items():
+            if layout == "wide":
+                metrics = _partition_metrics(conn, table_name, frequency, years)
+            chunks = _stream_partitions(conn, table_name, frequency, years, chunk_rows)
+            for year, year_chunks in groupby(chunks, key=itemgetter(0)):
+                path = os.path.join(
+                    table_dir, f"frequency={frequency}", f"year={year}", "data.parquet"
+                )
+                schema = LONG_SCHEMA if layout == "long" else _wide_schema(metrics[year])
+                writer = _PartitionWriter(path, schema)
+                for _, chunk in year_chunks:
+                    writer.write(
+                        _long_table(chunk) if layout == "long" else _wide_table(chunk, schema)
+                    )
+                    rows += len(chunk)
+                writer.close()
+                written += 1
+
+    if since is None and os.path.isdir(table_dir):
+        _remove_stale_partitions(table_dir, touched)
+    state[key] = started.isoformat()
+    _save_state(out_dir, state)
+    logger.info(
+        f"[{table_name}] Exported {rows} rows to {written} {layout} partitions under {table_dir}"
+    )
+    return {"partitions": written, "rows": rows}
+
+
+def _remove_stale_partitions(table_dir: str, partitions: list[tuple[str, int]]) -> None:
+    """After a full export, delete partition directories that no longer have rows."""
+    keep = {f"frequency={frequency}/year={year}" for frequency, year in partitions}
+    for frequency_dir in os.listdir(table_dir):
+        for year_dir in os.listdir(os.path.join(table_dir, frequency_dir)):
+            if f"{frequency_dir}/{year_dir}" not in keep:
+                shutil.rmtree(os.path.join(table_dir, frequency_dir, year_dir))
+                logger.info(f"Removed stale partition {frequency_dir}/{year_dir} of {table_dir}")
+
+
+def export_tables(engine, table_names: list[str], out_dir: str, **options) -> None:
+    """Export several tables (see export_table)."""
+    for table_name in table_names:
+        if table_name not in FINANCIAL_TABLES:
+            raise ValueError(f"Unknown table {table_name!r}")
+        export_table(engine, table_name, out_dir, **options)
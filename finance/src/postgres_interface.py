@@ -1,11 +1,21 @@
 """
 PostgreSQL interface for connecting to the Neon Postgres finance database.
+
+Large reads go through the chunked read helpers (stream_rows, read_sql_chunks). They
+use a server-side (named) cursor, so rows are fetched DB_READ_CHUNK_ROWS at a time
+and only one chunk is held in memory, instead of psycopg2's default of buffering
+the whole result on execute().
 """
 
 import os
+from typing import Iterator, Sequence
 
+import pandas as pd
 import sqlalchemy
 from dotenv import load_dotenv
+from sqlalchemy import text
+
+from config import DB_READ_CHUNK_ROWS
 
 load_dotenv()
 
@@ -18,6 +28,29 @@ if not NEON_CONNECTION_STRING:
     )
 
 
+def _as_query(query):
+    return text(query) if isinstance(query, str) else query
+
+
+def stream_rows(
+    conn, query, params: dict | None = None, chunk_rows: int = DB_READ_CHUNK_ROWS
+) -> Iterator[Sequence[sqlalchemy.Row]]:
+    """
+    Result rows of query in lists of up to chunk_rows, read through a server-side
+    cursor on conn. The connection must stay open until the iterator is exhausted.
+    """
+    streaming = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows)
+    yield from streaming.execute(_as_query(query), params or {}).partitions(chunk_rows)
+
+
+def read_sql_chunks(
+    conn, query, params: dict | None = None, chunk_rows: int = DB_READ_CHUNK_ROWS
+) -> Iterator[pd.DataFrame]:
+    """pd.read_sql over a server-side cursor on conn: DataFrames of up to chunk_rows rows."""
+    streaming = conn.execution_options(stream_results=True, max_row_buffer=chunk_rows)
+    yield from pd.read_sql(_as_query(query), streaming, params=params, chunksize=chunk_rows)
+
+
 class PostgresInterface:
     """Interface for connecting to the Neon Postgres finance database."""
 
@@ -31,3 +64,24 @@ class PostgresInterface:
 
     def get_engine(self) -> sqlalchemy.engine.Engine:
         return self.engine
+
+    def stream_rows(
+        self, query, params: dict | None = None, chunk_rows: int = DB_READ_CHUNK_ROWS
+    ) -> Iterator[Sequence[sqlalchemy.Row]]:
+        """stream_rows on a connection of its own, returned to the pool when exhausted."""
+        with self.engine.connect() as conn:
+            yield from stream_rows(conn, query, params, chunk_rows)
+
+    def iter_rows(
+        self, query, params: dict | None = None, chunk_rows: int = DB_READ_CHUNK_ROWS
+    ) -> Iterator[sqlalchemy.Row]:
+        """Result rows of query one by one, fetched chunk_rows at a time."""
+        for rows in self.stream_rows(query, params, chunk_rows):
+            yield from rows
+
+    def read_sql_chunks(
+        self, query, params: dict | None = None, chunk_rows: int = DB_READ_CHUNK_ROWS
+    ) -> Iterator[pd.DataFrame]:
+        """read_sql_chunks on a connection of its own, returned to the pool when exhausted."""
+        with self.engine.connect() as conn:
+            yield from read_sql_chunks(conn, query, params, chunk_rows)
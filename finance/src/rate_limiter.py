@@ -0,0 +1,248 @@
+"""
+Adaptive rate limiting for requests to Yahoo Finance.
+
+AdaptiveRateLimiter combines a token bucket (requests per second) with a
+concurrency window (requests in flight), both adjusted AIMD-style like TCP
+congestion control: until the first throttled response they grow by one per healthy
+response (slow start), afterwards by a little per window; a throttled response (HTTP
+429/403/5xx, timeout or connection error) cuts both by a factor, at most once per
+cooldown period.
+Throttled requests are retried with jittered exponential backoff; if every attempt
+is throttled, ThrottledError is raised so callers can tell "throttled" apart from
+"no data" and retry the ticker later instead of recording a wrong result.
+
+One limiter is shared per host within a process (see get_limiter), by both the
+active-tickers check and the financial data ETL, from threads or asyncio.
+"""
+
+import asyncio
+import logging
+import random
+import re
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from curl_cffi.requests.exceptions import ConnectionError as CurlConnectionError
+from curl_cffi.requests.exceptions import Timeout as CurlTimeout
+
+from config import (
+    RATE_LIMIT_BACKOFF,
+    RATE_LIMIT_INITIAL_CONCURRENCY,
+    RATE_LIMIT_INITIAL_RATE,
+    RATE_LIMIT_MAX_BACKOFF,
+    RATE_LIMIT_MAX_CONCURRENCY,
+    RATE_LIMIT_MAX_RATE,
+    RATE_LIMIT_MIN_RATE,
+    RATE_LIMIT_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# HTTP statuses Yahoo answers with when it throttles or is overloaded
+THROTTLE_STATUSES = {403, 429, 500, 502, 503, 504}
+# stockdex reports failed requests as RuntimeError("Failed to fetch URL (status N): ...")
+_STATUS_PATTERN = re.compile(r"status (\d{3})")
+
+
+class ThrottledError(RuntimeError):
+    """A request was throttled (or timed out) on every attempt; the result is unknown."""
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """True if exc means the request was throttled or failed transiently, not 'no data'."""
+    if isinstance(exc, (ThrottledError, CurlTimeout, CurlConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, RuntimeError):
+        message = str(exc)
+        if "Rate limited" in message or "Too Many Requests" in message:
+            return True
+        match = _STATUS_PATTERN.search(message)
+        return bool(match) and int(match.group(1)) in THROTTLE_STATUSES
+    return False
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket plus concurrency window with additive increase / multiplicative decrease.
+
+    acquire() (threads) or acquire_async() (asyncio) waits for a token and a free slot;
+    release(throttled) frees the slot and adapts the limits. Thread-safe; the asyncio
+    path polls try_acquire so one limiter can serve threads and event loops alike.
+    """
+
+    def __init__(
+        self,
+        name: str = "",
+        rate: float = RATE_LIMIT_INITIAL_RATE,
+        min_rate: float = RATE_LIMIT_MIN_RATE,
+        max_rate: float = RATE_LIMIT_MAX_RATE,
+        concurrency: int = RATE_LIMIT_INITIAL_CONCURRENCY,
+        max_concurrency: int = RATE_LIMIT_MAX_CONCURRENCY,
+        rate_increase: float = 0.5,
+        decrease_factor: float = 0.5,
+        cooldown: float = 2.0,
+    ):
+        self.name = name
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.rate_increase = rate_increase
+        self.decrease_factor = decrease_factor
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.requests = 0
+        self.throttled = 0
+        self._tokens = 1.0
+        self._refilled_at = time.monotonic()
+        self._last_decrease = 0.0
+        self._slow_start = True
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> float:
+        """
+        Take a token and a slot if both are available and return 0, else return the
+        seconds to wait.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                max(1.0, self.rate), self._tokens + (now - self._refilled_at) * self.rate
+            )
+            self._refilled_at = now
+            if self.in_flight >= int(self.concurrency):
+                return 0.01
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / self.rate
+            self._tokens -= 1.0
+            self.in_flight += 1
+            self.requests += 1
+            return 0.0
+
+    def acquire(self) -> None:
+        while (wait := self.try_acquire()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        while (wait := self.try_acquire()) > 0:
+            await asyncio.sleep(wait)
+
+    def release(self, throttled: bool | None = False) -> None:
+        """
+        Free a slot; grow the limits after a healthy response, cut them after a throttled
+        one. throttled=None (e.g. a cancelled request) leaves the limits unchanged.
+        """
+        with self._lock:
+            self.in_flight -= 1
+            if throttled is None:
+                return
+            if not throttled:
+                if self._slow_start:
+                    self.rate = min(self.max_rate, self.rate + 1)
+                    self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+                else:
+                    self.rate = min(self.max_rate, self.rate + self.rate_increase)
+                    # One extra slot per window's worth of healthy responses
+                    self.concurrency = min(
+                        self.max_concurrency, self.concurrency + 1 / self.concurrency
+                    )
+                return
+            self.throttled += 1
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._slow_start = False
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            self.concurrency = max(1.0, self.concurrency * self.decrease_factor)
+        logger.info(
+            f"Rate limiter {self.name}: throttled, backing off to {self.rate:.1f} req/s, "
+            f"{int(self.concurrency)} in flight"
+        )
+
+    def log_summary(self) -> None:
+        if self.requests:
+            logger.info(
+                f"Rate limiter {self.name} | {self.requests} requests, "
+                f"{self.throttled} throttled | final {self.rate:.1f} req/s, "
+                f"{int(self.concurrency)} in flight"
+            )
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for retry number attempt (0-based)."""
+    return random.uniform(0, min(RATE_LIMIT_MAX_BACKOFF, RATE_LIMIT_BACKOFF * 2**attempt))
+
+
+_limiters: dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(host: str) -> AdaptiveRateLimiter:
+    """The process-wide limiter for host, created with the config defaults on first use."""
+    with _limiters_lock:
+        if host not in _limiters:
+            _limiters[host] = AdaptiveRateLimiter(name=host)
+        return _limiters[host]
+
+
+def log_limiter_summaries() -> None:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        limiter.log_summary()
+
+
+def call_with_retries(
+    func: Callable[[], T], limiter: AdaptiveRateLimiter, retries: int = RATE_LIMIT_RETRIES
+) -> T:
+    """
+    Call func under limiter, retrying throttle errors (see is_throttle_error) with
+    jittered backoff. Other exceptions propagate unchanged. Raises ThrottledError if
+    every attempt is throttled.
+    """
+    for attempt in range(retries + 1):
+        limiter.acquire()
+        throttled = None
+        try:
+            result = func()
+            throttled = False
+            return result
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            if not throttled:
+                raise
+            if attempt == retries:
+                raise ThrottledError(f"Throttled after {retries + 1} attempts: {e}") from e
+        finally:
+            limiter.release(throttled)
+        time.sleep(backoff_delay(attempt))
+
+
+async def call_with_retries_async(
+    func: Callable[[], Awaitable[T]],
+    limiter: AdaptiveRateLimiter,
+    retries: int = RATE_LIMIT_RETRIES,
+) -> T:
+    """Asyncio version of call_with_retries; func returns a new awaitable per attempt."""
+    for attempt in range(retries + 1):
+        await limiter.acquire_async()
+        throttled = None
+        try:
+            result = await func()
+            throttled = False
+            return result
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            if not throttled:
+                raise
+            if attempt == retries:
+                raise ThrottledError(f"Throttled after {retries + 1} attempts: {e}") from e
+        finally:
+            # throttled stays None if the call was cancelled (e.g. by a per-ticker timeout)
+            limiter.release(throttled)
+        await asyncio.sleep(backoff_delay(attempt))
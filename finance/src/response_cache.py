@@ -0,0 +1,186 @@
+"""
+On-disk cache of Yahoo fundamentals-timeseries responses.
+
+Responses are stored zlib-compressed in a SQLite file, keyed by ticker and the
+requested type list, so repeated runs (after a crash, or the annual and quarterly
+runs of the same table, which fetch identical payloads) do not hit the network
+again. Entries expire after a TTL, and the least recently used ones are evicted once
+the cache exceeds its size bound. Hit, miss, expiry and eviction counts are logged
+at the end of each job.
+
+Used by yahoo_client.get_timeseries, i.e. the financial data ETL and the
+active-tickers 'light' probe. Safe to share between threads and processes.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from urllib.parse import parse_qs, urlsplit
+
+from config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_MAX_MB,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_TTL_HOURS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(ticker_symbol: str, url: str) -> str:
+    """
+    Key for a timeseries request: the ticker plus a hash of the requested types.
+    The URL's period timestamps change on every run, so the URL itself is not used.
+    """
+    types = parse_qs(urlsplit(url).query).get("type", [""])[0]
+    return f"{ticker_symbol.upper()}:{hashlib.sha1(types.encode()).hexdigest()[:16]}"
+
+
+class ResponseCache:
+    """SQLite-backed JSON response cache with TTL and size-bounded LRU eviction."""
+
+    def __init__(self, path: str, ttl_seconds: float, max_bytes: int):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evicted = 0
+        self._lock = threading.Lock()
+        self._conn: sqlite3.Connection | None = None
+        self._pid: int | None = None
+        # Approximate total size (other processes may write too); re-checked before evicting
+        self._total_bytes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        # Reconnect after a fork: SQLite connections must not be shared across processes
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # A lost entry after a power failure is just a cache miss; skip fsync per commit
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_idx ON responses (accessed_at)"
+            )
+            self._total_bytes = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM responses"
+            ).fetchone()[0]
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> dict | None:
+        """Cached payload for key, or None if missing or older than the TTL."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            row = conn.execute(
+                "SELECT body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            body, fetched_at = row
+            if now - fetched_at > self.ttl_seconds:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                conn.commit()
+                self._total_bytes -= len(body)
+                self.expired += 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+        return json.loads(zlib.decompress(body))
+
+    def put(self, key: str, payload: dict) -> None:
+        body = zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            old = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, size, fetched_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, body, len(body), now, now),
+            )
+            self._total_bytes += len(body) - (old[0] if old else 0)
+            if self._total_bytes > self.max_bytes:
+                self._evict(conn)
+            conn.commit()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Delete least recently used entries until the cache fits in max_bytes."""
+        self._total_bytes = conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()[0]
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Evict down to 90% of the bound so every put near the limit does not evict
+        excess = self._total_bytes - int(self.max_bytes * 0.9)
+        keys = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            keys.append((key,))
+            excess -= size
+            self._total_bytes -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key = ?", keys)
+        self.evicted += len(keys)
+
+    def log_summary(self) -> None:
+        lookups = self.hits + self.misses
+        if lookups:
+            logger.info(
+                f"Response cache | {self.hits} hits, {self.misses} misses "
+                f"({self.hits / lookups * 100:.1f}% hit rate), "
+                f"{self.expired} expired, {self.evicted} evicted"
+            )
+
+
+_cache: ResponseCache | None = None
+_cache_enabled = RESPONSE_CACHE_ENABLED
+_cache_lock = threading.Lock()
+
+
+def set_response_cache_enabled(enabled: bool) -> None:
+    """Turn the process-wide response cache on or off (e.g. for --no-cache)."""
+    global _cache_enabled
+    _cache_enabled = enabled
+
+
+def get_response_cache() -> ResponseCache | None:
+    """The process-wide response cache configured in config.py, or None if disabled."""
+    global _cache
+    if not _cache_enabled:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(
+                RESPONSE_CACHE_PATH,
+                ttl_seconds=RESPONSE_CACHE_TTL_HOURS * 3600,
+                max_bytes=RESPONSE_CACHE_MAX_MB * 1024 * 1024,
+            )
+        return _cache
+
+
+def log_response_cache_summary() -> None:
+    if _cache is not None:
+        _cache.log_summary()
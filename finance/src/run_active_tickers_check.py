@@ -6,27 +6,120 @@ against Yahoo Finance API and upsert results into the active_tickers table.
 
 Usage:
     python -m finance.src.run_active_tickers_check [--max-batches N]
+    python -m finance.src.run_active_tickers_check --mode async --concurrency 1000 \
+        --batch-size 5000
+
+With --run-state (needs the etl_runs migration, see run_migrations), a check that was
+killed or failed is resumed by the next run: only tickers not yet checked, or
+throttled, are probed again (--no-resume starts over). --cache serves the
+single and distributed modes' responses from the on-disk response cache when fresh.
+--metrics writes per-stage timings, Yahoo request outcomes per endpoint and the
+slowest tickers to metrics/ (JSON and Prometheus text format).
 """
 
 import argparse
 
+from config import (
+    ACTIVE_TICKERS_ASYNC_CONCURRENCY,
+    ACTIVE_TICKERS_BATCH_SIZE,
+    ACTIVE_TICKERS_PROBE,
+    ACTIVE_TICKERS_RECHECK_DAYS,
+    METRICS_DIR,
+    METRICS_ENABLED,
+    RESPONSE_CACHE_ENABLED,
+    RUN_STATE_ENABLED,
+)
 from finance.src.etl_job import ETLJob
+from finance.src.liveness_probe import PROBE_TYPES
 from finance.src.postgres_interface import PostgresInterface
+from finance.src.response_cache import set_response_cache_enabled
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--max-batches", type=int, default=None)
-    parser.add_argument("--mode", choices=["single", "distributed"], default="single",
-                        help="single: threaded in one process; distributed: multi-process + threads")
-    parser.add_argument("--threads", type=int, default=20, help="Max concurrent HTTP threads per process")
+    parser.add_argument(
+        "--mode",
+        choices=["single", "distributed", "async"],
+        default="single",
+        help="single: threaded in one process; distributed: multi-process + threads; "
+        "async: one event loop with a shared async HTTP client",
+    )
+    parser.add_argument(
+        "--threads", type=int, default=20, help="Max concurrent HTTP threads per process"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=ACTIVE_TICKERS_ASYNC_CONCURRENCY,
+        help="Max tickers in flight in async mode",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=ACTIVE_TICKERS_BATCH_SIZE,
+        help="Tickers per upsert batch (use a few times --concurrency in async mode)",
+    )
+    parser.add_argument(
+        "--probe",
+        choices=PROBE_TYPES,
+        default=ACTIVE_TICKERS_PROBE,
+        help="light: check the raw Yahoo response for data; full: build the "
+        "statement DataFrame with stockdex (single/distributed modes)",
+    )
+    parser.add_argument(
+        "--recheck-days",
+        type=int,
+        default=ACTIVE_TICKERS_RECHECK_DAYS,
+        help="Also re-check tickers last checked more than N days ago, oldest first",
+    )
+    parser.add_argument(
+        "--no-recheck", action="store_true", help="Only check tickers not yet in active_tickers"
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=RESPONSE_CACHE_ENABLED,
+        help="Serve Yahoo responses from the on-disk cache when fresh (not async)",
+    )
+    parser.add_argument(
+        "--run-state",
+        action=argparse.BooleanOptionalAction,
+        default=RUN_STATE_ENABLED,
+        help="Record per-ticker outcomes in etl_runs / etl_run_tickers (needs "
+        "the etl_runs migration, see run_migrations)",
+    )
+    parser.add_argument(
+        "--resume",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Resume the interrupted check from the etl_runs table; "
+        "--no-resume starts a new run",
+    )
+    parser.add_argument(
+        "--metrics",
+        action=argparse.BooleanOptionalAction,
+        default=METRICS_ENABLED,
+        help="Record per-stage timings, Yahoo request outcomes and the slowest tickers, "
+        "written to --metrics-dir as a JSON summary and a Prometheus text file",
+    )
+    parser.add_argument("--metrics-dir", default=METRICS_DIR)
     args = parser.parse_args()
 
+    set_response_cache_enabled(args.cache)
     postgres_interface = PostgresInterface()
     etl_job = ETLJob(
         postgres_interface=postgres_interface,
+        batch_size=args.batch_size,
         mode=args.mode,
         max_threads=args.threads,
+        max_concurrency=args.concurrency,
+        probe=args.probe,
+        recheck_days=None if args.no_recheck else args.recheck_days,
+        run_state=args.run_state,
+        resume=args.resume,
+        metrics=args.metrics,
+        metrics_dir=args.metrics_dir,
     )
     etl_job.run_active_tickers_check(max_batches=args.max_batches)
 
@@ -0,0 +1,114 @@
+"""
+Runner script for the migration of the statement tables to dictionary-encoded storage
+(see statement_encoding).
+
+Usage:
+    python -m finance.src.run_encode_statements --table income_stmt
+    python -m finance.src.run_encode_statements --table all [--drop-text] [--sample-tickers 200]
+
+Each table is converted in one transaction, during which ETL writes to it wait; stop
+the ETL jobs first. The text table is kept as <table>_text unless --drop-text is
+given. Prints every table's size and the latency of a per-ticker read (the query of
+/api/financial_data) before and after the migration.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from config import FINANCIAL_TABLES, SCHEMA
+from finance.src.postgres_interface import PostgresInterface
+from finance.src.statement_encoding import (
+    METRIC_IDS_TABLE,
+    TICKER_IDS_TABLE,
+    migrate_table,
+    relation_size,
+    statement_layout,
+)
+
+
+def time_ticker_reads(engine, table_name: str, tickers: list[str]) -> tuple[float, float]:
+    """Mean and p95 latency (ms) of reading all rows of each ticker from table_name."""
+    query = text(
+        f"""
+        SELECT frequency, report_date, metric, value FROM {SCHEMA}.{table_name}
+        WHERE ticker = :ticker ORDER BY frequency, report_date, metric
+    """
+    )
+    latencies = []
+    with engine.connect() as conn:
+        for ticker in tickers:
+            start = time.perf_counter()
+            conn.execute(query, {"ticker": ticker}).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[max(0, int(len(latencies) * 0.95) - 1)]
+
+
+def format_size(size: dict) -> str:
+    """Heap and index size of a relation_size result, in MB."""
+    return f"{size['table_bytes'] / 2**20:.1f} MB + {size['index_bytes'] / 2**20:.1f} MB index"
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Migrate statement tables to dictionary-encoded storage"
+    )
+    parser.add_argument(
+        "--table",
+        required=True,
+        choices=list(FINANCIAL_TABLES.keys()) + ["all"],
+        help="Table to migrate, or 'all'",
+    )
+    parser.add_argument(
+        "--drop-text",
+        action="store_true",
+        help="Drop the text tables instead of keeping them as <table>_text",
+    )
+    parser.add_argument(
+        "--sample-tickers",
+        type=int,
+        default=200,
+        help="Tickers read per table to time reads before and after (0: skip)",
+    )
+    args = parser.parse_args()
+
+    engine = PostgresInterface().get_engine()
+    tables = list(FINANCIAL_TABLES) if args.table == "all" else [args.table]
+    for table_name in tables:
+        if statement_layout(engine, table_name).encoded:
+            print(f"{table_name}: already encoded")
+            continue
+        with engine.connect() as conn:
+            tickers = [
+                row[0]
+                for row in conn.execute(text(f"SELECT DISTINCT ticker FROM {SCHEMA}.{table_name}"))
+            ]
+        sample = random.Random(0).sample(tickers, min(args.sample_tickers, len(tickers)))
+        # Warm up the cache, so both timings read from memory
+        if sample:
+            time_ticker_reads(engine, table_name, sample)
+            before_ms = time_ticker_reads(engine, table_name, sample)
+
+        result = migrate_table(engine, table_name, drop_text=args.drop_text)
+        print(f"{table_name}: {result['rows']} rows")
+        print(f"  text:    {format_size(result['before'])}")
+        print(f"  encoded: {format_size(result['after'])}")
+        if sample:
+            time_ticker_reads(engine, table_name, sample)
+            after_ms = time_ticker_reads(engine, table_name, sample)
+            print(
+                f"  per-ticker read: mean {before_ms[0]:.2f} -> {after_ms[0]:.2f} ms, "
+                f"p95 {before_ms[1]:.2f} -> {after_ms[1]:.2f} ms ({len(sample)} tickers)"
+            )
+
+    with engine.connect() as conn:
+        for dimension in (TICKER_IDS_TABLE, METRIC_IDS_TABLE):
+            print(f"{dimension}: {format_size(relation_size(conn, dimension))}")
+
+
+if __name__ == "__main__":
+    main()
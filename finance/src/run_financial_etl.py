@@ -6,13 +6,69 @@ Usage:
     python -m finance.src.run_financial_etl --table cash_flow [--max-batches N]
     python -m finance.src.run_financial_etl --table balance_sheet [--max-batches N]
     python -m finance.src.run_financial_etl --table financials [--max-batches N]
+    python -m finance.src.run_financial_etl --table all [--max-batches N]
+
+--table all fetches every table for a ticker in one pass and upserts them together.
+--pipeline streams tickers through concurrent fetch, melt and load stages.
+--sharded makes several copies of the job (on one or many machines) claim disjoint
+batches through the etl_leases table; --workers N starts N such processes here.
+--cache serves Yahoo responses from the on-disk response cache when fresh.
+--rebuild-freshness recomputes the statement_freshness rows the work queue is read
+from, e.g. after the statement tables were changed by hand; --rebuild-latest does the
+same for the statement_latest rows /api/screen reads.
+With --run-state, a run that was killed or failed is resumed by the next run of the
+same job: only its pending and transiently failed tickers are fetched (--no-resume
+starts over). --sharded, --run-state and the freshness and latest-value tables need
+their schema migrations (python -m finance.src.run_migrations).
+--metrics writes per-stage timings (fetch, melt, upsert, ...), Yahoo request outcomes
+per endpoint and the slowest tickers to metrics/ (JSON and Prometheus text format).
 """
 
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 
-from config import ETL_BATCH_SIZE, ETL_THREADS, FINANCIAL_TABLES
-from finance.src.financial_data_etl import FinancialDataETL
+from config import (
+    ETL_BATCH_SIZE,
+    ETL_LOAD_METHOD,
+    ETL_PIPELINE,
+    ETL_SHARDED,
+    ETL_THREADS,
+    FINANCIAL_TABLES,
+    METRICS_DIR,
+    METRICS_ENABLED,
+    RESPONSE_CACHE_ENABLED,
+    RUN_STATE_ENABLED,
+)
+from finance.src.financial_data_etl import LOAD_METHODS, FinancialDataETL, MultiTableFinancialETL
 from finance.src.postgres_interface import PostgresInterface
+from finance.src.response_cache import set_response_cache_enabled
+from finance.src.statement_snapshots import rebuild_freshness, rebuild_latest
+
+
+def build_etl(args: argparse.Namespace, postgres_interface: PostgresInterface | None = None):
+    """The ETL job described by the command-line arguments."""
+    options = dict(
+        postgres_interface=postgres_interface or PostgresInterface(),
+        batch_size=args.batch_size,
+        max_threads=args.threads,
+        frequency=args.frequency,
+        load_method=args.load_method,
+        pipeline=args.pipeline,
+        sharded=args.sharded or args.workers > 1,
+        run_state=args.run_state,
+        resume=args.resume,
+        metrics=args.metrics,
+        metrics_dir=args.metrics_dir,
+    )
+    if args.table == "all":
+        return MultiTableFinancialETL(**options)
+    return FinancialDataETL(table_name=args.table, **options)
+
+
+def _run_worker(args: argparse.Namespace) -> None:
+    """Entry point of one --workers process (own engine and connection pool)."""
+    set_response_cache_enabled(args.cache)
+    build_etl(args).run(max_batches=args.max_batches)
 
 
 def main():
@@ -20,24 +76,98 @@ def main():
     parser.add_argument(
         "--table",
         required=True,
-        choices=list(FINANCIAL_TABLES.keys()),
-        help="Target table to populate",
+        choices=list(FINANCIAL_TABLES.keys()) + ["all"],
+        help="Target table to populate, or 'all' for every table in one pass",
     )
     parser.add_argument("--max-batches", type=int, default=None)
     parser.add_argument("--batch-size", type=int, default=ETL_BATCH_SIZE)
     parser.add_argument("--threads", type=int, default=ETL_THREADS)
     parser.add_argument("--frequency", type=str, default=None, choices=["annual", "quarterly"])
+    parser.add_argument(
+        "--load-method",
+        default=ETL_LOAD_METHOD,
+        choices=list(LOAD_METHODS),
+        help="insert: executemany INSERT; copy: COPY into a staging table, then delete and "
+        "re-insert from staging; incremental: upsert only new/changed rows on the natural key "
+        "(needs the ticker_natural_keys migration)",
+    )
+    parser.add_argument(
+        "--cache",
+        action=argparse.BooleanOptionalAction,
+        default=RESPONSE_CACHE_ENABLED,
+        help="Serve Yahoo responses from the on-disk response cache when fresh",
+    )
+    parser.add_argument(
+        "--pipeline",
+        action=argparse.BooleanOptionalAction,
+        default=ETL_PIPELINE,
+        help="Fetch, melt and load concurrently through bounded queues, "
+        "writing by row count or time instead of per batch",
+    )
+    parser.add_argument(
+        "--rebuild-freshness",
+        action="store_true",
+        help="Recompute the statement_freshness rows of the target tables "
+        "from the statement tables before running",
+    )
+    parser.add_argument(
+        "--rebuild-latest",
+        action="store_true",
+        help="Recompute the statement_latest rows (latest value per ticker and "
+        "metric) of the target tables from the statement tables before running",
+    )
+    parser.add_argument(
+        "--sharded",
+        action=argparse.BooleanOptionalAction,
+        default=ETL_SHARDED,
+        help="Claim batches through the etl_leases table, so several copies of "
+        "this job (on one or many machines) process disjoint tickers",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Run N sharded worker processes on this machine (implies --sharded)",
+    )
+    parser.add_argument(
+        "--run-state",
+        action=argparse.BooleanOptionalAction,
+        default=RUN_STATE_ENABLED,
+        help="Record per-ticker outcomes in etl_runs / etl_run_tickers (needs "
+        "the etl_runs migration, see run_migrations)",
+    )
+    parser.add_argument(
+        "--resume",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Resume the job's interrupted run from the etl_runs table; "
+        "--no-resume starts a new run",
+    )
+    parser.add_argument(
+        "--metrics",
+        action=argparse.BooleanOptionalAction,
+        default=METRICS_ENABLED,
+        help="Record per-stage timings, Yahoo request outcomes and the slowest tickers, "
+        "written to --metrics-dir as a JSON summary and a Prometheus text file",
+    )
+    parser.add_argument("--metrics-dir", default=METRICS_DIR)
     args = parser.parse_args()
 
+    set_response_cache_enabled(args.cache)
     postgres_interface = PostgresInterface()
-    etl = FinancialDataETL(
-        table_name=args.table,
-        postgres_interface=postgres_interface,
-        batch_size=args.batch_size,
-        max_threads=args.threads,
-        frequency=args.frequency,
-    )
-    etl.run(max_batches=args.max_batches)
+    if args.rebuild_freshness:
+        tables = list(FINANCIAL_TABLES) if args.table == "all" else [args.table]
+        rebuild_freshness(postgres_interface.get_engine(), tables)
+    if args.rebuild_latest:
+        tables = list(FINANCIAL_TABLES) if args.table == "all" else [args.table]
+        rebuild_latest(postgres_interface.get_engine(), tables)
+    if args.workers > 1:
+        # --max-batches applies per worker
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            for future in [executor.submit(_run_worker, args) for _ in range(args.workers)]:
+                future.result()
+    else:
+        build_etl(args, postgres_interface).run(max_batches=args.max_batches)
 
 
 if __name__ == "__main__":
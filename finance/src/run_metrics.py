@@ -0,0 +1,336 @@
+"""
+Per-stage metrics of ETL runs.
+
+The jobs time their stages into the process's current RunMetrics:
+
+- latency histograms per stage: priority_query, fetch, melt, upsert and batch for
+  the financial data ETL, priority_query, probe and upsert for the active tickers
+  check, yahoo_request for every Yahoo request
+- Yahoo requests per endpoint and outcome: ok, cached, throttled, timeout, error
+- the slowest tickers per stage (METRICS_SLOWEST_N)
+
+At the end of a run they are written to METRICS_DIR as a JSON run summary
+(<job>-<start time>.json) and a Prometheus text-format file (<job>.prom, replaced on
+every run, for node_exporter's textfile collector), and the stage timings are logged.
+Sharded workers add their worker id to both file names and to the labels.
+
+Metrics are off unless METRICS_ENABLED or --metrics is set: current() is then a
+NullMetrics whose methods do nothing, so instrumented code pays one no-op call per
+event. Distributed-mode workers send snapshot()s back to be merge()d, like
+liveness_probe.ProbeStats.
+"""
+
+import contextlib
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from config import METRICS_SLOWEST_N
+from finance.src.rate_limiter import ThrottledError, is_throttle_error
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the histogram buckets, as in Prometheus client defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, float("inf"))
+OUTCOMES = ("ok", "cached", "throttled", "timeout", "error")
+# Observations kept per histogram (reservoir sampling) for the summary's percentiles
+RESERVOIR_SIZE = 2048
+
+
+def request_outcome(exc: BaseException | None) -> str:
+    """Outcome of a Yahoo request that raised exc (None: it succeeded)."""
+    if exc is None:
+        return "ok"
+    if isinstance(exc, ThrottledError) and exc.__cause__ is not None:
+        exc = exc.__cause__
+    if isinstance(exc, TimeoutError) or "Timeout" in type(exc).__name__:
+        return "timeout"
+    return "throttled" if is_throttle_error(exc) else "error"
+
+
+class Histogram:
+    """
+    Latency histogram (not thread-safe; RunMetrics locks): bucket counts for Prometheus,
+    and a uniform sample of up to RESERVOIR_SIZE observations for percentiles, exact
+    for runs with fewer observations.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.samples: list[float] = []
+
+    def observe(self, seconds: float) -> None:
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                self.buckets[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(seconds)
+        else:
+            j = random.randrange(self.count)
+            if j < RESERVOIR_SIZE:
+                self.samples[j] = seconds
+
+    def quantile(self, q: float) -> float:
+        """The q-quantile of the sampled observations (nearest rank)."""
+        if not self.samples:
+            return 0.0
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, max(0, int(q * len(samples) + 0.5) - 1))]
+
+    def snapshot(self) -> dict:
+        return {
+            "buckets": list(self.buckets),
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "samples": list(self.samples),
+        }
+
+    def merge(self, snapshot: dict) -> None:
+        self.buckets = [a + b for a, b in zip(self.buckets, snapshot["buckets"])]
+        self.count += snapshot["count"]
+        self.sum += snapshot["sum"]
+        self.max = max(self.max, snapshot["max"])
+        samples = self.samples + snapshot["samples"]
+        self.samples = (
+            samples if len(samples) <= RESERVOIR_SIZE else random.sample(samples, RESERVOIR_SIZE)
+        )
+
+
+class RunMetrics:
+    """Thread-safe stage histograms, request counters and slowest tickers of one run."""
+
+    def __init__(self, job: str, worker: str | None = None, slowest_n: int = METRICS_SLOWEST_N):
+        self.job = job
+        self.worker = worker  # sharded runs: the worker id, so workers do not overwrite each other
+        self.slowest_n = slowest_n
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages: dict[str, Histogram] = defaultdict(Histogram)
+        self._requests: dict[tuple[str, str], int] = defaultdict(int)
+        self._slowest: dict[str, list[tuple[float, str]]] = defaultdict(list)  # min-heaps
+
+    def observe(self, stage: str, seconds: float, ticker: str | None = None) -> None:
+        with self._lock:
+            self._stages[stage].observe(seconds)
+            if ticker is not None:
+                self._push_slowest(stage, seconds, ticker)
+
+    def _push_slowest(self, stage: str, seconds: float, ticker: str) -> None:
+        heap = self._slowest[stage]
+        if len(heap) < self.slowest_n:
+            heapq.heappush(heap, (seconds, ticker))
+        elif seconds > heap[0][0]:
+            heapq.heapreplace(heap, (seconds, ticker))
+
+    @contextlib.contextmanager
+    def timer(self, stage: str, ticker: str | None = None):
+        """Observe the duration of the with block (also if it raises)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, ticker)
+
+    def count_request(self, endpoint: str, outcome: str) -> None:
+        with self._lock:
+            self._requests[(endpoint, outcome)] += 1
+
+    def snapshot(self) -> dict:
+        """Plain-dict copy of everything recorded (picklable)."""
+        with self._lock:
+            return {
+                "stages": {stage: h.snapshot() for stage, h in self._stages.items()},
+                "requests": [
+                    [endpoint, outcome, n] for (endpoint, outcome), n in self._requests.items()
+                ],
+                "slowest": {stage: list(heap) for stage, heap in self._slowest.items()},
+            }
+
+    def merge(self, snapshot: dict) -> None:
+        """Add another RunMetrics.snapshot() (e.g. of a worker process) into this one."""
+        with self._lock:
+            for stage, histogram in snapshot["stages"].items():
+                self._stages[stage].merge(histogram)
+            for endpoint, outcome, n in snapshot["requests"]:
+                self._requests[(endpoint, outcome)] += n
+            for stage, entries in snapshot["slowest"].items():
+                for seconds, ticker in entries:
+                    self._push_slowest(stage, seconds, ticker)
+
+    def summary(self, totals: dict | None = None, completed: bool = True) -> dict:
+        """The JSON run summary: stage percentiles, request counts, slowest tickers."""
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "total_seconds": round(h.sum, 3),
+                    "mean_ms": round(h.sum / h.count * 1000, 1) if h.count else 0.0,
+                    "p50_ms": round(h.quantile(0.5) * 1000, 1),
+                    "p95_ms": round(h.quantile(0.95) * 1000, 1),
+                    "p99_ms": round(h.quantile(0.99) * 1000, 1),
+                    "max_ms": round(h.max * 1000, 1),
+                }
+                for stage, h in sorted(self._stages.items())
+            }
+            requests = defaultdict(lambda: dict.fromkeys(OUTCOMES, 0))
+            for (endpoint, outcome), n in self._requests.items():
+                requests[endpoint][outcome] += n
+            slowest = {
+                stage: [
+                    {"ticker": ticker, "seconds": round(seconds, 3)}
+                    for seconds, ticker in sorted(heap, reverse=True)
+                ]
+                for stage, heap in sorted(self._slowest.items())
+            }
+        return {
+            "job": self.job,
+            "worker": self.worker,
+            "started_at": self.started_at.isoformat(),
+            "seconds": round(time.perf_counter() - self._start, 3),
+            "completed": completed,
+            "totals": totals or {},
+            "stages": stages,
+            "requests": dict(sorted(requests.items())),
+            "slowest": slowest,
+        }
+
+    def prometheus(self, totals: dict | None = None, completed: bool = True) -> str:
+        """The metrics in the Prometheus text exposition format."""
+        job = _label_value(self.job)
+        if self.worker is not None:
+            job += f'",worker="{_label_value(self.worker)}'
+        duration = time.perf_counter() - self._start
+        lines = [
+            "# HELP finance_etl_stage_seconds Duration of ETL run stages.",
+            "# TYPE finance_etl_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, h in sorted(self._stages.items()):
+                labels = f'job="{job}",stage="{stage}"'
+                cumulative = 0
+                for bound, n in zip(BUCKETS, h.buckets):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(
+                        f'finance_etl_stage_seconds_bucket{{{labels},le="{le}"}} {cumulative}'
+                    )
+                lines.append(f"finance_etl_stage_seconds_sum{{{labels}}} {h.sum:.6f}")
+                lines.append(f"finance_etl_stage_seconds_count{{{labels}}} {h.count}")
+            lines += [
+                "# HELP finance_etl_yahoo_requests_total Yahoo requests by endpoint and outcome.",
+                "# TYPE finance_etl_yahoo_requests_total counter",
+            ]
+            for (endpoint, outcome), n in sorted(self._requests.items()):
+                labels = f'job="{job}",endpoint="{endpoint}",outcome="{outcome}"'
+                lines.append(f"finance_etl_yahoo_requests_total{{{labels}}} {n}")
+        lines += [
+            "# HELP finance_etl_run_totals Totals of the last run "
+            "(tickers by result, rows written).",
+            "# TYPE finance_etl_run_totals gauge",
+        ]
+        for name, value in sorted((totals or {}).items()):
+            lines.append(f'finance_etl_run_totals{{job="{job}",total="{name}"}} {value}')
+        lines += [
+            "# HELP finance_etl_run_duration_seconds Duration of the last run.",
+            "# TYPE finance_etl_run_duration_seconds gauge",
+            f'finance_etl_run_duration_seconds{{job="{job}"}} {duration:.3f}',
+            "# HELP finance_etl_run_completed Whether the last run completed (1) "
+            "or was interrupted (0).",
+            "# TYPE finance_etl_run_completed gauge",
+            f'finance_etl_run_completed{{job="{job}"}} {int(completed)}',
+            "# HELP finance_etl_run_finished_timestamp_seconds When the last run finished.",
+            "# TYPE finance_etl_run_finished_timestamp_seconds gauge",
+            f'finance_etl_run_finished_timestamp_seconds{{job="{job}"}} {time.time():.0f}',
+        ]
+        return "\n".join(lines) + "\n"
+
+    def write(self, out_dir: str, totals: dict | None = None, completed: bool = True) -> None:
+        """Write the JSON summary and the Prometheus file to out_dir and log the stage timings."""
+        summary = self.summary(totals, completed)
+        name = _file_name(self.job if self.worker is None else f"{self.job}.{self.worker}")
+        os.makedirs(out_dir, exist_ok=True)
+        json_path = os.path.join(out_dir, f"{name}-{self.started_at:%Y%m%dT%H%M%S}.json")
+        _write_atomic(json_path, json.dumps(summary, indent=2))
+        _write_atomic(os.path.join(out_dir, f"{name}.prom"), self.prometheus(totals, completed))
+
+        logger.info(f"[{self.job}] Stage timings | {summary['seconds']:.1f}s run")
+        for stage, s in summary["stages"].items():
+            logger.info(
+                f"  {stage}: {s['count']} x mean {s['mean_ms']:.0f}ms, p95 {s['p95_ms']:.0f}ms, "
+                f"max {s['max_ms']:.0f}ms, total {s['total_seconds']:.1f}s"
+            )
+        for endpoint, outcomes in summary["requests"].items():
+            logger.info(f"  {endpoint}: {', '.join(f'{o}={n}' for o, n in outcomes.items() if n)}")
+        for stage, entries in summary["slowest"].items():
+            top = ", ".join(f"{e['ticker']} {e['seconds']:.1f}s" for e in entries[:5])
+            logger.info(f"  slowest {stage}: {top}")
+        logger.info(f"[{self.job}] Metrics written to {json_path}")
+
+
+class NullMetrics:
+    """Disabled metrics: every method does nothing."""
+
+    _timer = contextlib.nullcontext()
+
+    def observe(self, stage: str, seconds: float, ticker: str | None = None) -> None:
+        pass
+
+    def timer(self, stage: str, ticker: str | None = None):
+        return self._timer
+
+    def count_request(self, endpoint: str, outcome: str) -> None:
+        pass
+
+    def snapshot(self) -> None:
+        return None
+
+    def merge(self, snapshot: dict | None) -> None:
+        pass
+
+    def write(self, out_dir: str, totals: dict | None = None, completed: bool = True) -> None:
+        pass
+
+
+NULL_METRICS = NullMetrics()
+_current: RunMetrics | NullMetrics = NULL_METRICS
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _file_name(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "._-" else "_" for c in name)
+
+
+def _write_atomic(path: str, content: str) -> None:
+    with open(f"{path}.tmp", "w") as f:
+        f.write(content)
+    os.replace(f"{path}.tmp", path)
+
+
+def start_run(job: str, enabled: bool, worker: str | None = None) -> RunMetrics | NullMetrics:
+    """Make a new RunMetrics for job (NULL_METRICS if not enabled) the process's current one."""
+    global _current
+    _current = RunMetrics(job, worker) if enabled else NULL_METRICS
+    return _current
+
+
+def current() -> RunMetrics | NullMetrics:
+    """The metrics of the run in progress in this process (NULL_METRICS if disabled)."""
+    return _current
@@ -0,0 +1,142 @@
+"""
+Runner script for the schema migrations of the finance schema.
+
+Usage:
+    python -m finance.src.run_migrations               # apply the pending migrations
+    python -m finance.src.run_migrations --status      # list applied and pending migrations
+    python -m finance.src.run_migrations --print-sql   # print the SQL of the pending migrations
+
+Migrations run in order, each in its own transaction, and are recorded in the
+schema_migrations table (see schema_migrations), so running this again only applies
+the new ones. Stop the ETL jobs while applying: the statement_freshness and
+statement_latest migrations backfill from the statement tables, and the jobs start
+maintaining those tables as soon as the migration is recorded.
+
+- statement_freshness: last load per (table, ticker, frequency); the ETL work queue
+  reads it instead of aggregating the statement tables
+- etl_leases: work claims of sharded ETL runs (--sharded, --workers)
+- etl_runs: per-ticker run state of both jobs (--run-state, RUN_STATE_ENABLED)
+- ticker_natural_keys: upper-cases the tickers of active_tickers and the statement
+  tables and creates the natural-key index of the text statement tables (see
+  ticker_keys); needed by the incremental load method
+- statement_latest: latest value per (table, ticker, frequency, metric), read by
+  /api/screen
+"""
+
+import argparse
+import logging
+import textwrap
+from typing import Callable, NamedTuple
+
+from sqlalchemy import text
+
+from config import FINANCIAL_TABLES, SCHEMA
+from finance.src.postgres_interface import PostgresInterface
+from finance.src.run_state import RUN_STATE_DDL, RUNS_TABLE
+from finance.src.schema_migrations import applied_migrations, record_migration
+from finance.src.statement_snapshots import (
+    FRESHNESS_DDL,
+    FRESHNESS_TABLE,
+    LATEST_DDL,
+    LATEST_TABLE,
+    backfill_freshness,
+    backfill_latest,
+)
+from finance.src.ticker_keys import (
+    ACTIVE_TICKERS_SQL,
+    TICKER_KEYS_MIGRATION,
+    drop_mixed_case_ticker_ids,
+    normalize_statement_table,
+)
+from finance.src.work_leases import LEASE_TABLE, LEASES_DDL
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+class Migration(NamedTuple):
+    name: str
+    statements: list[str]  # SQL, run in order
+    backfill: Callable[[object, str], None] | None = None  # run per existing statement table
+    finish: Callable[[object], None] | None = None  # run once after the backfill
+
+
+MIGRATIONS = [
+    Migration(FRESHNESS_TABLE, FRESHNESS_DDL, backfill_freshness),
+    Migration(LEASE_TABLE, LEASES_DDL),
+    Migration(RUNS_TABLE, RUN_STATE_DDL),
+    Migration(
+        TICKER_KEYS_MIGRATION,
+        ACTIVE_TICKERS_SQL,
+        normalize_statement_table,
+        drop_mixed_case_ticker_ids,
+    ),
+    Migration(LATEST_TABLE, LATEST_DDL, backfill_latest),
+]
+
+
+def existing_statement_tables(conn) -> list[str]:
+    """The statement tables of FINANCIAL_TABLES that exist in SCHEMA."""
+    return [
+        table_name
+        for table_name in FINANCIAL_TABLES
+        if conn.execute(text(f"SELECT to_regclass('{SCHEMA}.{table_name}')")).scalar()
+    ]
+
+
+def apply_migration(engine, migration: Migration) -> None:
+    """Run migration's statements, backfill and finish and record it, in one transaction."""
+    with engine.begin() as conn:
+        for statement in migration.statements:
+            conn.execute(text(statement))
+        if migration.backfill is not None:
+            for table_name in existing_statement_tables(conn):
+                migration.backfill(conn, table_name)
+                logger.info(f"[{migration.name}] Applied to {table_name}")
+        if migration.finish is not None:
+            migration.finish(conn)
+        record_migration(conn, migration.name)
+    logger.info(f"Applied migration {migration.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply the finance schema migrations")
+    parser.add_argument(
+        "--status", action="store_true", help="List the applied and pending migrations and exit"
+    )
+    parser.add_argument(
+        "--print-sql", action="store_true", help="Print the SQL of the pending migrations and exit"
+    )
+    args = parser.parse_args()
+
+    engine = PostgresInterface().get_engine()
+    with engine.connect() as conn:
+        applied = applied_migrations(conn)
+    pending = [migration for migration in MIGRATIONS if migration.name not in applied]
+
+    if args.status:
+        for migration in MIGRATIONS:
+            status = (
+                f"applied {applied[migration.name]}" if migration.name in applied else "pending"
+            )
+            print(f"{migration.name}: {status}")
+        return
+    if args.print_sql:
+        for migration in pending:
+            print(f"-- {migration.name}")
+            for statement in migration.statements:
+                print(f"{textwrap.dedent(statement).strip()};")
+            if migration.backfill is not None:
+                print(f"-- then per statement table: {migration.backfill.__name__}")
+            if migration.finish is not None:
+                print(f"-- then: {migration.finish.__name__}")
+        return
+
+    if not pending:
+        logger.info("No pending migrations")
+    for migration in pending:
+        apply_migration(engine, migration)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Runner script for the Parquet export of the statement tables.
+
+Usage:
+    python -m finance.src.run_parquet_export --table income_stmt [--layout long|wide]
+    python -m finance.src.run_parquet_export --table all --layout wide --out-dir /data/finance
+
+Only partitions (frequency, report year) with rows inserted since the previous export
+are rewritten; --full rewrites every partition. Incremental exports do not see deleted
+rows, so run --full after deleting rows and periodically (see parquet_export).
+"""
+
+import argparse
+
+from config import FINANCIAL_TABLES, PARQUET_EXPORT_CHUNK_ROWS, PARQUET_EXPORT_DIR
+from finance.src.parquet_export import LAYOUTS, export_tables
+from finance.src.postgres_interface import PostgresInterface
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export statement tables to partitioned Parquet")
+    parser.add_argument(
+        "--table",
+        required=True,
+        choices=list(FINANCIAL_TABLES.keys()) + ["all"],
+        help="Table to export, or 'all'",
+    )
+    parser.add_argument(
+        "--layout",
+        choices=LAYOUTS,
+        default="long",
+        help="long: table rows with dictionary-encoded ticker/metric; "
+        "wide: one row per ticker and report date, one column per metric",
+    )
+    parser.add_argument("--out-dir", default=PARQUET_EXPORT_DIR)
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="Rewrite every partition instead of those touched since the last export",
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        default=PARQUET_EXPORT_CHUNK_ROWS,
+        help="Rows fetched from Postgres per chunk",
+    )
+    args = parser.parse_args()
+
+    tables = list(FINANCIAL_TABLES) if args.table == "all" else [args.table]
+    export_tables(
+        PostgresInterface().get_engine(),
+        tables,
+        args.out_dir,
+        layout=args.layout,
+        full=args.full,
+        chunk_rows=args.chunk_rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Runner script for the maintenance of partitioned statement tables (see
+statement_partitioning).
+
+Usage:
+    python -m finance.src.run_partition_statements --table all [--ticker-partitions 16]
+    python -m finance.src.run_partition_statements --table income_stmt --status
+    python -m finance.src.run_partition_statements --table income_stmt --print-ddl
+
+Partitions each table's dictionary-encoded data, or repartitions it if it has a
+different number of ticker partitions, in one transaction during which ETL writes to
+it wait; stop the ETL jobs first. Tables still in the text layout are encoded first
+(see run_encode_statements). Prints every table's size and the latency of a
+per-ticker read before and after.
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from config import FINANCIAL_TABLES, SCHEMA, STATEMENT_TICKER_PARTITIONS
+from finance.src.postgres_interface import PostgresInterface
+from finance.src.run_encode_statements import format_size, time_ticker_reads
+from finance.src.statement_encoding import TICKER_IDS_TABLE, migrate_table, statement_layout
+from finance.src.statement_partitioning import partition_ddl, partition_sizes, partition_table
+
+
+def time_ticker_id_reads(engine, table_name: str, ticker_ids: list[int]) -> tuple[float, float]:
+    """
+    Mean and p95 latency (ms) of reading all rows of each ticker id from <table>_data,
+    the pruned read of /api/financial_data.
+    """
+    query = text(
+        f"""
+        SELECT frequency_id, report_date, metric_id, value FROM {SCHEMA}.{table_name}_data
+        WHERE ticker_id = :ticker_id
+    """
+    )
+    latencies = []
+    with engine.connect() as conn:
+        for ticker_id in ticker_ids:
+            start = time.perf_counter()
+            conn.execute(query, {"ticker_id": ticker_id}).all()
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return statistics.mean(latencies), latencies[max(0, int(len(latencies) * 0.95) - 1)]
+
+
+def _time_reads(engine, table_name: str, sample: list[tuple[str, int]]) -> dict:
+    """Latencies of reading the sampled tickers through the view and by id, warmed up."""
+    timings = {}
+    for read, timer, keys in (
+        ("view", time_ticker_reads, [ticker for ticker, _ in sample]),
+        ("by id", time_ticker_id_reads, [ticker_id for _, ticker_id in sample]),
+    ):
+        # Warm up the cache, so both timings read from memory
+        timer(engine, table_name, keys)
+        timings[read] = timer(engine, table_name, keys)
+    return timings
+
+
+def print_status(engine, table_name: str) -> None:
+    """Print the storage partitions of table_name with their size."""
+    if not statement_layout(engine, table_name).encoded:
+        print(f"{table_name}: text layout, not partitioned")
+        return
+    with engine.connect() as conn:
+        sizes = partition_sizes(conn, table_name)
+    for size in sizes:
+        print(f"{size['partition']:<36} {size['rows']:>10} rows  {format_size(size)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Partition the statement tables by frequency and ticker"
+    )
+    parser.add_argument(
+        "--table",
+        required=True,
+        choices=list(FINANCIAL_TABLES.keys()) + ["all"],
+        help="Table to partition, or 'all'",
+    )
+    parser.add_argument(
+        "--ticker-partitions",
+        type=int,
+        default=STATEMENT_TICKER_PARTITIONS,
+        help="Hash partitions by ticker per frequency",
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="Print the partitions and their size, then exit"
+    )
+    parser.add_argument(
+        "--print-ddl", action="store_true", help="Print the partitioned table's DDL, then exit"
+    )
+    parser.add_argument(
+        "--drop-text",
+        action="store_true",
+        help="When encoding a text table first, drop it instead of keeping it",
+    )
+    parser.add_argument(
+        "--sample-tickers",
+        type=int,
+        default=200,
+        help="Tickers read per table to time reads before and after (0: skip)",
+    )
+    args = parser.parse_args()
+    if args.ticker_partitions < 1:
+        parser.error("--ticker-partitions must be at least 1")
+
+    tables = list(FINANCIAL_TABLES) if args.table == "all" else [args.table]
+    if args.print_ddl:
+        for table_name in tables:
+            for statement in partition_ddl(table_name, args.ticker_partitions):
+                print(f"{statement};")
+        return
+
+    engine = PostgresInterface().get_engine()
+    for table_name in tables:
+        if args.status:
+            print_status(engine, table_name)
+            continue
+        if not statement_layout(engine, table_name).encoded:
+            migrate_table(engine, table_name, drop_text=args.drop_text)
+        with engine.connect() as conn:
+            tickers = conn.execute(
+                text(
+                    f"""
+                SELECT t.ticker, t.ticker_id FROM {SCHEMA}.{TICKER_IDS_TABLE} t WHERE EXISTS (
+                    SELECT 1 FROM {SCHEMA}.{table_name}_data d WHERE d.ticker_id = t.ticker_id
+                ) ORDER BY t.ticker
+            """
+                )
+            ).all()
+        sample = random.Random(0).sample(tickers, min(args.sample_tickers, len(tickers)))
+        if sample:
+            before = _time_reads(engine, table_name, sample)
+
+        result = partition_table(engine, table_name, args.ticker_partitions)
+        if result is None:
+            print(f"{table_name}: already has {args.ticker_partitions} ticker partitions")
+            continue
+        print(f"{table_name}: {result['rows']} rows")
+        print(f"  before: {format_size(result['before'])}")
+        print(f"  after:  {format_size(result['after'])}")
+        if sample:
+            after = _time_reads(engine, table_name, sample)
+            for read, (before_mean, before_p95) in before.items():
+                after_mean, after_p95 = after[read]
+                print(
+                    f"  per-ticker read ({read}): mean {before_mean:.2f} -> {after_mean:.2f} ms, "
+                    f"p95 {before_p95:.2f} -> {after_p95:.2f} ms ({len(sample)} tickers)"
+                )
+
+
+if __name__ == "__main__":
+    main()
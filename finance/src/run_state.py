@@ -0,0 +1,293 @@
+"""
+Per-ticker run state for resumable ETL runs.
+
+A run of a job (the active tickers check, or one financial ETL table and frequency)
+records its work queue and every ticker's outcome in Postgres: the etl_runs table
+holds one row per run, etl_run_tickers one row per ticker with its status, attempt
+count and last error. Postgres rather than a local file, because CI runners do not
+keep their disk between runs.
+
+If a run is killed (CI timeout, OOM), the next run of the same job resumes it: it
+processes only the tickers that are still pending or failed transiently (throttled,
+error) and skips those that finished (done, no data) or failed permanently (failed:
+a transient failure on RUN_STATE_MAX_ATTEMPTS attempts). Tickers of the batch that
+was in flight are fetched again; their responses usually come from the response cache.
+
+Statuses are buffered and written once per batch, together with a heartbeat. A run
+that failed with an exception is resumed right away; a run that is still marked
+running is resumed once its heartbeat is RUN_STATE_STALE_MINUTES old (the process
+was killed), so a concurrent copy of the job is not taken over.
+
+Used by ETLJob and the financial data ETL if RUN_STATE_ENABLED (except in sharded
+mode, where the lease table already hands a crashed worker's tickers to the others).
+The tables are created by the etl_runs migration (see run_migrations).
+"""
+
+import logging
+import threading
+from typing import Callable
+
+from sqlalchemy import text
+
+from config import RUN_STATE_MAX_ATTEMPTS, RUN_STATE_RESUME_HOURS, RUN_STATE_STALE_MINUTES, SCHEMA
+from finance.src.schema_migrations import require_migration
+
+logger = logging.getLogger(__name__)
+
+RUNS_TABLE = "etl_runs"
+RUN_TICKERS_TABLE = "etl_run_tickers"
+
+# Ticker statuses. Transient ones are retried when a run is resumed.
+STATUSES = ("pending", "done", "no_data", "throttled", "error", "failed")
+TRANSIENT_STATUSES = ("pending", "throttled", "error")
+
+# Statements of the run_state migration (see run_migrations)
+RUN_STATE_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.{RUNS_TABLE} (
+        run_id BIGSERIAL PRIMARY KEY,
+        job TEXT NOT NULL,
+        status TEXT NOT NULL,
+        started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        heartbeat_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        finished_at TIMESTAMPTZ
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.{RUN_TICKERS_TABLE} (
+        run_id BIGINT NOT NULL REFERENCES {SCHEMA}.{RUNS_TABLE} ON DELETE CASCADE,
+        ticker TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (run_id, ticker)
+    )
+    """,
+]
+
+
+class RunState:
+    """
+    Run state of one job. start() resumes the job's interrupted run or starts a new
+    one; record() buffers ticker outcomes (thread-safe); flush() writes them;
+    finish() closes the run.
+    """
+
+    def __init__(self, engine, job: str, max_attempts: int = RUN_STATE_MAX_ATTEMPTS):
+        self.engine = engine
+        self.job = job
+        self.max_attempts = max_attempts
+        self.run_id: int | None = None
+        self.resumed = False
+        self._pending: dict[str, tuple[str, str | None]] = {}
+        self._lock = threading.Lock()
+
+    def start(self, select_tickers: Callable[[], list[str]], resume: bool = True) -> list[str]:
+        """
+        Resume the job's latest interrupted run (if resume) and return its remaining
+        tickers, or start a new run over select_tickers() and return those. Older
+        interrupted runs are marked abandoned.
+        """
+        with self.engine.begin() as conn:
+            require_migration(conn, RUNS_TABLE, "Run state (--run-state)")
+            interrupted = conn.execute(
+                text(
+                    f"""
+                    SELECT run_id,
+                           status = 'running'
+                           AND heartbeat_at > NOW() - make_interval(mins => :stale_minutes) AS live
+                    FROM {SCHEMA}.{RUNS_TABLE}
+                    WHERE job = :job AND status IN ('running', 'interrupted')
+                      AND heartbeat_at > NOW() - make_interval(hours => :resume_hours)
+                    ORDER BY run_id DESC
+                    LIMIT 1
+                    FOR UPDATE
+                """
+                ),
+                {
+                    "job": self.job,
+                    "stale_minutes": RUN_STATE_STALE_MINUTES,
+                    "resume_hours": RUN_STATE_RESUME_HOURS,
+                },
+            ).first()
+            if interrupted is not None and interrupted.live:
+                logger.info(
+                    f"[{self.job}] Run {interrupted.run_id} is still active, starting a new run"
+                )
+            elif interrupted is not None and resume:
+                self.run_id, self.resumed = interrupted.run_id, True
+                # Claim it in this transaction, so a concurrent start sees it as live
+                conn.execute(
+                    text(
+                        f"""
+                        UPDATE {SCHEMA}.{RUNS_TABLE} SET status = 'running', heartbeat_at = NOW()
+                        WHERE run_id = :run_id
+                    """
+                    ),
+                    {"run_id": self.run_id},
+                )
+            conn.execute(
+                text(
+                    f"""
+                    UPDATE {SCHEMA}.{RUNS_TABLE} SET status = 'abandoned', finished_at = NOW()
+                    WHERE job = :job AND run_id IS DISTINCT FROM :run_id
+                      AND (status = 'interrupted'
+                           OR (status = 'running'
+                               AND heartbeat_at < NOW() - make_interval(mins => :stale_minutes)))
+                """
+                ),
+                {"job": self.job, "stale_minutes": RUN_STATE_STALE_MINUTES, "run_id": self.run_id},
+            )
+
+        if self.resumed:
+            return self._resume()
+
+        tickers = select_tickers()
+        with self.engine.begin() as conn:
+            self.run_id = conn.execute(
+                text(
+                    f"INSERT INTO {SCHEMA}.{RUNS_TABLE} (job, status) VALUES (:job, 'running') "
+                    "RETURNING run_id"
+                ),
+                {"job": self.job},
+            ).scalar_one()
+            if tickers:
+                conn.execute(
+                    text(
+                        f"""
+                        INSERT INTO {SCHEMA}.{RUN_TICKERS_TABLE} (run_id, ticker, position, status)
+                        SELECT :run_id, ticker, position, 'pending'
+                        FROM unnest(CAST(:tickers AS TEXT[]))
+                            WITH ORDINALITY AS t(ticker, position)
+                        ON CONFLICT DO NOTHING
+                    """
+                    ),
+                    {"run_id": self.run_id, "tickers": tickers},
+                )
+        logger.info(f"[{self.job}] Started run {self.run_id} with {len(tickers)} tickers")
+        return tickers
+
+    def _resume(self) -> list[str]:
+        with self.engine.begin() as conn:
+            counts = dict(
+                conn.execute(
+                    text(
+                        f"""
+                        SELECT status, COUNT(*) FROM {SCHEMA}.{RUN_TICKERS_TABLE}
+                        WHERE run_id = :run_id GROUP BY status
+                    """
+                    ),
+                    {"run_id": self.run_id},
+                ).all()
+            )
+            tickers = (
+                conn.execute(
+                    text(
+                        f"""
+                    SELECT ticker FROM {SCHEMA}.{RUN_TICKERS_TABLE}
+                    WHERE run_id = :run_id AND status = ANY(:transient)
+                    ORDER BY position
+                """
+                    ),
+                    {"run_id": self.run_id, "transient": list(TRANSIENT_STATUSES)},
+                )
+                .scalars()
+                .all()
+            )
+        logger.info(
+            f"[{self.job}] Resuming run {self.run_id}: {len(tickers)} tickers left "
+            f"({', '.join(f'{s}={n}' for s, n in sorted(counts.items()))})"
+        )
+        return list(tickers)
+
+    def record(self, ticker: str, status: str, error: str | None = None) -> None:
+        """Buffer a ticker's outcome (one of STATUSES) until the next flush()."""
+        with self._lock:
+            self._pending[ticker] = (status, error)
+
+    def flush(self) -> None:
+        """
+        Write buffered outcomes and the run's heartbeat. Each outcome counts as an
+        attempt; a transient failure on the last allowed attempt becomes 'failed'.
+        """
+        if self.run_id is None:
+            return
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        with self.engine.begin() as conn:
+            if pending:
+                conn.execute(
+                    text(
+                        f"""
+                        INSERT INTO {SCHEMA}.{RUN_TICKERS_TABLE} AS r
+                            (run_id, ticker, position, status, attempts, last_error)
+                        VALUES (:run_id, :ticker, 0, :status, 1, :error)
+                        ON CONFLICT (run_id, ticker) DO UPDATE SET
+                            status = CASE
+                                WHEN EXCLUDED.status = ANY(:transient)
+                                     AND r.attempts + 1 >= :max_attempts
+                                THEN 'failed' ELSE EXCLUDED.status END,
+                            attempts = r.attempts + 1,
+                            last_error = COALESCE(EXCLUDED.last_error, r.last_error),
+                            updated_at = NOW()
+                    """
+                    ),
+                    [
+                        {
+                            "run_id": self.run_id,
+                            "ticker": ticker,
+                            "status": status,
+                            # Long tracebacks are not useful here; keep the first line
+                            "error": error.splitlines()[0][:500] if error else None,
+                            "transient": list(TRANSIENT_STATUSES),
+                            "max_attempts": self.max_attempts,
+                        }
+                        for ticker, (status, error) in pending.items()
+                    ],
+                )
+            conn.execute(
+                text(
+                    f"UPDATE {SCHEMA}.{RUNS_TABLE} SET heartbeat_at = NOW() WHERE run_id = :run_id"
+                ),
+                {"run_id": self.run_id},
+            )
+
+    def finish(self, completed: bool = True) -> None:
+        """
+        Flush and mark the run finished, so the next run starts fresh, or, if not
+        completed (an exception), interrupted, so the next run resumes it right away.
+        Logs the status counts.
+        """
+        if self.run_id is None:
+            return
+        self.flush()
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(
+                    f"""
+                    UPDATE {SCHEMA}.{RUNS_TABLE}
+                    SET status = :status, finished_at = CASE WHEN :completed THEN NOW() END
+                    WHERE run_id = :run_id
+                """
+                ),
+                {
+                    "run_id": self.run_id,
+                    "completed": completed,
+                    "status": "finished" if completed else "interrupted",
+                },
+            )
+            counts = conn.execute(
+                text(
+                    f"""
+                    SELECT status, COUNT(*) FROM {SCHEMA}.{RUN_TICKERS_TABLE}
+                    WHERE run_id = :run_id GROUP BY status
+                """
+                ),
+                {"run_id": self.run_id},
+            ).all()
+        logger.info(
+            f"[{self.job}] Run {self.run_id} {'finished' if completed else 'interrupted'} | "
+            f"{', '.join(f'{s}={n}' for s, n in sorted(counts)) or 'no tickers'}"
+        )
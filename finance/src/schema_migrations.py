@@ -0,0 +1,64 @@
+"""
+Bookkeeping of the schema migrations applied to the finance schema.
+
+Tables the jobs rely on beyond active_tickers and the statement tables are created by
+explicit migrations (see run_migrations), not by the jobs at runtime. Each applied
+migration is recorded in the schema_migrations table; the jobs check it before using
+a migrated table, and features that need a migration stay off until it is applied.
+"""
+
+import logging
+
+from sqlalchemy import text
+
+from config import SCHEMA
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# (database URL, migration) seen applied in this process (a migration is never unapplied)
+_applied: set[tuple[str, str]] = set()
+
+
+def applied_migrations(conn) -> dict:
+    """Applied migration name -> time it was applied (empty if none ever was)."""
+    if conn.execute(text(f"SELECT to_regclass('{SCHEMA}.{MIGRATIONS_TABLE}')")).scalar() is None:
+        return {}
+    return dict(
+        conn.execute(text(f"SELECT name, applied_at FROM {SCHEMA}.{MIGRATIONS_TABLE}")).all()
+    )
+
+
+def migration_applied(conn, name: str) -> bool:
+    """True if migration name has been applied; only positive answers are memoized."""
+    key = (str(conn.engine.url), name)
+    if key not in _applied and name in applied_migrations(conn):
+        _applied.add(key)
+    return key in _applied
+
+
+def require_migration(conn, name: str, feature: str) -> None:
+    """Raise RuntimeError naming feature if migration name has not been applied."""
+    if not migration_applied(conn, name):
+        raise RuntimeError(
+            f"{feature} needs the '{name}' migration; apply it with "
+            f"python -m finance.src.run_migrations"
+        )
+
+
+def record_migration(conn, name: str) -> None:
+    """Record migration name as applied, in the caller's (migration's) transaction."""
+    conn.execute(
+        text(
+            f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA}.{MIGRATIONS_TABLE} (
+            name TEXT PRIMARY KEY,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """
+        )
+    )
+    conn.execute(
+        text(f"INSERT INTO {SCHEMA}.{MIGRATIONS_TABLE} (name) VALUES (:name)"), {"name": name}
+    )
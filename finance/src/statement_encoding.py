@@ -0,0 +1,359 @@
+"""
+Dictionary-encoded storage of the statement tables.
+
+A migrated statement table keeps its rows in <table>_data with small integer ids in
+place of the repeated strings:
+
+    ticker_id INTEGER   -> ticker_ids (ticker_id, ticker)
+    frequency_id SMALLINT  1 = annual, 2 = quarterly (FREQUENCY_IDS)
+    report_date, metric_id INTEGER -> metric_ids (metric_id, metric), value, insert_datetime
+
+and <table> becomes a view joining the dimension tables back, with the original
+columns, so readers (web API, bulk export, Parquet export, ad-hoc SQL) are unchanged
+and resolve a ticker to its id before scanning the integer natural-key index.
+
+The ETL writers look up the layout of each table once per process
+(statement_layout) and, for migrated tables, encode melted rows to ids (encode_frame)
+before loading them. Ids of new tickers and metrics are inserted in a transaction of
+their own, so a cached id always refers to a committed dimension row.
+
+migrate_table converts a table in place (see run_encode_statements).
+"""
+
+import logging
+import time
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+from config import SCHEMA
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+TICKER_IDS_TABLE = "ticker_ids"
+METRIC_IDS_TABLE = "metric_ids"
+FREQUENCY_IDS = {"annual": 1, "quarterly": 2}
+FREQUENCY_NAMES = {id_: name for name, id_ in FREQUENCY_IDS.items()}
+# Columns of the encoded tables, in order, and their natural key
+ENCODED_COLUMNS = [
+    "ticker_id",
+    "frequency_id",
+    "report_date",
+    "metric_id",
+    "value",
+    "insert_datetime",
+]
+ENCODED_NATURAL_KEY = ["ticker_id", "frequency_id", "report_date", "metric_id"]
+ENCODED_COLUMNS_DDL = """
+    ticker_id INTEGER NOT NULL,
+    frequency_id SMALLINT NOT NULL,
+    report_date DATE NOT NULL,
+    metric_id INTEGER NOT NULL,
+    value DOUBLE PRECISION,
+    insert_datetime TIMESTAMP
+"""
+# Suffix of the renamed text table kept by migrate_table (unless drop_text)
+TEXT_SUFFIX = "_text"
+
+
+class StatementLayout(NamedTuple):
+    """Where and how the rows of a statement table are written."""
+
+    table: str  # relation written to, in SCHEMA
+    columns: list[str]  # columns written, in order
+    key: list[str]  # natural key (unique index <table>_natural_key_idx)
+    ticker: str  # ticker column
+    frequency: str  # frequency column
+    encoded: bool
+
+    def frequency_value(self, frequency: str | None):
+        """frequency ('annual' or 'quarterly') as stored in this layout."""
+        if frequency is None or not self.encoded:
+            return frequency
+        return FREQUENCY_IDS[frequency]
+
+
+def text_layout(table_name: str) -> StatementLayout:
+    return StatementLayout(
+        table_name,
+        ["ticker", "frequency", "report_date", "metric", "value", "insert_datetime"],
+        ["ticker", "frequency", "report_date", "metric"],
+        "ticker",
+        "frequency",
+        False,
+    )
+
+
+def encoded_layout(table_name: str) -> StatementLayout:
+    return StatementLayout(
+        f"{table_name}_data",
+        ENCODED_COLUMNS,
+        ENCODED_NATURAL_KEY,
+        "ticker_id",
+        "frequency_id",
+        True,
+    )
+
+
+# Layout of every statement table looked up in this process
+_layouts: dict[str, StatementLayout] = {}
+
+
+def statement_layout(engine, table_name: str) -> StatementLayout:
+    """Layout of table_name: encoded once migrate_table has run on it, text before."""
+    if table_name not in _layouts:
+        with engine.connect() as conn:
+            encoded = (
+                conn.execute(text(f"SELECT to_regclass('{SCHEMA}.{table_name}_data')")).scalar()
+                is not None
+            )
+        _layouts[table_name] = encoded_layout(table_name) if encoded else text_layout(table_name)
+    return _layouts[table_name]
+
+
+def create_dimension_tables(conn) -> None:
+    # Concurrent CREATE TABLE IF NOT EXISTS can fail; serialize workers creating them
+    conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": TICKER_IDS_TABLE})
+    conn.execute(
+        text(
+            f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA}.{TICKER_IDS_TABLE} (
+            ticker_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            ticker VARCHAR(20) NOT NULL UNIQUE
+        )
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+        CREATE TABLE IF NOT EXISTS {SCHEMA}.{METRIC_IDS_TABLE} (
+            metric_id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            metric VARCHAR NOT NULL UNIQUE
+        )
+    """
+        )
+    )
+
+
+class Dictionary:
+    """Name <-> id of one dimension table (ticker_ids or metric_ids), cached in process."""
+
+    def __init__(self, table: str, id_column: str, name_column: str):
+        self.table = table
+        self.id_column = id_column
+        self.name_column = name_column
+        self.ids_by_name: dict[str, int] = {}
+        self.names_by_id: dict[int, str] = {}
+
+    def _select(self, conn, names: list[str], column: str | None = None) -> None:
+        result = conn.execute(
+            text(
+                f"""
+                SELECT {self.name_column}, {self.id_column} FROM {SCHEMA}.{self.table}
+                WHERE {column or self.name_column} = ANY(:names)
+            """
+            ),
+            {"names": names},
+        )
+        for name, id_ in result:
+            self.ids_by_name[name] = id_
+            self.names_by_id[id_] = name
+
+    def names(self, conn, ids) -> dict[int, str]:
+        """id -> name of ids, reading the ids not cached yet."""
+        missing = [id_ for id_ in set(ids) if id_ not in self.names_by_id]
+        if missing:
+            self._select(conn, missing, self.id_column)
+        return self.names_by_id
+
+    def find(self, conn, name: str) -> int | None:
+        """Id of name, or None if it has none yet (read on the open connection)."""
+        if name not in self.ids_by_name:
+            self._select(conn, [name])
+        return self.ids_by_name.get(name)
+
+    def find_all(self, conn, names: list[str]) -> dict[str, int]:
+        """name -> id of the names that have one, read in one query on the open connection."""
+        missing = [name for name in set(names) if name not in self.ids_by_name]
+        if missing:
+            self._select(conn, missing)
+        return {name: self.ids_by_name[name] for name in names if name in self.ids_by_name}
+
+    def ids(self, engine, names: list[str]) -> list[int]:
+        """Ids of names, adding the missing names to the table."""
+        missing = sorted({name for name in names if name not in self.ids_by_name})
+        if missing:
+            with engine.begin() as conn:
+                self._select(conn, missing)
+                missing = [name for name in missing if name not in self.ids_by_name]
+                if missing:
+                    # Sorted, so concurrent writers adding the same names cannot deadlock
+                    conn.execute(
+                        text(
+                            f"""
+                            INSERT INTO {SCHEMA}.{self.table} ({self.name_column})
+                            SELECT name FROM unnest(CAST(:names AS TEXT[])) AS name ORDER BY name
+                            ON CONFLICT DO NOTHING
+                        """
+                        ),
+                        {"names": missing},
+                    )
+                    self._select(conn, missing)
+        return [self.ids_by_name[name] for name in names]
+
+
+_tickers = Dictionary(TICKER_IDS_TABLE, "ticker_id", "ticker")
+_metrics = Dictionary(METRIC_IDS_TABLE, "metric_id", "metric")
+
+
+def ticker_id(conn, ticker: str) -> int | None:
+    """Id of ticker, or None if no statement rows were ever written for it."""
+    return _tickers.find(conn, ticker)
+
+
+def ticker_ids(conn, tickers: list[str]) -> dict[str, int]:
+    """ticker -> id of the tickers that have one (see ticker_id)."""
+    return _tickers.find_all(conn, tickers)
+
+
+def metric_names(conn, metric_ids) -> dict[int, str]:
+    """metric_id -> metric, covering metric_ids (read on the open connection)."""
+    return _metrics.names(conn, metric_ids)
+
+
+def _encode_column(engine, dictionary: Dictionary, values: pd.Series) -> np.ndarray:
+    """Ids of values, looked up once per distinct value."""
+    # Categories of a categorical batch can outlive its rows; only the used ones get ids
+    values = values.astype("category").cat.remove_unused_categories()
+    ids = np.asarray(dictionary.ids(engine, list(values.cat.categories)), dtype=np.int32)
+    return ids[values.cat.codes.to_numpy()]
+
+
+def encode_frame(engine, df: pd.DataFrame) -> pd.DataFrame:
+    """Melted rows (see financial_data_etl.LOAD_COLUMNS) with ENCODED_COLUMNS instead."""
+    return pd.DataFrame(
+        {
+            "ticker_id": _encode_column(engine, _tickers, df["ticker"]),
+            "frequency_id": df["frequency"].map(FREQUENCY_IDS).astype(np.int16).to_numpy(),
+            "report_date": df["report_date"].to_numpy(),
+            "metric_id": _encode_column(engine, _metrics, df["metric"]),
+            "value": df["value"].to_numpy(),
+            "insert_datetime": df["insert_datetime"].to_numpy(),
+        }
+    )
+
+
+def frequency_name_sql(column: str) -> str:
+    """SQL expression of the frequency name of the frequency id in column."""
+    frequencies = " ".join(f"WHEN {id_} THEN '{name}'" for name, id_ in FREQUENCY_IDS.items())
+    return f"CAST(CASE {column} {frequencies} END AS VARCHAR)"
+
+
+def view_sql(table_name: str) -> str:
+    """CREATE VIEW statement of table_name over <table>_data and the dimension tables."""
+    return f"""
+        CREATE VIEW {SCHEMA}.{table_name} AS
+        SELECT t.ticker, {frequency_name_sql("d.frequency_id")} AS frequency,
+               d.report_date, m.metric, d.value, d.insert_datetime
+        FROM {SCHEMA}.{table_name}_data d
+        JOIN {SCHEMA}.{TICKER_IDS_TABLE} t ON t.ticker_id = d.ticker_id
+        JOIN {SCHEMA}.{METRIC_IDS_TABLE} m ON m.metric_id = d.metric_id
+    """
+
+
+def relation_size(conn, relation: str) -> dict:
+    """Heap (with TOAST) and index bytes and row estimate of SCHEMA.relation."""
+    row = conn.execute(
+        text(
+            """
+            SELECT pg_table_size(c.oid), pg_indexes_size(c.oid), GREATEST(c.reltuples, 0)
+            FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = :schema AND c.relname = :relation
+        """
+        ),
+        {"schema": SCHEMA, "relation": relation},
+    ).one()
+    return {"table_bytes": row[0], "index_bytes": row[1], "rows": int(row[2])}
+
+
+def migrate_table(engine, table_name: str, drop_text: bool = False) -> dict | None:
+    """
+    Convert table_name to the encoded layout in one transaction: fill the dimension
+    tables and <table>_data from the text table, rename the text table to
+    <table>_text (or drop it), and create the <table> view. Writers are blocked
+    while it runs; readers see the text table until it commits. Rows with a NULL or
+    unknown key column are not carried over. Duplicate natural keys keep their newest
+    row. Returns the text and encoded relation sizes, or None if already migrated.
+    """
+    if statement_layout(engine, table_name).encoded:
+        logger.info(f"[{table_name}] Already encoded")
+        return None
+    data = f"{table_name}_data"
+    columns = ", ".join(ENCODED_COLUMNS)
+    key = ", ".join(ENCODED_NATURAL_KEY)
+    start = time.time()
+    with engine.begin() as conn:
+        create_dimension_tables(conn)
+        conn.execute(text(f"LOCK TABLE {SCHEMA}.{table_name} IN SHARE MODE"))
+        before = relation_size(conn, table_name)
+        for dimension, column in ((TICKER_IDS_TABLE, "ticker"), (METRIC_IDS_TABLE, "metric")):
+            conn.execute(
+                text(
+                    f"""
+                INSERT INTO {SCHEMA}.{dimension} ({column})
+                SELECT DISTINCT {column} FROM {SCHEMA}.{table_name} WHERE {column} IS NOT NULL
+                ORDER BY {column}
+                ON CONFLICT DO NOTHING
+            """
+                )
+            )
+        conn.execute(text(f"CREATE TABLE {SCHEMA}.{data} ({ENCODED_COLUMNS_DDL})"))
+        frequencies = " ".join(f"WHEN '{name}' THEN {id_}" for name, id_ in FREQUENCY_IDS.items())
+        copied = conn.execute(
+            text(
+                f"""
+                INSERT INTO {SCHEMA}.{data} ({columns})
+                SELECT DISTINCT ON ({key}) {columns} FROM (
+                    SELECT t.ticker_id, CASE s.frequency {frequencies} END AS frequency_id,
+                           s.report_date, m.metric_id, s.value, s.insert_datetime
+                    FROM {SCHEMA}.{table_name} s
+                    JOIN {SCHEMA}.{TICKER_IDS_TABLE} t ON t.ticker = s.ticker
+                    JOIN {SCHEMA}.{METRIC_IDS_TABLE} m ON m.metric = s.metric
+                    WHERE s.frequency IN ({', '.join(f"'{name}'" for name in FREQUENCY_IDS)})
+                      AND s.report_date IS NOT NULL
+                ) rows
+                ORDER BY {key}, insert_datetime DESC NULLS LAST
+            """
+            )
+        ).rowcount
+        conn.execute(
+            text(f"CREATE UNIQUE INDEX {data}_natural_key_idx ON {SCHEMA}.{data} ({key})")
+        )
+        if drop_text:
+            conn.execute(text(f"DROP TABLE {SCHEMA}.{table_name}"))
+        else:
+            conn.execute(
+                text(f"ALTER TABLE {SCHEMA}.{table_name} RENAME TO {table_name}{TEXT_SUFFIX}")
+            )
+            conn.execute(
+                text(
+                    f"""
+                ALTER INDEX IF EXISTS {SCHEMA}.{table_name}_natural_key_idx
+                RENAME TO {table_name}{TEXT_SUFFIX}_natural_key_idx
+            """
+                )
+            )
+        conn.execute(text(view_sql(table_name)))
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {SCHEMA}.{data}"))
+        after = relation_size(conn, data)
+    _layouts[table_name] = encoded_layout(table_name)
+    logger.info(
+        f"[{table_name}] Encoded {copied} rows in {time.time() - start:.1f}s"
+        + ("" if drop_text else f", text table kept as {table_name}{TEXT_SUFFIX}")
+    )
+    return {"rows": copied, "before": before, "after": after}
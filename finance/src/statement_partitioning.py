@@ -0,0 +1,212 @@
+"""
+Partitioned storage of the dictionary-encoded statement tables (see statement_encoding).
+
+A partitioned <table>_data is split by frequency, then by a hash of the ticker:
+
+    <table>_data                    PARTITION BY LIST (frequency_id)
+      <table>_data_annual           FOR VALUES IN (1), PARTITION BY HASH (ticker_id)
+        <table>_data_annual_p00     FOR VALUES WITH (MODULUS n, REMAINDER 0)
+        ...
+      <table>_data_quarterly        FOR VALUES IN (2), PARTITION BY HASH (ticker_id)
+        ...
+
+with the unique natural-key index on the parent, so every partition carries its own
+slice of it. Every hot path filters on the ticker: the ETL deletes and upserts
+batches of tickers of one frequency, and the web API reads one ticker. Postgres prunes
+those to the matching partitions, so they touch a small heap and index instead of the
+whole table, and vacuum works on partitions that changed. The ETL priority query reads
+statement_freshness and never scans the statement tables.
+
+Postgres prunes while planning only when the ticker id is a literal, so the ETL binds
+its tickers' ids and /api/financial_data resolves the ticker to its id first. Queries
+filtering the <table> view by ticker are pruned at execution, after planning every
+partition.
+
+Writers and the <table> view are unchanged: rows inserted into <table>_data are routed
+to their partition, and ON CONFLICT uses the partitioned natural-key index.
+
+partition_table converts <table>_data (partitioned or not) to n ticker partitions in
+place (see run_partition_statements); partition_ddl returns the DDL it runs.
+"""
+
+import logging
+import time
+
+from sqlalchemy import text
+
+from config import SCHEMA
+from finance.src.statement_encoding import (
+    ENCODED_COLUMNS,
+    ENCODED_COLUMNS_DDL,
+    ENCODED_NATURAL_KEY,
+    FREQUENCY_IDS,
+    statement_layout,
+    view_sql,
+)
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+
+def partition_names(parent: str, ticker_partitions: int) -> list[str]:
+    """Names of parent's frequency partitions and their ticker partitions, parents first."""
+    names = []
+    for frequency in FREQUENCY_IDS:
+        names.append(f"{parent}_{frequency}")
+        names.extend(
+            f"{parent}_{frequency}_p{remainder:02d}" for remainder in range(ticker_partitions)
+        )
+    return names
+
+
+def partition_ddl(table_name: str, ticker_partitions: int, parent: str | None = None) -> list[str]:
+    """
+    Statements creating table_name's partitioned data table (parent, default
+    <table>_data) with ticker_partitions hash partitions per frequency, and its
+    natural-key index. Run the index statement after loading the rows: building it
+    once is faster than maintaining it row by row.
+    """
+    parent = parent or f"{table_name}_data"
+    statements = [
+        f"CREATE TABLE {SCHEMA}.{parent} ({ENCODED_COLUMNS_DDL}) PARTITION BY LIST (frequency_id)"
+    ]
+    for frequency, frequency_id in FREQUENCY_IDS.items():
+        statements.append(
+            f"CREATE TABLE {SCHEMA}.{parent}_{frequency} PARTITION OF {SCHEMA}.{parent} "
+            f"FOR VALUES IN ({frequency_id}) PARTITION BY HASH (ticker_id)"
+        )
+        statements.extend(
+            f"CREATE TABLE {SCHEMA}.{parent}_{frequency}_p{remainder:02d} "
+            f"PARTITION OF {SCHEMA}.{parent}_{frequency} "
+            f"FOR VALUES WITH (MODULUS {ticker_partitions}, REMAINDER {remainder})"
+            for remainder in range(ticker_partitions)
+        )
+    statements.append(
+        f"CREATE UNIQUE INDEX {parent}_natural_key_idx "
+        f"ON {SCHEMA}.{parent} ({', '.join(ENCODED_NATURAL_KEY)})"
+    )
+    return statements
+
+
+def ticker_partition_count(conn, table_name: str) -> int:
+    """Hash partitions per frequency of table_name's data table (0 if not partitioned)."""
+    return (
+        conn.execute(
+            text(
+                """
+            SELECT COUNT(*) FROM pg_partition_tree(to_regclass(:relation))
+            WHERE isleaf AND level = 2
+        """
+            ),
+            {"relation": f"{SCHEMA}.{table_name}_data"},
+        ).scalar()
+        // len(FREQUENCY_IDS)
+    )
+
+
+def partition_sizes(conn, table_name: str) -> list[dict]:
+    """
+    Name, row estimate, heap and index bytes of every partition of <table>_data holding
+    rows (the table itself if it is not partitioned).
+    """
+    result = conn.execute(
+        text(
+            """
+            WITH leaves AS (
+                SELECT relid FROM pg_partition_tree(to_regclass(:relation)) WHERE isleaf
+                UNION ALL
+                SELECT oid FROM pg_class WHERE oid = to_regclass(:relation) AND relkind = 'r'
+            )
+            SELECT c.relname, GREATEST(c.reltuples, 0), pg_table_size(c.oid),
+                   pg_indexes_size(c.oid)
+            FROM leaves JOIN pg_class c ON c.oid = leaves.relid
+            ORDER BY c.relname
+        """
+        ),
+        {"relation": f"{SCHEMA}.{table_name}_data"},
+    )
+    return [
+        {"partition": name, "rows": int(rows), "table_bytes": heap, "index_bytes": index}
+        for name, rows, heap, index in result
+    ]
+
+
+def data_size(conn, table_name: str) -> dict:
+    """Heap and index bytes and row estimate of <table>_data, summed over its partitions."""
+    sizes = partition_sizes(conn, table_name)
+    return {
+        key: sum(size[key] for size in sizes) for key in ("table_bytes", "index_bytes", "rows")
+    }
+
+
+def _rename_indexes(conn, index: str, table: str) -> None:
+    """
+    Rename the partitioned natural-key index to <table>_natural_key_idx and the index of
+    every partition to <partition>_natural_key_idx, instead of names derived from index.
+    """
+    result = conn.execute(
+        text(
+            """
+            SELECT i.relname, t.relname
+            FROM pg_partition_tree(to_regclass(:index)) p
+            JOIN pg_index x ON x.indexrelid = p.relid
+            JOIN pg_class i ON i.oid = x.indexrelid
+            JOIN pg_class t ON t.oid = x.indrelid
+            WHERE p.level > 0
+        """
+        ),
+        {"index": f"{SCHEMA}.{index}"},
+    ).all()
+    conn.execute(text(f"ALTER INDEX {SCHEMA}.{index} RENAME TO {table}_natural_key_idx"))
+    for name, partition in result:
+        conn.execute(text(f"ALTER INDEX {SCHEMA}.{name} RENAME TO {partition}_natural_key_idx"))
+
+
+def partition_table(engine, table_name: str, ticker_partitions: int) -> dict | None:
+    """
+    Rebuild table_name's encoded data table with ticker_partitions hash partitions per
+    frequency, in one transaction: create the partitioned table next to it, copy the
+    rows, swap the two and recreate the <table> view. Writers are blocked while it
+    runs; readers see the old table until it commits. Returns the data table's size
+    before and after, or None if it already has ticker_partitions partitions.
+    """
+    if not statement_layout(engine, table_name).encoded:
+        raise ValueError(
+            f"{table_name} is not dictionary-encoded; run run_encode_statements first"
+        )
+    data = f"{table_name}_data"
+    new = f"{data}_new"
+    columns = ", ".join(ENCODED_COLUMNS)
+    start = time.time()
+    with engine.begin() as conn:
+        conn.execute(text(f"LOCK TABLE {SCHEMA}.{data} IN SHARE MODE"))
+        if ticker_partition_count(conn, table_name) == ticker_partitions:
+            logger.info(f"[{table_name}] Already has {ticker_partitions} ticker partitions")
+            return None
+        before = data_size(conn, table_name)
+        *create, create_index = partition_ddl(table_name, ticker_partitions, new)
+        for statement in create:
+            conn.execute(text(statement))
+        copied = conn.execute(
+            text(f"INSERT INTO {SCHEMA}.{new} ({columns}) SELECT {columns} FROM {SCHEMA}.{data}")
+        ).rowcount
+        conn.execute(text(create_index))
+
+        conn.execute(text(f"DROP VIEW {SCHEMA}.{table_name}"))
+        conn.execute(text(f"DROP TABLE {SCHEMA}.{data}"))
+        for name, new_name in zip(
+            [new, *partition_names(new, ticker_partitions)],
+            [data, *partition_names(data, ticker_partitions)],
+        ):
+            conn.execute(text(f"ALTER TABLE {SCHEMA}.{name} RENAME TO {new_name}"))
+        _rename_indexes(conn, f"{new}_natural_key_idx", data)
+        conn.execute(text(view_sql(table_name)))
+    # Autovacuum analyzes the partitions but never the partitioned parent
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {SCHEMA}.{data}"))
+        after = data_size(conn, table_name)
+    logger.info(
+        f"[{table_name}] Copied {copied} rows into {ticker_partitions} ticker partitions "
+        f"per frequency in {time.time() - start:.1f}s"
+    )
+    return {"rows": copied, "before": before, "after": after}
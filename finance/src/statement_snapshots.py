@@ -0,0 +1,234 @@
+"""
+Tables derived from the statement tables, maintained by the financial ETL in the same
+transaction as every upsert (see financial_data_etl):
+
+- statement_freshness: last load time per (statement table, ticker, frequency), read by
+  the ETL work queue and the web API's response versions
+- statement_latest: latest non-null value per (statement table, ticker, frequency,
+  metric), read by cross-sectional screens (/api/screen)
+
+Each is created and backfilled from the existing statement tables by its migration
+(see run_migrations), and maintained from then on. Until the statement_freshness
+migration is applied, the work queue aggregates MAX(insert_datetime) over the
+statement tables instead (see last_load_sql). rebuild_freshness / rebuild_latest
+recompute them after out-of-band writes.
+"""
+
+import logging
+
+import pandas as pd
+from sqlalchemy import text
+
+from config import SCHEMA
+from finance.src.schema_migrations import migration_applied, require_migration
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+
+# Last load time per (statement table, ticker, frequency), maintained on every upsert
+FRESHNESS_TABLE = "statement_freshness"
+# Latest value per (statement table, ticker, frequency, metric), maintained on every upsert
+LATEST_TABLE = "statement_latest"
+
+# Statements of the statement_freshness migration (see run_migrations)
+FRESHNESS_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.{FRESHNESS_TABLE} (
+        table_name TEXT NOT NULL,
+        ticker TEXT NOT NULL,
+        frequency TEXT NOT NULL,
+        last_insert TIMESTAMP NOT NULL,
+        PRIMARY KEY (table_name, ticker, frequency)
+    )
+    """,
+]
+
+# Statements of the statement_latest migration (see run_migrations)
+LATEST_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.{LATEST_TABLE} (
+        table_name TEXT NOT NULL,
+        ticker TEXT NOT NULL,
+        frequency TEXT NOT NULL,
+        metric TEXT NOT NULL,
+        report_date DATE NOT NULL,
+        value DOUBLE PRECISION NOT NULL,
+        insert_datetime TIMESTAMP,
+        PRIMARY KEY (table_name, ticker, frequency, metric)
+    )
+    """,
+    # Screens filter one metric and sort or filter by value
+    f"""
+    CREATE INDEX IF NOT EXISTS {LATEST_TABLE}_screen_idx
+    ON {SCHEMA}.{LATEST_TABLE} (table_name, frequency, metric, value)
+    """,
+    # Latest load per table, the version of /api/screen responses (statement_freshness
+    # is created by an earlier migration)
+    f"""
+    CREATE INDEX IF NOT EXISTS {FRESHNESS_TABLE}_last_insert_idx
+    ON {SCHEMA}.{FRESHNESS_TABLE} (table_name, last_insert)
+    """,
+]
+
+
+def last_load_sql(conn, table_names: list[str], frequency: str | None) -> str:
+    """
+    Query of the last load per (ticker, table_name) of table_names, of frequency if
+    set (bound as :frequency, the tables as :table_names): read from
+    statement_freshness once its migration is applied, else aggregated over the
+    statement tables.
+    """
+    frequency_filter = "AND frequency = :frequency" if frequency else ""
+    if migration_applied(conn, FRESHNESS_TABLE):
+        return f"""
+            SELECT ticker, table_name, MAX(last_insert) as last_insert
+            FROM {SCHEMA}.{FRESHNESS_TABLE}
+            WHERE table_name = ANY(:table_names) {frequency_filter}
+            GROUP BY ticker, table_name
+        """
+    return " UNION ALL ".join(
+        f"""
+            SELECT ticker, '{table_name}' as table_name, MAX(insert_datetime) as last_insert
+            FROM {SCHEMA}.{table_name}
+            WHERE TRUE {frequency_filter}
+            GROUP BY ticker
+        """
+        for table_name in table_names
+    )
+
+
+def backfill_freshness(conn, table_name: str) -> None:
+    """Replace table_name's freshness rows with the last loads in the statement table."""
+    conn.execute(
+        text(f"DELETE FROM {SCHEMA}.{FRESHNESS_TABLE} WHERE table_name = :table_name"),
+        {"table_name": table_name},
+    )
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO {SCHEMA}.{FRESHNESS_TABLE} (table_name, ticker, frequency, last_insert)
+            SELECT :table_name, ticker, frequency, MAX(insert_datetime)
+            FROM {SCHEMA}.{table_name}
+            GROUP BY ticker, frequency
+        """
+        ),
+        {"table_name": table_name},
+    )
+
+
+def rebuild_freshness(engine, table_names: list[str]) -> None:
+    """
+    Recompute the statement_freshness rows of table_names from the statement tables,
+    e.g. after rows were written or deleted outside this module.
+    """
+    with engine.begin() as conn:
+        require_migration(conn, FRESHNESS_TABLE, "Rebuilding statement_freshness")
+        for table_name in table_names:
+            backfill_freshness(conn, table_name)
+            logger.info(f"[{table_name}] Rebuilt {FRESHNESS_TABLE}")
+
+
+def update_freshness(conn, table_name: str, df: pd.DataFrame) -> None:
+    """
+    Record df's load time for every (ticker, frequency) it contains, in the caller's
+    transaction, once the statement_freshness migration is applied. Written even when
+    an incremental load left every row unchanged, so the ticker counts as refreshed.
+    """
+    if df.empty or not migration_applied(conn, FRESHNESS_TABLE):
+        return
+    fresh = df.groupby(["ticker", "frequency"], as_index=False, observed=True)[
+        "insert_datetime"
+    ].max()
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO {SCHEMA}.{FRESHNESS_TABLE} AS f
+                (table_name, ticker, frequency, last_insert)
+            VALUES (:table_name, :ticker, :frequency, :insert_datetime)
+            ON CONFLICT (table_name, ticker, frequency) DO UPDATE
+            SET last_insert = GREATEST(f.last_insert, EXCLUDED.last_insert)
+        """
+        ),
+        [{"table_name": table_name, **row} for row in fresh.to_dict("records")],
+    )
+
+
+def _latest_sql(table_name: str, condition: str) -> str:
+    """Latest non-null row per (ticker, frequency, metric) of table_name matching condition."""
+    return f"""
+        SELECT DISTINCT ON (ticker, frequency, metric)
+               ticker, frequency, metric, report_date, value, insert_datetime
+        FROM {SCHEMA}.{table_name}
+        WHERE value IS NOT NULL AND report_date IS NOT NULL AND {condition}
+        ORDER BY ticker, frequency, metric, report_date DESC, insert_datetime DESC NULLS LAST
+    """
+
+
+def backfill_latest(conn, table_name: str) -> None:
+    """Replace table_name's latest-value rows with the latest values in the statement table."""
+    conn.execute(
+        text(f"DELETE FROM {SCHEMA}.{LATEST_TABLE} WHERE table_name = :table_name"),
+        {"table_name": table_name},
+    )
+    conn.execute(
+        text(
+            f"""
+            INSERT INTO {SCHEMA}.{LATEST_TABLE}
+                (table_name, ticker, frequency, metric, report_date, value, insert_datetime)
+            SELECT :table_name, latest.* FROM ({_latest_sql(table_name, "TRUE")}) latest
+        """
+        ),
+        {"table_name": table_name},
+    )
+
+
+def rebuild_latest(engine, table_names: list[str]) -> None:
+    """
+    Recompute the statement_latest rows of table_names from the statement tables,
+    e.g. after rows were written or deleted outside this module.
+    """
+    with engine.begin() as conn:
+        require_migration(conn, LATEST_TABLE, "Rebuilding statement_latest")
+        for table_name in table_names:
+            backfill_latest(conn, table_name)
+            logger.info(f"[{table_name}] Rebuilt {LATEST_TABLE}")
+
+
+def update_latest(conn, table_name: str, df: pd.DataFrame, frequency: str | None = None) -> None:
+    """
+    Recompute the latest-value rows of df's tickers (of frequency, if set) from the
+    statement table, in the caller's transaction after the load, once the
+    statement_latest migration is applied. Only rows whose report date or value changed
+    are rewritten, and metrics the tickers no longer have are deleted, so screens see
+    the same data as the statement table.
+    """
+    if df.empty or not migration_applied(conn, LATEST_TABLE):
+        return
+    frequency_filter = "AND frequency = :frequency" if frequency else ""
+    latest_sql = _latest_sql(table_name, f"ticker = ANY(:tickers) {frequency_filter}")
+    tickers = df["ticker"].unique().tolist()
+    conn.execute(
+        text(
+            f"""
+            WITH latest AS ({latest_sql}),
+            removed AS (
+                DELETE FROM {SCHEMA}.{LATEST_TABLE} s
+                WHERE s.table_name = :table_name AND s.ticker = ANY(:tickers) {frequency_filter}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM latest l
+                      WHERE l.ticker = s.ticker AND l.frequency = s.frequency
+                        AND l.metric = s.metric
+                  )
+            )
+            INSERT INTO {SCHEMA}.{LATEST_TABLE} AS s
+                (table_name, ticker, frequency, metric, report_date, value, insert_datetime)
+            SELECT :table_name, latest.* FROM latest
+            ON CONFLICT (table_name, ticker, frequency, metric) DO UPDATE SET
+                report_date = EXCLUDED.report_date,
+                value = EXCLUDED.value,
+                insert_datetime = EXCLUDED.insert_datetime
+            WHERE (s.report_date, s.value) IS DISTINCT FROM (EXCLUDED.report_date, EXCLUDED.value)
+        """
+        ),
+        {"table_name": table_name, "tickers": tickers, "frequency": frequency},
+    )
@@ -0,0 +1,166 @@
+"""
+Upper-case tickers and the natural-key index of the statement tables.
+
+Tickers are upper-cased when the tickers file is loaded (ETLJob.load_ticker_universe),
+and readers match them with plain equality (ticker = :ticker), which uses the unique
+index on the natural key (ticker, frequency, report_date, metric). Rows written
+before that may hold mixed-case tickers; the ticker_natural_keys migration (see
+run_migrations) upper-cases them and creates the index:
+
+- active_tickers: mixed-case rows are renamed, or deleted when the upper-case ticker
+  has a row checked at least as recently
+- text statement tables: rows whose upper-cased natural key is duplicated keep the
+  newest row, the rest are upper-cased, then <table>_natural_key_idx is created
+- encoded statement tables (see statement_encoding): the rows of a mixed-case
+  ticker_id move to the upper-case ticker's id (newest row wins on conflict), and
+  the mixed-case ids are deleted from ticker_ids afterwards
+- statement_freshness / statement_latest are rebuilt from the normalized tables if
+  their migrations are applied
+
+The incremental load method requires this migration (ON CONFLICT needs the index).
+"""
+
+from sqlalchemy import text
+
+from config import SCHEMA
+from finance.src.schema_migrations import migration_applied
+from finance.src.statement_encoding import (
+    ENCODED_COLUMNS,
+    ENCODED_NATURAL_KEY,
+    TICKER_IDS_TABLE,
+    text_layout,
+)
+from finance.src.statement_snapshots import (
+    FRESHNESS_TABLE,
+    LATEST_TABLE,
+    backfill_freshness,
+    backfill_latest,
+)
+
+TICKER_KEYS_MIGRATION = "ticker_natural_keys"
+
+# active_tickers: keep the most recently checked row per upper-cased ticker
+# (the upper-case one on ties), then upper-case the rest
+ACTIVE_TICKERS_SQL = [
+    f"""
+    DELETE FROM {SCHEMA}.active_tickers WHERE ctid IN (
+        SELECT ctid FROM (
+            SELECT ctid, ROW_NUMBER() OVER (
+                PARTITION BY UPPER(ticker)
+                ORDER BY upsert_datetime DESC NULLS LAST, ticker = UPPER(ticker) DESC
+            ) AS rank
+            FROM {SCHEMA}.active_tickers
+            WHERE UPPER(ticker) IN (
+                SELECT UPPER(ticker) FROM {SCHEMA}.active_tickers WHERE ticker <> UPPER(ticker)
+            )
+        ) ranked
+        WHERE rank > 1
+    )
+    """,
+    f"UPDATE {SCHEMA}.active_tickers SET ticker = UPPER(ticker) WHERE ticker <> UPPER(ticker)",
+]
+
+
+def _normalize_text_table(conn, table_name: str) -> None:
+    """Upper-case the tickers of a text statement table and create its natural-key index."""
+    layout = text_layout(table_name)
+    # Also removes exact duplicates, which would fail the unique index
+    conn.execute(
+        text(
+            f"""
+        DELETE FROM {SCHEMA}.{table_name} WHERE ctid IN (
+            SELECT ctid FROM (
+                SELECT ctid, ROW_NUMBER() OVER (
+                    PARTITION BY UPPER(ticker), frequency, report_date, metric
+                    ORDER BY insert_datetime DESC NULLS LAST, ticker = UPPER(ticker) DESC
+                ) AS rank
+                FROM {SCHEMA}.{table_name}
+            ) ranked
+            WHERE rank > 1
+        )
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"UPDATE {SCHEMA}.{table_name} SET ticker = UPPER(ticker) "
+            "WHERE ticker <> UPPER(ticker)"
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+        CREATE UNIQUE INDEX IF NOT EXISTS {table_name}_natural_key_idx
+        ON {SCHEMA}.{table_name} ({', '.join(layout.key)})
+    """
+        )
+    )
+
+
+def _normalize_encoded_table(conn, table_name: str) -> None:
+    """Move the rows of mixed-case ticker ids of <table_name>_data to the upper-case ids."""
+    data = f"{table_name}_data"
+    columns = ", ".join(ENCODED_COLUMNS)
+    key = ", ".join(ENCODED_NATURAL_KEY)
+    conn.execute(
+        text(
+            f"""
+        INSERT INTO {SCHEMA}.{TICKER_IDS_TABLE} (ticker)
+        SELECT DISTINCT UPPER(ticker) FROM {SCHEMA}.{TICKER_IDS_TABLE}
+        WHERE ticker <> UPPER(ticker)
+        ORDER BY 1
+        ON CONFLICT DO NOTHING
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+        INSERT INTO {SCHEMA}.{data} AS d ({columns})
+        SELECT DISTINCT ON ({key}) {columns} FROM (
+            SELECT u.ticker_id, r.frequency_id, r.report_date, r.metric_id, r.value,
+                   r.insert_datetime
+            FROM {SCHEMA}.{data} r
+            JOIN {SCHEMA}.{TICKER_IDS_TABLE} t ON t.ticker_id = r.ticker_id
+            JOIN {SCHEMA}.{TICKER_IDS_TABLE} u ON u.ticker = UPPER(t.ticker)
+            WHERE t.ticker <> UPPER(t.ticker)
+        ) moved
+        ORDER BY {key}, insert_datetime DESC NULLS LAST
+        ON CONFLICT ({key}) DO UPDATE
+        SET value = EXCLUDED.value, insert_datetime = EXCLUDED.insert_datetime
+        WHERE EXCLUDED.insert_datetime > d.insert_datetime
+           OR (d.insert_datetime IS NULL AND EXCLUDED.insert_datetime IS NOT NULL)
+    """
+        )
+    )
+    conn.execute(
+        text(
+            f"""
+        DELETE FROM {SCHEMA}.{data} r USING {SCHEMA}.{TICKER_IDS_TABLE} t
+        WHERE t.ticker_id = r.ticker_id AND t.ticker <> UPPER(t.ticker)
+    """
+        )
+    )
+
+
+def normalize_statement_table(conn, table_name: str) -> None:
+    """
+    Upper-case the tickers of statement table table_name (text or encoded), and
+    rebuild its freshness and latest-value rows if those tables are maintained.
+    """
+    encoded = conn.execute(text(f"SELECT to_regclass('{SCHEMA}.{table_name}_data')")).scalar()
+    if encoded is None:
+        _normalize_text_table(conn, table_name)
+    else:
+        _normalize_encoded_table(conn, table_name)
+    if migration_applied(conn, FRESHNESS_TABLE):
+        backfill_freshness(conn, table_name)
+    if migration_applied(conn, LATEST_TABLE):
+        backfill_latest(conn, table_name)
+
+
+def drop_mixed_case_ticker_ids(conn) -> None:
+    """Delete the mixed-case tickers from ticker_ids, once no encoded rows refer to them."""
+    if conn.execute(text(f"SELECT to_regclass('{SCHEMA}.{TICKER_IDS_TABLE}')")).scalar() is None:
+        return
+    conn.execute(text(f"DELETE FROM {SCHEMA}.{TICKER_IDS_TABLE} WHERE ticker <> UPPER(ticker)"))
@@ -0,0 +1,106 @@
+"""
+In-process cache for the web API's JSON responses.
+
+The statement tables only change when the ETL runs, so responses are kept in memory
+together with the data version they were built from (the latest load time of the
+rows behind them). A cached response is reused as long as the version is unchanged;
+the version itself is looked up again at most every ttl_seconds, so an ETL run shows
+up in the API within that time. Both caches are bounded LRUs.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, NamedTuple
+
+# Version value for data whose load time cannot be determined; never cached
+UNVERSIONED = object()
+
+
+class CachedResponse(NamedTuple):
+    version: object
+    body: str
+    etag: str
+    last_modified: datetime | None
+
+
+class LRUCache:
+    """Thread-safe LRU mapping with at most max_entries items and an optional TTL."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float | None = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """The value stored for key, or None if missing or older than the TTL."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or (
+                self.ttl_seconds is not None and time.monotonic() - item[1] > self.ttl_seconds
+            ):
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._items[key] = (value, time.monotonic())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class APICache:
+    """
+    Versioned response cache. get() returns the response for key, rebuilding it with
+    build() only when load_version(version_key) reports a different version than the
+    cached response was built from.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, dumps: Callable[[object], str]):
+        self.responses = LRUCache(max_entries)
+        self.versions = LRUCache(max_entries, ttl_seconds)
+        self.dumps = dumps
+
+    def version(self, version_key, load_version: Callable[[], object]):
+        """Data version for version_key, looked up at most every ttl_seconds."""
+        cached = self.versions.get(version_key)
+        if cached is not None:
+            return cached[0]
+        version = load_version()
+        # Wrapped, so that a None version (no rows yet) is cached too
+        self.versions.put(version_key, (version,))
+        return version
+
+    def get(
+        self, key, version_key, load_version: Callable[[], object], build: Callable[[], object]
+    ) -> CachedResponse:
+        version = self.version(version_key, load_version)
+        cached = self.responses.get(key)
+        if cached is not None and version is not UNVERSIONED and cached.version == version:
+            return cached
+        body = self.dumps(build())
+        response = CachedResponse(
+            version=version,
+            body=body,
+            etag=hashlib.sha1(body.encode()).hexdigest(),
+            last_modified=version if isinstance(version, datetime) else None,
+        )
+        if version is not UNVERSIONED:
+            self.responses.put(key, response)
+        return response
+
+    def clear(self) -> None:
+        self.responses.clear()
+        self.versions.clear()
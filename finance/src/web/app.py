@@ -4,10 +4,33 @@ Provides a search interface to explore financial data stored in Postgres.
 """
 
 import os
+import threading
+from operator import itemgetter
 
-from flask import Flask, render_template, jsonify, request
-from sqlalchemy import create_engine, text
 from dotenv import load_dotenv
+from flask import Flask, jsonify, render_template, request, stream_with_context
+from sqlalchemy import text
+
+from finance.src.postgres_interface import PostgresInterface, stream_rows
+from finance.src.schema_migrations import migration_applied
+from finance.src.statement_encoding import (
+    FREQUENCY_NAMES,
+    metric_names,
+    statement_layout,
+    ticker_id,
+    ticker_ids,
+)
+from finance.src.statement_snapshots import FRESHNESS_TABLE
+from finance.src.web.api_cache import UNVERSIONED, APICache
+from finance.src.web.bulk import (
+    FORMATS,
+    bulk_query,
+    parse_bulk_request,
+    stream_arrow,
+    stream_ndjson,
+)
+from finance.src.web.screen import LATEST_TABLE, parse_screen_request, run_screen, screen_response
+from finance.src.web.ticker_search import TickerIndex
 
 load_dotenv()
 
@@ -17,71 +40,264 @@ NEON_CONNECTION_STRING = os.environ.get("PG_NEON_FINANCE_URL")
 if not NEON_CONNECTION_STRING:
     raise EnvironmentError("PG_NEON_FINANCE_URL environment variable is not set.")
 
-engine = create_engine(NEON_CONNECTION_STRING, pool_pre_ping=True, pool_recycle=300)
+postgres = PostgresInterface(NEON_CONNECTION_STRING)
+engine = postgres.get_engine()
 
 SCHEMA = "finance"
 TABLES = ["income_stmt", "cash_flow", "balance_sheet", "financials"]
 
+# Responses are cached in memory per data version; versions are re-read from Postgres
+# at most every API_CACHE_TTL_SECONDS, so new ETL loads are served within that time
+API_CACHE_MAX_ENTRIES = int(os.environ.get("API_CACHE_MAX_ENTRIES", 2048))
+API_CACHE_TTL_SECONDS = float(os.environ.get("API_CACHE_TTL_SECONDS", 60))
+
+# Bulk endpoint: tickers per request, and rows fetched per server-side cursor round trip
+BULK_MAX_TICKERS = int(os.environ.get("BULK_MAX_TICKERS", 5000))
+BULK_CHUNK_ROWS = int(os.environ.get("BULK_CHUNK_ROWS", 10000))
+
+# Screen endpoint: most tickers per page
+SCREEN_MAX_LIMIT = int(os.environ.get("SCREEN_MAX_LIMIT", 1000))
+
+api_cache = APICache(API_CACHE_MAX_ENTRIES, API_CACHE_TTL_SECONDS, dumps=app.json.dumps)
+
+
+def cached_json(key, version_key, load_version, build):
+    """
+    JSON response for key from api_cache, with an ETag and (if the version is a load
+    time) Last-Modified, answering conditional requests with 304 Not Modified.
+    """
+    cached = api_cache.get(key, version_key, load_version, build)
+    response = app.response_class(cached.body, mimetype="application/json")
+    response.set_etag(cached.etag)
+    if cached.last_modified is not None:
+        response.last_modified = cached.last_modified
+    # Browsers may keep the response but must revalidate it (cheap: 304 from memory)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+def active_tickers_version():
+    """Latest active_tickers write, the version of /api/search responses."""
+    with engine.connect() as conn:
+        return conn.execute(
+            text(f"SELECT MAX(upsert_datetime) FROM {SCHEMA}.active_tickers")
+        ).scalar()
+
+
+def financial_data_version(ticker: str):
+    """
+    Latest load of any statement row of ticker, from the statement_freshness table the
+    ETL updates in the same transaction as its upserts. UNVERSIONED (not cached) if the
+    migration is not applied yet.
+    """
+    with engine.connect() as conn:
+        if not migration_applied(conn, FRESHNESS_TABLE):
+            return UNVERSIONED
+        return conn.execute(
+            text(
+                f"""
+                SELECT MAX(last_insert) FROM {SCHEMA}.statement_freshness
+                WHERE table_name = ANY(:tables) AND ticker = :ticker
+            """
+            ),
+            {"tables": TABLES, "ticker": ticker},
+        ).scalar()
+
+
+def statement_table_version(table: str):
+    """
+    Latest load of any ticker into table, the version of /api/screen responses over it
+    (statement_latest is updated in the same transaction). UNVERSIONED (not cached) if
+    the statement_freshness migration is not applied yet.
+    """
+    with engine.connect() as conn:
+        if not migration_applied(conn, FRESHNESS_TABLE):
+            return UNVERSIONED
+        return conn.execute(
+            text(
+                f"""
+                SELECT MAX(last_insert) FROM {SCHEMA}.statement_freshness WHERE table_name = :table
+            """
+            ),
+            {"table": table},
+        ).scalar()
+
 
 @app.route("/")
 def index():
     return render_template("index.html")
 
 
+_ticker_index: tuple[object, TickerIndex] | None = None
+_ticker_index_lock = threading.Lock()
+
+
+def ticker_index() -> TickerIndex:
+    """
+    Search index over the active tickers, built on first use and rebuilt when the
+    active_tickers version changes (looked up at most every API_CACHE_TTL_SECONDS).
+    """
+    global _ticker_index
+    version = api_cache.version("search", active_tickers_version)
+    with _ticker_index_lock:
+        if _ticker_index is None or _ticker_index[0] != version:
+            rows = postgres.iter_rows(
+                f"SELECT ticker, name FROM {SCHEMA}.active_tickers WHERE is_active = true"
+            )
+            _ticker_index = (version, TickerIndex(rows))
+        return _ticker_index[1]
+
+
 @app.route("/api/search")
 def search_tickers():
-    """Return matching tickers for autocomplete."""
+    """Return matching tickers and company names for autocomplete (see ticker_search)."""
     q = request.args.get("q", "").strip().upper()
     if len(q) < 1:
         return jsonify([])
+    return cached_json(
+        ("search", q), "search", active_tickers_version, lambda: ticker_index().search(q)
+    )
 
-    query = text(f"""
-        SELECT ticker FROM {SCHEMA}.active_tickers
-        WHERE is_active = true AND UPPER(ticker) LIKE :pattern
-        ORDER BY ticker
-        LIMIT 20
-    """)
 
-    with engine.connect() as conn:
-        result = conn.execute(query, {"pattern": f"%{q}%"})
-        tickers = [row[0] for row in result]
+# One round trip for all statement tables. Tickers are stored upper-case (see
+# ETLJob.load_ticker_universe and the ticker_natural_keys migration in ticker_keys,
+# which also creates the unique index on (ticker, frequency, report_date, metric)), so
+# the plain equality uses that index; UPPER(ticker) would scan the tables.
+FINANCIAL_DATA_QUERY = text(
+    " UNION ALL ".join(
+        f"SELECT '{table}' AS table_name, frequency, report_date, metric, value "
+        f"FROM {SCHEMA}.{table} WHERE ticker = :ticker"
+        for table in TABLES
+    )
+    + " ORDER BY table_name, frequency, report_date, metric"
+)
+
+
+# The same for dictionary-encoded tables (see statement_encoding): the ticker is resolved
+# to its id once and the integer index is scanned without joining the dimension tables;
+# metric names come from an in-process cache, and rows are sorted in fetch_financial_data.
+# The ticker id is bound as a literal, so partitioned tables are pruned while planning
+ENCODED_FINANCIAL_DATA_QUERY = text(
+    " UNION ALL ".join(
+        f"SELECT '{table}' AS table_name, frequency_id, report_date, metric_id, value "
+        f"FROM {SCHEMA}.{table}_data WHERE ticker_id = :ticker_id"
+        for table in TABLES
+    )
+)
+
+
+def fetch_financial_data(conn, ticker: str) -> dict:
+    """All financial data for an (upper-case) ticker, grouped by table and frequency."""
+    data = {table: {"annual": [], "quarterly": []} for table in TABLES}
+    if all(statement_layout(engine, table).encoded for table in TABLES):
+        return _fetch_encoded_financial_data(conn, ticker, data)
+    rows = (
+        row
+        for chunk in stream_rows(conn, FINANCIAL_DATA_QUERY, {"ticker": ticker})
+        for row in chunk
+    )
+    for table, frequency, report_date, metric, value in rows:
+        data[table][frequency].append(
+            {
+                "ticker": ticker,
+                "frequency": frequency,
+                "report_date": report_date.isoformat(),
+                "metric": metric,
+                "value": value,
+            }
+        )
+    return data
+
 
-    return jsonify(tickers)
+def _fetch_encoded_financial_data(conn, ticker: str, data: dict) -> dict:
+    encoded_ticker = ticker_id(conn, ticker)
+    if encoded_ticker is None:
+        return data
+    chunks = stream_rows(conn, ENCODED_FINANCIAL_DATA_QUERY, {"ticker_id": encoded_ticker})
+    rows = [row for chunk in chunks for row in chunk]
+    metrics = metric_names(conn, {row[3] for row in rows})
+    for table, frequency_id, report_date, metric_id, value in rows:
+        frequency = FREQUENCY_NAMES[frequency_id]
+        data[table][frequency].append(
+            {
+                "ticker": ticker,
+                "frequency": frequency,
+                "report_date": report_date.isoformat(),
+                "metric": metrics[metric_id],
+                "value": value,
+            }
+        )
+    for frequencies in data.values():
+        for records in frequencies.values():
+            records.sort(key=itemgetter("report_date", "metric"))
+    return data
 
 
 @app.route("/api/financial_data/<ticker>")
 def get_financial_data(ticker: str):
     """Return all financial data for a ticker, grouped by table and frequency."""
     ticker = ticker.strip().upper()
-    data = {}
 
-    for table in TABLES:
-        query = text(f"""
-            SELECT ticker, frequency, report_date, metric, value
-            FROM {SCHEMA}.{table}
-            WHERE UPPER(ticker) = :ticker
-            ORDER BY frequency, report_date, metric
-        """)
+    def build():
+        with engine.connect() as conn:
+            return fetch_financial_data(conn, ticker)
+
+    return cached_json(
+        ("financial_data", ticker),
+        ("financial_data", ticker),
+        lambda: financial_data_version(ticker),
+        build,
+    )
+
+
+@app.route("/api/bulk/financial_data", methods=["GET", "POST"])
+def get_financial_data_bulk():
+    """
+    Stream financial data for many tickers as NDJSON or an Arrow IPC stream (see bulk).
+    Parameters, as a JSON body or query string: tickers (required), tables, metrics,
+    frequency, start_date, end_date, format ("ndjson" or "arrow").
+    """
+    params = request.get_json(silent=True) if request.method == "POST" else None
+    try:
+        filters = parse_bulk_request(params or request.args.to_dict(), TABLES, BULK_MAX_TICKERS)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    encoded_ids = None
+    if all(statement_layout(engine, table).encoded for table in filters["tables"]):
+        # Resolved first, like the per-ticker query, so the partitions are pruned
+        with engine.connect() as conn:
+            encoded_ids = ticker_ids(conn, filters["tickers"])
+    query, query_params = bulk_query(SCHEMA, filters, encoded_ids)
+    stream = stream_arrow if filters["format"] == "arrow" else stream_ndjson
+    return app.response_class(
+        stream_with_context(stream(postgres, query, query_params, BULK_CHUNK_ROWS)),
+        mimetype=FORMATS[filters["format"]],
+    )
+
 
+@app.route("/api/screen")
+def screen():
+    """
+    Screen all tickers on the latest value of one metric (see screen). Parameters:
+    metric (required), table, frequency, min_value, max_value, exchange, since (oldest
+    report date), order ("desc" or "asc"), limit, offset.
+    """
+    try:
+        filters = parse_screen_request(request.args.to_dict(), TABLES, SCREEN_MAX_LIMIT)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    def build():
         with engine.connect() as conn:
-            result = conn.execute(query, {"ticker": ticker})
-            rows = [
-                {
-                    "ticker": row[0],
-                    "frequency": row[1],
-                    "report_date": row[2].isoformat(),
-                    "metric": row[3],
-                    "value": row[4],
-                }
-                for row in result
-            ]
-
-        data[table] = {
-            "annual": [r for r in rows if r["frequency"] == "annual"],
-            "quarterly": [r for r in rows if r["frequency"] == "quarterly"],
-        }
-
-    return jsonify(data)
+            if not migration_applied(conn, LATEST_TABLE):
+                return screen_response(filters, [])
+            return run_screen(conn, SCHEMA, filters)
+
+    key = tuple(sorted(request.args.items()))
+    table = filters["table"]
+    return cached_json(
+        ("screen", key), ("screen", table), lambda: statement_table_version(table), build
+    )
 
 
 if __name__ == "__main__":
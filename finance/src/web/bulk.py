@@ -0,0 +1,194 @@
+"""
+Bulk export of financial data for many tickers, streamed.
+
+The rows of all requested tickers are read in one query through a server-side cursor
+(PostgresInterface.stream_rows) and written to the response chunk by chunk, as NDJSON
+(one JSON object per row) or as an Arrow IPC stream (one record batch per chunk), so
+the web app's memory does not grow with the size of the result.
+
+Used by the /api/bulk/financial_data endpoint.
+"""
+
+import io
+from datetime import date
+from typing import Iterator
+
+import pyarrow as pa
+from sqlalchemy import text
+
+from finance.src.postgres_interface import PostgresInterface
+from finance.src.statement_encoding import (
+    FREQUENCY_IDS,
+    METRIC_IDS_TABLE,
+    TICKER_IDS_TABLE,
+    frequency_name_sql,
+)
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+FREQUENCIES = ("annual", "quarterly")
+
+ARROW_SCHEMA = pa.schema(
+    [
+        ("ticker", pa.string()),
+        ("table", pa.string()),
+        ("frequency", pa.string()),
+        ("report_date", pa.date32()),
+        ("metric", pa.string()),
+        ("value", pa.float64()),
+    ]
+)
+
+
+def _as_list(value) -> list[str]:
+    """A list parameter given as a JSON list or a comma-separated string."""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def parse_bulk_request(params: dict, tables: list[str], max_tickers: int) -> dict:
+    """
+    Validate the bulk request parameters (JSON body or query string) and return the
+    filters. Raises ValueError with a message for the client on invalid input.
+    """
+    tickers = sorted({ticker.upper() for ticker in _as_list(params.get("tickers"))})
+    if not tickers:
+        raise ValueError("tickers is required")
+    if len(tickers) > max_tickers:
+        raise ValueError(f"at most {max_tickers} tickers per request")
+
+    selected = _as_list(params.get("tables")) or list(tables)
+    unknown = set(selected) - set(tables)
+    if unknown:
+        raise ValueError(f"unknown tables: {', '.join(sorted(unknown))}")
+
+    frequency = params.get("frequency")
+    if frequency is not None and frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+
+    dates = {}
+    for name in ("start_date", "end_date"):
+        if params.get(name):
+            try:
+                dates[name] = date.fromisoformat(params[name])
+            except (TypeError, ValueError):
+                raise ValueError(f"{name} must be an ISO date (YYYY-MM-DD)") from None
+
+    output = params.get("format", "ndjson")
+    if output not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+
+    return {
+        "tickers": tickers,
+        "tables": [table for table in tables if table in selected],
+        "metrics": _as_list(params.get("metrics")),
+        "frequency": frequency,
+        "format": output,
+        **dates,
+    }
+
+
+def _select(schema: str, table: str, filters: dict, encoded: bool) -> str:
+    """The rows of one table matching filters, with the columns of ARROW_SCHEMA."""
+    if encoded:
+        # Filters <table>_data by ticker and frequency id, so partitions are pruned
+        # while planning (see statement_partitioning), and joins the names back
+        source = (
+            f"{schema}.{table}_data d "
+            f"JOIN {schema}.{TICKER_IDS_TABLE} t ON t.ticker_id = d.ticker_id "
+            f"JOIN {schema}.{METRIC_IDS_TABLE} m ON m.metric_id = d.metric_id"
+        )
+        frequency = frequency_name_sql("d.frequency_id")
+        conditions = ["d.ticker_id = ANY(:ticker_ids)"]
+        if filters["frequency"]:
+            conditions.append("d.frequency_id = :frequency_id")
+    else:
+        source = f"{schema}.{table}"
+        frequency = "frequency"
+        conditions = ["ticker = ANY(:tickers)"]
+        if filters["frequency"]:
+            conditions.append("frequency = :frequency")
+    if filters["metrics"]:
+        conditions.append("metric = ANY(:metrics)")
+    if "start_date" in filters:
+        conditions.append("report_date >= :start_date")
+    if "end_date" in filters:
+        conditions.append("report_date <= :end_date")
+    return (
+        f"SELECT ticker, '{table}' AS table_name, {frequency} AS frequency, "
+        f"report_date, metric, value FROM {source} WHERE {' AND '.join(conditions)}"
+    )
+
+
+def bulk_query(schema: str, filters: dict, ticker_ids: dict[str, int] | None = None):
+    """
+    The query over the requested tables and its parameters: JSON lines for the ndjson
+    format, columns otherwise. ticker_ids (ticker -> id, see statement_encoding) is
+    given when the tables are dictionary-encoded; tickers without an id have no rows.
+    """
+    params = {
+        "tickers": filters["tickers"],
+        "metrics": filters["metrics"],
+        "frequency": filters["frequency"],
+        **{name: filters[name] for name in ("start_date", "end_date") if name in filters},
+    }
+    if ticker_ids is not None:
+        params["ticker_ids"] = sorted(ticker_ids.values())
+        params["frequency_id"] = FREQUENCY_IDS.get(filters["frequency"])
+    union = " UNION ALL ".join(
+        _select(schema, table, filters, ticker_ids is not None) for table in filters["tables"]
+    )
+    if filters["format"] == "ndjson":
+        # Postgres renders the JSON lines, much faster than json.dumps per row
+        columns = """json_build_object(
+            'ticker', ticker, 'table', table_name, 'frequency', frequency,
+            'report_date', report_date, 'metric', metric, 'value', value
+        )::text"""
+    else:
+        columns = "*"
+    order = "ticker, table_name, frequency, report_date, metric"
+    query = f"SELECT {columns} FROM ({union}) rows ORDER BY {order}"
+    return text(query), params
+
+
+def stream_ndjson(
+    postgres: PostgresInterface, query, params: dict, chunk_rows: int
+) -> Iterator[str]:
+    """One JSON object per row: ticker, table, frequency, report_date, metric, value."""
+    for rows in postgres.stream_rows(query, params, chunk_rows):
+        yield "".join(f"{row[0]}\n" for row in rows)
+
+
+def _take(buffer: io.BytesIO) -> bytes:
+    """Bytes written to buffer so far, emptying it."""
+    data = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return data
+
+
+def stream_arrow(
+    postgres: PostgresInterface, query, params: dict, chunk_rows: int
+) -> Iterator[bytes]:
+    """Arrow IPC stream with ARROW_SCHEMA, one record batch per chunk."""
+    buffer = io.BytesIO()
+    writer = pa.ipc.new_stream(buffer, ARROW_SCHEMA)
+    for rows in postgres.stream_rows(query, params, chunk_rows):
+        columns = zip(*rows)
+        writer.write_batch(
+            pa.record_batch(
+                [
+                    pa.array(column, type=field.type)
+                    for column, field in zip(columns, ARROW_SCHEMA)
+                ],
+                schema=ARROW_SCHEMA,
+            )
+        )
+        yield _take(buffer)
+    writer.close()
+    yield _take(buffer)
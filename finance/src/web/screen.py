@@ -0,0 +1,133 @@
+"""
+Cross-sectional screens over the statement_latest table.
+
+statement_latest holds the latest non-null value of every (statement table, ticker,
+frequency, metric), kept current by the financial ETL (see financial_data_etl). A
+screen filters the tickers' latest values of one metric and sorts them by value, which
+an index on (table_name, frequency, metric, value) answers without reading the
+statement tables, however many tickers they hold.
+
+Used by the /api/screen endpoint.
+"""
+
+from datetime import date
+
+from sqlalchemy import text
+
+from finance.src.statement_snapshots import LATEST_TABLE
+from finance.src.web.bulk import FREQUENCIES
+
+ORDERS = ("desc", "asc")
+DEFAULT_LIMIT = 50
+
+
+def _number(params: dict, name: str, cast, minimum=None):
+    """Optional numeric parameter, cast and checked against minimum."""
+    if params.get(name) in (None, ""):
+        return None
+    try:
+        value = cast(params[name])
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number") from None
+    if minimum is not None and value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}")
+    return value
+
+
+def parse_screen_request(params: dict, tables: list[str], max_limit: int) -> dict:
+    """
+    Validate the screen request parameters (query string) and return the filters.
+    Raises ValueError with a message for the client on invalid input.
+    """
+    metric = (params.get("metric") or "").strip()
+    if not metric:
+        raise ValueError("metric is required")
+
+    table = params.get("table", tables[0])
+    if table not in tables:
+        raise ValueError(f"table must be one of {', '.join(tables)}")
+
+    frequency = params.get("frequency", "annual")
+    if frequency not in FREQUENCIES:
+        raise ValueError(f"frequency must be one of {', '.join(FREQUENCIES)}")
+
+    order = params.get("order", "desc")
+    if order not in ORDERS:
+        raise ValueError(f"order must be one of {', '.join(ORDERS)}")
+
+    since = None
+    if params.get("since"):
+        try:
+            since = date.fromisoformat(params["since"])
+        except (TypeError, ValueError):
+            raise ValueError("since must be an ISO date (YYYY-MM-DD)") from None
+
+    exchanges = [name.strip() for name in params.get("exchange", "").split(",") if name.strip()]
+
+    limit = _number(params, "limit", int, 1)
+    if limit is not None and limit > max_limit:
+        raise ValueError(f"limit must be at most {max_limit}")
+
+    return {
+        "table": table,
+        "frequency": frequency,
+        "metric": metric,
+        "min_value": _number(params, "min_value", float),
+        "max_value": _number(params, "max_value", float),
+        "exchanges": exchanges,
+        "since": since,
+        "order": order,
+        "limit": limit or DEFAULT_LIMIT,
+        "offset": _number(params, "offset", int, 0) or 0,
+    }
+
+
+def screen_query(schema: str, filters: dict):
+    """The screen query and its parameters."""
+    conditions = ["s.table_name = :table", "s.frequency = :frequency", "s.metric = :metric"]
+    params = {key: filters[key] for key in ("table", "frequency", "metric", "limit", "offset")}
+    if filters["min_value"] is not None:
+        conditions.append("s.value >= :min_value")
+        params["min_value"] = filters["min_value"]
+    if filters["max_value"] is not None:
+        conditions.append("s.value <= :max_value")
+        params["max_value"] = filters["max_value"]
+    if filters["exchanges"]:
+        conditions.append("a.exchange = ANY(:exchanges)")
+        params["exchanges"] = filters["exchanges"]
+    if filters["since"] is not None:
+        conditions.append("s.report_date >= :since")
+        params["since"] = filters["since"]
+    query = text(
+        f"""
+        SELECT s.ticker, a.name, a.exchange, s.report_date, s.value
+        FROM {schema}.{LATEST_TABLE} s
+        LEFT JOIN {schema}.active_tickers a ON a.ticker = s.ticker
+        WHERE {" AND ".join(conditions)}
+        ORDER BY s.value {filters["order"].upper()}, s.ticker
+        LIMIT :limit OFFSET :offset
+    """
+    )
+    return query, params
+
+
+def screen_response(filters: dict, results: list[dict]) -> dict:
+    """The screen's response: its filters and the matching tickers."""
+    since = filters["since"].isoformat() if filters["since"] else None
+    return {**filters, "since": since, "results": results}
+
+
+def run_screen(conn, schema: str, filters: dict) -> dict:
+    """Run the screen on an open connection; see screen_response."""
+    query, params = screen_query(schema, filters)
+    results = [
+        {
+            "ticker": ticker,
+            "name": name,
+            "exchange": exchange,
+            "report_date": report_date.isoformat(),
+            "value": value,
+        }
+        for ticker, name, exchange, report_date, value in conn.execute(query, params)
+    ]
+    return screen_response(filters, results)
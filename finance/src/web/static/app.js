@@ -27,11 +27,13 @@ searchInput.addEventListener('input', () => {
 
 async function fetchSuggestions(q) {
     const resp = await fetch(`/api/search?q=${encodeURIComponent(q)}`);
-    const tickers = await resp.json();
-    if (tickers.length === 0) { suggestionsDiv.classList.add('hidden'); return; }
+    const matches = await resp.json();
+    if (matches.length === 0) { suggestionsDiv.classList.add('hidden'); return; }
 
-    suggestionsDiv.innerHTML = tickers.map(t =>
-        `<div class="suggestion-item" data-ticker="${t}">${t}</div>`
+    suggestionsDiv.innerHTML = matches.map(m =>
+        `<div class="suggestion-item" data-ticker="${escapeHtml(m.ticker)}">${escapeHtml(m.ticker)}` +
+        (m.name ? `<span class="suggestion-name">${escapeHtml(m.name)}</span>` : '') +
+        `</div>`
     ).join('');
     suggestionsDiv.classList.remove('hidden');
 
@@ -44,6 +46,10 @@ async function fetchSuggestions(q) {
     });
 }
 
+function escapeHtml(s) {
+    return s.replace(/[&<>"']/g, c => ({ '&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;' }[c]));
+}
+
 // Close suggestions on outside click
 document.addEventListener('click', (e) => {
     if (!e.target.closest('.search-container')) suggestionsDiv.classList.add('hidden');
@@ -0,0 +1,140 @@
+"""
+In-memory autocomplete over active tickers and company names.
+
+The active tickers are loaded once into sorted arrays and searched without touching
+Postgres: prefixes of tickers and of the words of company names are found by binary
+search, substrings through a trigram index. Results are ranked:
+
+1. ticker prefix, shortest tickers first (so an exact match comes first)
+2. name word prefix, e.g. "APP" finds "Apple Inc."
+3. ticker substring
+4. name substring
+
+Every step stops once the limit is reached, so a query costs a few binary searches
+and a scan of the tickers sharing its rarest trigram, not of all tickers. The web app
+rebuilds the index when active_tickers changes (see app.ticker_index).
+"""
+
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from typing import Iterable
+
+_WORD = re.compile(r"[A-Z0-9]+")
+# Separates entries in the substring haystacks; queries containing it match nothing
+_SEPARATOR = "\n"
+
+
+def _prefix_range(keys: list[str], prefix: str) -> range:
+    """Index range of the sorted keys that start with prefix."""
+    return range(bisect_left(keys, prefix), bisect_right(keys, prefix + "￿"))
+
+
+def _trigrams(string: str) -> list[str]:
+    """The three-character substrings of string, in order."""
+    return [a + b + c for a, b, c in zip(string, string[1:], string[2:])]
+
+
+class _SubstringIndex:
+    """
+    Substring search over a list of strings. Queries of three or more characters check
+    only the strings containing the query's rarest trigram; shorter ones, which match
+    many strings, scan the strings joined into one with str.find until enough hits.
+    """
+
+    def __init__(self, strings: list[str]):
+        self.strings = strings
+        self.text = _SEPARATOR.join(strings)
+        self.offsets = []
+        offset = 0
+        for string in strings:
+            self.offsets.append(offset)
+            offset += len(string) + len(_SEPARATOR)
+        postings = defaultdict(list)
+        for i, string in enumerate(strings):
+            for gram in set(_trigrams(string)):
+                postings[gram].append(i)
+        self.trigrams = {gram: array("i", indices) for gram, indices in postings.items()}
+
+    def find(self, q: str):
+        """Indices of the strings containing q, in order."""
+        if len(q) >= 3:
+            grams = [self.trigrams.get(gram) for gram in _trigrams(q)]
+            if None in grams:
+                return
+            yield from (i for i in min(grams, key=len) if q in self.strings[i])
+            return
+        position = self.text.find(q)
+        while position != -1:
+            i = bisect_right(self.offsets, position) - 1
+            yield i
+            if i + 1 == len(self.offsets):
+                return
+            position = self.text.find(q, self.offsets[i + 1])
+
+
+class TickerIndex:
+    """Immutable search index over (ticker, name) pairs."""
+
+    def __init__(self, rows: Iterable[tuple[str, str | None]]):
+        rows = sorted({ticker.upper(): name or "" for ticker, name in rows}.items())
+        self.tickers = [ticker for ticker, _ in rows]
+        self.names = [name for _, name in rows]
+
+        # Row indices per ticker length, each sorted by ticker
+        by_length = defaultdict(list)
+        for i, ticker in enumerate(self.tickers):
+            by_length[len(ticker)].append(i)
+        self._lengths = sorted(by_length)
+        self._by_length = {
+            n: (indices, [self.tickers[i] for i in indices]) for n, indices in by_length.items()
+        }
+
+        words = sorted(
+            (word, i)
+            for i, name in enumerate(self.names)
+            for word in set(_WORD.findall(name.upper()))
+        )
+        self._words = [word for word, _ in words]
+        self._word_rows = [i for _, i in words]
+
+        self._ticker_substrings = _SubstringIndex(self.tickers)
+        self._name_substrings = _SubstringIndex([name.upper() for name in self.names])
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def search(self, q: str, limit: int = 20) -> list[dict]:
+        """Up to limit {ticker, name} matches for q, best first."""
+        q = q.strip().upper()
+        if not q or _SEPARATOR in q:
+            return []
+        found: dict[int, None] = {}  # ordered set
+
+        def add(indices) -> bool:
+            """Add indices until limit is reached; True if it was."""
+            for i in indices:
+                found.setdefault(i)
+                if len(found) >= limit:
+                    return True
+            return False
+
+        def ticker_prefix():
+            for n in self._lengths:
+                if n >= len(q):
+                    indices, tickers = self._by_length[n]
+                    yield from (indices[j] for j in _prefix_range(tickers, q))
+
+        def name_prefix():
+            yield from (self._word_rows[j] for j in _prefix_range(self._words, q))
+
+        for matches in (
+            ticker_prefix(),
+            name_prefix(),
+            self._ticker_substrings.find(q),
+            self._name_substrings.find(q),
+        ):
+            if add(matches):
+                break
+        return [{"ticker": self.tickers[i], "name": self.names[i] or None} for i in found]
@@ -0,0 +1,159 @@
+"""
+Database-level work claiming for sharded financial ETL runs.
+
+Several workers (processes or machines) running the same job claim disjoint chunks of
+the job's priority queue through the etl_leases table: a claim locks the candidate
+active_tickers rows with FOR NO KEY UPDATE SKIP LOCKED, so concurrent claims skip each
+other's candidates instead of waiting, and records a lease per ticker. Leased tickers
+are not claimed again until the lease expires. Every claim renews the worker's own
+leases; if a worker crashes, its leases run out after ETL_LEASE_MINUTES and other
+workers pick the tickers up. When a worker finishes, its tickers stay leased for
+ETL_LEASE_HOLD_HOURS, so tickers that had no data are not fetched again by the other
+workers of the same run.
+
+Used by FinancialDataETL and MultiTableFinancialETL with --sharded / --workers. The
+table is created by the etl_leases migration (see run_migrations).
+"""
+
+import logging
+import os
+import socket
+import uuid
+from typing import Iterator
+
+from sqlalchemy import text
+
+from config import ETL_LEASE_HOLD_HOURS, ETL_LEASE_MINUTES, SCHEMA
+from finance.src.schema_migrations import require_migration
+
+logger = logging.getLogger(__name__)
+
+LEASE_TABLE = "etl_leases"
+
+# Filter for the priority queries: skip tickers another worker holds a live lease on.
+# Expects the active_tickers alias a and the :job parameter.
+UNLEASED_FILTER = f"""AND NOT EXISTS (
+                SELECT 1 FROM {SCHEMA}.{LEASE_TABLE} l
+                WHERE l.job = :job AND l.ticker = a.ticker AND l.leased_until > NOW()
+              )"""
+
+# Statements of the etl_leases migration (see run_migrations)
+LEASES_DDL = [
+    f"""
+    CREATE TABLE IF NOT EXISTS {SCHEMA}.{LEASE_TABLE} (
+        job TEXT NOT NULL,
+        ticker TEXT NOT NULL,
+        worker_id TEXT NOT NULL,
+        leased_until TIMESTAMPTZ NOT NULL,
+        PRIMARY KEY (job, ticker)
+    )
+    """,
+]
+
+
+def new_worker_id() -> str:
+    """Unique worker name for lease rows: host, pid and a random suffix."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def claim_tickers(
+    engine, job: str, worker_id: str, priority_sql: str, params: dict, limit: int
+) -> list[str]:
+    """
+    Claim up to limit tickers for worker_id from priority_sql, a priority query over
+    active_tickers a that includes UNLEASED_FILTER and ends with its ORDER BY. Also
+    renews worker_id's existing leases. Returns the claimed tickers in priority order.
+    """
+    with engine.begin() as conn:
+        require_migration(conn, LEASE_TABLE, "Sharded mode (--sharded)")
+        conn.execute(
+            text(
+                f"""
+                UPDATE {SCHEMA}.{LEASE_TABLE}
+                SET leased_until = NOW() + make_interval(mins => :lease_minutes)
+                WHERE job = :job AND worker_id = :worker_id AND leased_until > NOW()
+            """
+            ),
+            {"job": job, "worker_id": worker_id, "lease_minutes": ETL_LEASE_MINUTES},
+        )
+        # A ticker whose expired lease another worker renewed since this statement's
+        # snapshot fails the ON CONFLICT condition and is not returned
+        result = conn.execute(
+            text(
+                f"""
+                WITH candidates AS (
+                    SELECT ticker, ROW_NUMBER() OVER () AS position
+                    FROM (
+                        {priority_sql}
+                        LIMIT :limit
+                        FOR NO KEY UPDATE OF a SKIP LOCKED
+                    ) queue
+                ),
+                claimed AS (
+                    INSERT INTO {SCHEMA}.{LEASE_TABLE} AS l (job, ticker, worker_id, leased_until)
+                    SELECT :job, ticker, :worker_id, NOW() + make_interval(mins => :lease_minutes)
+                    FROM candidates
+                    ON CONFLICT (job, ticker) DO UPDATE
+                    SET worker_id = EXCLUDED.worker_id, leased_until = EXCLUDED.leased_until
+                    WHERE l.leased_until <= NOW()
+                    RETURNING l.ticker
+                )
+                SELECT c.ticker FROM candidates c JOIN claimed USING (ticker) ORDER BY c.position
+            """
+            ),
+            {
+                **params,
+                "job": job,
+                "worker_id": worker_id,
+                "limit": limit,
+                "lease_minutes": ETL_LEASE_MINUTES,
+            },
+        )
+        return [row[0] for row in result]
+
+
+def finish_leases(engine, job: str, worker_id: str, completed: bool) -> None:
+    """
+    End worker_id's live leases: hold them for ETL_LEASE_HOLD_HOURS if the worker
+    completed, or release them right away (e.g. after an error) so other workers
+    retry the tickers.
+    """
+    with engine.begin() as conn:
+        require_migration(conn, LEASE_TABLE, "Sharded mode (--sharded)")
+        result = conn.execute(
+            text(
+                f"""
+                UPDATE {SCHEMA}.{LEASE_TABLE}
+                SET leased_until = CASE WHEN :completed
+                    THEN NOW() + make_interval(hours => :hold_hours) ELSE NOW() END
+                WHERE job = :job AND worker_id = :worker_id AND leased_until > NOW()
+            """
+            ),
+            {
+                "job": job,
+                "worker_id": worker_id,
+                "completed": completed,
+                "hold_hours": ETL_LEASE_HOLD_HOURS,
+            },
+        )
+    action = "held" if completed else "released"
+    logger.info(f"[{job}] Worker {worker_id} {action} {result.rowcount} leases")
+
+
+def claimed_batches(
+    engine,
+    job: str,
+    worker_id: str,
+    priority_sql: str,
+    params: dict,
+    batch_size: int,
+    max_batches: int | None = None,
+) -> Iterator[list[str]]:
+    """Claim and yield batches of batch_size tickers until the queue is empty or max_batches."""
+    claims = 0
+    while not max_batches or claims < max_batches:
+        tickers = claim_tickers(engine, job, worker_id, priority_sql, params, batch_size)
+        if not tickers:
+            return
+        claims += 1
+        yield tickers
@@ -0,0 +1,265 @@
+"""
+Asyncio engine for probing tickers against the Yahoo Finance API.
+
+Issues the same fundamentals-timeseries requests as stockdex's yahoo_api_* methods
+through one shared curl_cffi AsyncSession (the HTTP client stockdex itself uses, with
+the same browser impersonation and headers),
+bounded by a semaphore and the per-host AdaptiveRateLimiter (see rate_limiter), so
+thousands of probes can be in flight from one process instead of one blocking call
+per thread, without tripping Yahoo's throttling.
+
+Used by ETLJob in 'async' mode. Endpoint ordering and per-endpoint statistics come
+from an optional liveness_probe.ProbeStats.
+"""
+
+import asyncio
+import logging
+import time
+from itertools import islice
+from typing import AsyncIterator, Iterable
+from urllib.parse import quote, urlsplit
+
+from curl_cffi.requests import AsyncSession
+from stockdex import Ticker
+from stockdex import config as stockdex_config
+
+from finance.src.rate_limiter import (
+    AdaptiveRateLimiter,
+    ThrottledError,
+    call_with_retries_async,
+    get_limiter,
+    is_throttle_error,
+)
+from finance.src.run_metrics import current, request_outcome
+
+logger = logging.getLogger(__name__)
+
+YAHOO_COOKIE_URL = "https://fc.yahoo.com"
+YAHOO_CRUMB_URL = "https://query1.finance.yahoo.com/v1/test/getcrumb"
+REQUEST_TIMEOUT = 10  # seconds per HTTP request
+# Browser whose TLS fingerprint curl_cffi impersonates, and the headers sent with every
+# Yahoo request, as stockdex sends them
+IMPERSONATE = "chrome110"
+REQUEST_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/130.0.0.0 Safari/537.36"
+    ),
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "Accept-Language": "en-US,en;q=0.9",
+    "Referer": "https://finance.yahoo.com/",
+    "Origin": "https://finance.yahoo.com",
+    "Connection": "keep-alive",
+}
+
+# stockdex yahoo_api_* method -> fundamentals-timeseries entity it requests
+YAHOO_ENTITIES = {
+    "yahoo_api_income_statement": "income_statement",
+    "yahoo_api_cash_flow": "cash_flow",
+    "yahoo_api_balance_sheet": "balance_sheet",
+    "yahoo_api_financials": "financials",
+}
+
+
+def build_timeseries_url(
+    ticker_symbol: str, stockdex_method: str, base_url: str | None = None
+) -> str:
+    """
+    Build the URL stockdex would request for ticker_symbol's stockdex_method.
+    base_url replaces stockdex's fundamentals base URL (e.g. to point at a stub server).
+    """
+    url = Ticker(ticker_symbol).build_url(
+        "annual", Ticker.five_years_ago, Ticker.today, YAHOO_ENTITIES[stockdex_method]
+    )
+    if base_url:
+        url = url.replace(stockdex_config.FUNDAMENTALS_BASE_URL, base_url, 1)
+    return url
+
+
+def parse_crumb(response) -> str:
+    """The Yahoo crumb from the crumb URL's response; raises RuntimeError if there is none."""
+    crumb = response.text.strip()
+    if response.status_code == 429 or "Too Many Requests" in crumb:
+        raise RuntimeError("Rate limited while getting crumb")
+    if response.status_code != 200 or not crumb or "<html>" in crumb:
+        raise RuntimeError(f"Could not get Yahoo crumb (status {response.status_code})")
+    return crumb
+
+
+def has_timeseries_data(payload: dict) -> bool:
+    """
+    True if a timeseries response holds data, i.e. stockdex would return a non-empty
+    DataFrame.
+    """
+    results = (payload.get("timeseries") or {}).get("result") or []
+    return any(item.get("meta", {}).get("type", [None])[0] in item for item in results)
+
+
+class AsyncYahooProbe:
+    """
+    Checks tickers against the Yahoo API with a shared async HTTP client.
+
+    A ticker is active if at least one of the probed endpoints returns data;
+    endpoints are tried in order and probing stops at the first hit, like
+    etl_job._check_single_ticker. If stats (a liveness_probe.ProbeStats) is given,
+    endpoints are tried in stats.order(exchange) and every request is recorded in it.
+    Tickers whose probes were throttled without any hit get is_active=None (unknown)
+    rather than False.
+    """
+
+    def __init__(
+        self,
+        methods: list[str],
+        max_concurrency: int = 500,
+        attempt_timeout: float = 15,
+        base_url: str | None = None,
+        cookie_url: str | None = None,
+        crumb_url: str | None = None,
+        stats=None,
+        limiter: AdaptiveRateLimiter | None = None,
+    ):
+        self.methods = methods
+        self.max_concurrency = max_concurrency
+        self.attempt_timeout = attempt_timeout  # hard cap per request attempt
+        self.base_url = base_url
+        # Module defaults looked up here, so a stub server can replace them process-wide
+        self.cookie_url = cookie_url or YAHOO_COOKIE_URL
+        self.crumb_url = crumb_url or YAHOO_CRUMB_URL
+        self.stats = stats
+        self.limiter = limiter
+        self.session: AsyncSession | None = None
+        self.semaphore: asyncio.Semaphore | None = None
+        self.crumb: str | None = None
+
+    async def open(self) -> None:
+        """Create the shared session and fetch the Yahoo crumb once."""
+        self.session = AsyncSession(impersonate=IMPERSONATE, max_clients=self.max_concurrency)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.limiter is None:
+            url = build_timeseries_url("PROBE", self.methods[0], self.base_url)
+            self.limiter = get_limiter(urlsplit(url).netloc)
+        await self.session.get(self.cookie_url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+        response = await self.session.get(
+            self.crumb_url, timeout=REQUEST_TIMEOUT, allow_redirects=True
+        )
+        self.crumb = parse_crumb(response)
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def _probe(self, method: str, url: str) -> bool:
+        """
+        Request one endpoint under the rate limiter. Returns whether it has data; raises
+        ThrottledError if every attempt was throttled. Other errors count as no data.
+        """
+
+        async def request():
+            # The crumb is appended directly: passing params makes the client re-encode the
+            # whole (very long) type list on every request.
+            response = await asyncio.wait_for(
+                self.session.get(
+                    f"{url}&crumb={quote(self.crumb)}",
+                    headers=REQUEST_HEADERS,
+                    timeout=REQUEST_TIMEOUT,
+                ),
+                timeout=self.attempt_timeout,
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to fetch URL (status {response.status_code}): {url}")
+            return response.json()
+
+        metrics = current()
+        try:
+            with metrics.timer("yahoo_request"):
+                payload = await call_with_retries_async(request, self.limiter)
+        except ThrottledError as e:
+            metrics.count_request(method, request_outcome(e))
+            raise
+        except Exception as e:
+            metrics.count_request(method, request_outcome(e))
+            return False
+        metrics.count_request(method, "ok")
+        return has_timeseries_data(payload)
+
+    async def check_ticker(self, ticker_symbol: str, exchange: str | None = None) -> bool:
+        """
+        Return True if at least one Yahoo endpoint returns data for ticker_symbol.
+        Raises ThrottledError if none did and at least one was throttled.
+        """
+        methods = self.stats.order(exchange) if self.stats is not None else self.methods
+        try:
+            urls = [(m, build_timeseries_url(ticker_symbol, m, self.base_url)) for m in methods]
+        except Exception:
+            return False
+        throttled = None
+        for method, url in urls:
+            start = time.perf_counter()
+            try:
+                hit = await self._probe(method, url)
+            except ThrottledError as e:
+                hit, throttled = False, e
+            if self.stats is not None:
+                self.stats.record(exchange, method, hit, time.perf_counter() - start)
+            if hit:
+                return True
+        if throttled is not None:
+            raise throttled
+        return False
+
+    async def _check_row(self, row: dict) -> dict:
+        """
+        Set row['is_active']: None if the ticker stayed throttled or timed out. Rows
+        whose check raised also get row['error'].
+        """
+        async with self.semaphore:
+            try:
+                with current().timer("probe", row["ticker"]):
+                    row["is_active"] = await self.check_ticker(row["ticker"], row.get("exchange"))
+            except Exception as e:
+                row["is_active"] = None if is_throttle_error(e) else False
+                row["error"] = repr(e)
+        return row
+
+    async def check_rows(self, ticker_rows: Iterable[dict]) -> AsyncIterator[dict]:
+        """
+        Check every row (see _check_row), yielding each one as soon as its check
+        finishes. Up to max_concurrency checks run at any time across all of
+        ticker_rows: a finished check is replaced by the next row before its result is
+        yielded, so a slow ticker only holds its own slot. Checks still running when
+        the generator is closed are cancelled.
+        """
+        rows = iter(ticker_rows)
+
+        def start(count: int) -> set[asyncio.Future]:
+            return {asyncio.ensure_future(self._check_row(row)) for row in islice(rows, count)}
+
+        running = start(self.max_concurrency)
+        try:
+            while running:
+                done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                running |= start(len(done))
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+
+    async def check_batch(self, ticker_rows: list[dict]) -> list[dict]:
+        """Check every row (see check_rows) and return ticker_rows, in their order."""
+        async for _ in self.check_rows(ticker_rows):
+            pass
+        return ticker_rows
+
+
+async def take(rows: AsyncIterator, n: int) -> list:
+    """The next n items of rows, fewer once it is exhausted."""
+    batch = []
+    while len(batch) < n:
+        try:
+            batch.append(await anext(rows))
+        except StopAsyncIteration:
+            break
+    return batch
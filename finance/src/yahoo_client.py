@@ -0,0 +1,97 @@
+"""
+Rate-limited, synchronous requests to the Yahoo fundamentals-timeseries API.
+
+Sends the same requests as stockdex's yahoo_api_* methods through one curl_cffi
+session per process, but under the per-host AdaptiveRateLimiter (see rate_limiter): a
+throttled response is retried with jittered backoff and, if it never succeeds,
+raises ThrottledError instead of looking like a ticker without data. Successful
+responses are kept in the on-disk response cache (see response_cache). The Yahoo
+crumb is fetched once per process (stockdex fetches it once per Ticker object).
+Requests are timed and counted per endpoint and outcome in the run metrics (see
+run_metrics).
+
+Used by the financial data ETL and the active-tickers probes.
+"""
+
+import threading
+from urllib.parse import quote, urlsplit
+
+import pandas as pd
+from curl_cffi import requests
+from stockdex import Ticker
+
+from finance.src import yahoo_async
+from finance.src.rate_limiter import call_with_retries, get_limiter
+from finance.src.response_cache import cache_key, get_response_cache
+from finance.src.run_metrics import current, request_outcome
+from finance.src.yahoo_async import (
+    IMPERSONATE,
+    REQUEST_HEADERS,
+    REQUEST_TIMEOUT,
+    build_timeseries_url,
+    parse_crumb,
+)
+
+_session = requests.Session(impersonate=IMPERSONATE)
+_crumb: str | None = None
+_crumb_lock = threading.Lock()
+
+
+def _yahoo_crumb() -> str:
+    """The Yahoo crumb, fetched once per process."""
+    global _crumb
+    with _crumb_lock:
+        if _crumb is None:
+            # Looked up here, so a stub server can replace the URLs process-wide
+            for url in (yahoo_async.YAHOO_COOKIE_URL, yahoo_async.YAHOO_CRUMB_URL):
+                response = _session.get(url, timeout=REQUEST_TIMEOUT, allow_redirects=True)
+            _crumb = parse_crumb(response)
+        return _crumb
+
+
+def get_timeseries(ticker_symbol: str, stockdex_method: str) -> dict:
+    """
+    Return the raw timeseries response stockdex's stockdex_method would request for
+    ticker_symbol, from the response cache if present. Raises ThrottledError if Yahoo
+    throttles every attempt.
+    """
+    url = build_timeseries_url(ticker_symbol, stockdex_method)
+    metrics = current()
+    cache = get_response_cache()
+    key = cache_key(ticker_symbol, url)
+    if cache is not None:
+        payload = cache.get(key)
+        if payload is not None:
+            metrics.count_request(stockdex_method, "cached")
+            return payload
+
+    def request() -> dict:
+        response = _session.get(
+            f"{url}&crumb={quote(_yahoo_crumb())}",
+            headers=REQUEST_HEADERS,
+            timeout=REQUEST_TIMEOUT,
+        )
+        if response.status_code != 200:
+            # Same message format as stockdex, so is_throttle_error classifies both alike
+            raise RuntimeError(f"Failed to fetch URL (status {response.status_code}): {url}")
+        return response.json()
+
+    with metrics.timer("yahoo_request"):
+        try:
+            payload = call_with_retries(request, get_limiter(urlsplit(url).netloc))
+        except Exception as e:
+            metrics.count_request(stockdex_method, request_outcome(e))
+            raise
+    metrics.count_request(stockdex_method, "ok")
+    if cache is not None:
+        cache.put(key, payload)
+    return payload
+
+
+def fetch_statement(ticker_symbol: str, stockdex_method: str) -> pd.DataFrame:
+    """
+    Rate-limited equivalent of Ticker(ticker_symbol).<stockdex_method>(): the statement
+    as a wide DataFrame (index=dates, columns=metrics), empty if Yahoo has no data.
+    """
+    payload = get_timeseries(ticker_symbol, stockdex_method)
+    return Ticker(ticker_symbol).extract_dataframe(payload["timeseries"]["result"], "fmt")
@@ -0,0 +1,105 @@
+import hashlib
+import json
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from finance.src.web import api_cache
+from finance.src.web.api_cache import UNVERSIONED, APICache, LRUCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the cache's time.monotonic with a clock the test advances."""
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(api_cache, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+class Source:
+    """Data version and response builder that count their calls."""
+
+    def __init__(self, version):
+        self.version = version
+        self.version_loads = 0
+        self.builds = 0
+
+    def load_version(self):
+        self.version_loads += 1
+        return self.version
+
+    def build(self):
+        self.builds += 1
+        return {"build": self.builds}
+
+
+def _get(cache: APICache, source: Source, key="AAPL"):
+    return cache.get(key, "income_stmt", source.load_version, source.build)
+
+
+def test_lru_eviction_and_ttl(clock):
+    cache = LRUCache(max_entries=2, ttl_seconds=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # now the most recently used
+    cache.put("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    clock.now = 11
+    assert cache.get("a") is None
+
+
+def test_etag_and_last_modified(clock):
+    version = datetime(2024, 1, 2, 3, 4, 5)
+    response = _get(APICache(10, 60, json.dumps), Source(version))
+    assert response.body == '{"build": 1}'
+    assert response.etag == hashlib.sha1(response.body.encode()).hexdigest()
+    assert response.last_modified == version
+    assert response.version == version
+
+
+def test_reused_until_version_changes(clock):
+    cache, source = APICache(10, 60, json.dumps), Source(1)
+    first = _get(cache, source)
+    assert _get(cache, source) is first
+    assert (source.version_loads, source.builds) == (1, 1)
+
+    # A new version shows up only once the version TTL has passed
+    source.version = 2
+    assert _get(cache, source) is first
+    clock.now = 61
+    second = _get(cache, source)
+    assert second.body == '{"build": 2}'
+    assert second.etag != first.etag
+    assert (source.version_loads, source.builds) == (2, 2)
+
+
+def test_version_shared_across_keys(clock):
+    cache, source = APICache(10, 60, json.dumps), Source(1)
+    _get(cache, source, "AAPL")
+    _get(cache, source, "MSFT")
+    assert (source.version_loads, source.builds) == (1, 2)
+
+
+def test_none_version_is_cached(clock):
+    cache, source = APICache(10, 60, json.dumps), Source(None)
+    first = _get(cache, source)
+    assert _get(cache, source) is first
+    assert first.last_modified is None
+    assert source.version_loads == 1
+
+
+def test_unversioned_never_cached(clock):
+    cache, source = APICache(10, 60, json.dumps), Source(UNVERSIONED)
+    _get(cache, source)
+    _get(cache, source)
+    assert source.builds == 2
+    assert len(cache.responses) == 0
+
+
+def test_clear(clock):
+    cache, source = APICache(10, 60, json.dumps), Source(1)
+    _get(cache, source)
+    cache.clear()
+    _get(cache, source)
+    assert (source.version_loads, source.builds) == (2, 2)
@@ -0,0 +1,67 @@
+from datetime import date
+
+import pytest
+
+from finance.src.web.bulk import bulk_query, parse_bulk_request
+
+TABLES = ["income_stmt", "balance_sheet", "cash_flow"]
+
+
+def test_defaults():
+    assert parse_bulk_request({"tickers": "msft, aapl,,MSFT"}, TABLES, 10) == {
+        "tickers": ["AAPL", "MSFT"],
+        "tables": TABLES,
+        "metrics": [],
+        "frequency": None,
+        "format": "ndjson",
+    }
+
+
+def test_json_body():
+    filters = parse_bulk_request(
+        {
+            "tickers": ["aapl"],
+            "tables": ["cash_flow", "income_stmt"],
+            "metrics": ["annualEbit", " annualNetIncome "],
+            "frequency": "annual",
+            "start_date": "2020-01-01",
+            "end_date": "2023-12-31",
+            "format": "arrow",
+        },
+        TABLES,
+        10,
+    )
+    # Tables keep the configured order
+    assert filters["tables"] == ["income_stmt", "cash_flow"]
+    assert filters["metrics"] == ["annualEbit", "annualNetIncome"]
+    assert filters["frequency"] == "annual"
+    assert filters["start_date"] == date(2020, 1, 1)
+    assert filters["end_date"] == date(2023, 12, 31)
+    assert filters["format"] == "arrow"
+
+
+@pytest.mark.parametrize(
+    "params, message",
+    [
+        ({}, "tickers is required"),
+        ({"tickers": " , "}, "tickers is required"),
+        ({"tickers": "A,B,C"}, "at most 2 tickers per request"),
+        ({"tickers": "A", "tables": "income_stmt,nope"}, "unknown tables: nope"),
+        ({"tickers": "A", "frequency": "monthly"}, "frequency must be one of"),
+        ({"tickers": "A", "start_date": "2020-13-01"}, "start_date must be an ISO date"),
+        ({"tickers": "A", "end_date": 20200101}, "end_date must be an ISO date"),
+        ({"tickers": "A", "format": "csv"}, "format must be one of ndjson, arrow"),
+    ],
+)
+def test_invalid(params, message):
+    with pytest.raises(ValueError, match=message):
+        parse_bulk_request(params, TABLES, 2)
+
+
+def test_encoded_query_filters_by_id():
+    filters = parse_bulk_request({"tickers": "aapl,new", "frequency": "quarterly"}, TABLES, 10)
+    query, params = bulk_query("finance", filters, {"AAPL": 7})
+    assert "FROM finance.income_stmt_data d" in query.text
+    assert "d.ticker_id = ANY(:ticker_ids) AND d.frequency_id = :frequency_id" in query.text
+    assert params["ticker_ids"] == [7]
+    assert params["frequency_id"] == 2
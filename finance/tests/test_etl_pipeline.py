@@ -0,0 +1,119 @@
+import threading
+import time
+
+import pytest
+
+from finance.src.etl_pipeline import StagePipeline
+from finance.src.rate_limiter import ThrottledError
+
+TICKERS = [f"T{i:03d}" for i in range(100)]
+
+
+class FakeState:
+    """RunState stand-in that keeps the recorded outcomes."""
+
+    def __init__(self):
+        self.statuses = {}
+        self.flushes = 0
+        self._lock = threading.Lock()
+
+    def record(self, ticker, status, error=None):
+        with self._lock:
+            self.statuses[ticker] = status
+
+    def flush(self):
+        self.flushes += 1
+
+
+def _pipeline(load, fetch=lambda ticker: ticker, **kwargs) -> StagePipeline:
+    options = {"max_threads": 4, "queue_size": 2, "flush_rows": 10, "flush_seconds": 60}
+    return StagePipeline(
+        fetch=fetch,
+        transform=lambda ticker, raw: [raw],
+        load=load,
+        size=len,
+        **{**options, **kwargs},
+    )
+
+
+def test_loads_every_ticker():
+    loads = []
+    state = FakeState()
+    counts = _pipeline(loads.append, state=state).run(TICKERS)
+
+    assert sorted(row for results in loads for result in results for row in result) == TICKERS
+    # Written once flush_rows rows have accumulated, the rest at the end
+    assert all(len(results) == 10 for results in loads)
+    assert counts == {"fetched": 100, "with_data": 100, "throttled": 0, "flushes": 10}
+    assert set(state.statuses.values()) == {"done"}
+    assert state.flushes == 10
+
+
+def test_fetch_outcomes():
+    def fetch(ticker):
+        if ticker == "T001":
+            raise ThrottledError("throttled")
+        if ticker == "T002":
+            raise RuntimeError("boom")
+        return None if ticker == "T003" else ticker
+
+    loads = []
+    state = FakeState()
+    counts = _pipeline(loads.append, fetch=fetch, state=state).run(TICKERS[:5])
+
+    assert counts == {"fetched": 4, "with_data": 2, "throttled": 1, "flushes": 1}
+    assert state.statuses == {
+        "T000": "done",
+        "T001": "throttled",
+        "T002": "error",
+        "T003": "no_data",
+        "T004": "done",
+    }
+
+
+def test_back_pressure():
+    fetched_while_loading = []
+
+    def slow_load(results):
+        time.sleep(0.1)
+        fetched_while_loading.append(pipeline.counts["fetched"])
+
+    pipeline = _pipeline(slow_load, max_threads=2, queue_size=1, flush_rows=1)
+    pipeline.run(TICKERS[:10])
+
+    # Fetching stays ahead of loading by at most the queues (1 each), the ticker held by
+    # the transform thread and 1 per fetch thread
+    assert all(fetched <= loads + 5 for loads, fetched in enumerate(fetched_while_loading, 1))
+    assert len(fetched_while_loading) == 10
+
+
+def test_load_error_stops_pipeline():
+    fetched = []
+
+    def fetch(ticker):
+        fetched.append(ticker)
+        return ticker
+
+    def load(results):
+        raise RuntimeError("write failed")
+
+    pipeline = _pipeline(load, fetch=fetch, flush_rows=1)
+    with pytest.raises(RuntimeError, match="write failed"):
+        pipeline.run(TICKERS)
+    # run() returns only after joining the stage threads, which stop fetching
+    assert len(fetched) < len(TICKERS)
+    assert not [thread for thread in threading.enumerate() if thread.daemon and thread.is_alive()]
+
+
+def test_ticker_iterator_error_propagates():
+    def tickers():
+        yield from TICKERS[:3]
+        raise ConnectionError("claim failed")
+
+    loads = []
+    started = time.monotonic()
+    with pytest.raises(ConnectionError, match="claim failed"):
+        _pipeline(loads.append).run(tickers())
+    # Without waiting for the flush interval
+    assert time.monotonic() - started < 5
+    assert not [thread for thread in threading.enumerate() if thread.daemon and thread.is_alive()]
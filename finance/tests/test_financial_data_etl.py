@@ -0,0 +1,88 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from finance.src.financial_data_etl import (
+    FREQUENCY_DTYPE,
+    LOAD_COLUMNS,
+    _melt_financial_df,
+    _parse_value,
+    _parse_values,
+)
+
+
+def _parse_each(values) -> np.ndarray:
+    """_parse_value applied cell by cell, with None as NaN."""
+    parsed = [_parse_value(value) for value in values]
+    return np.array([np.nan if value is None else value for value in parsed])
+
+
+@pytest.mark.parametrize(
+    "values",
+    [
+        # Vectorized path: every cell is a plain or suffixed number
+        ["99.80B", "-1.23M", "456.78K", "2.5T", "1,234", "1,234.5M", "12.5", " 7 "],
+        # Missing and placeholder cells
+        ["99.80B", "--", "", None, np.nan, "3K"],
+        # Cells that do not fit the vectorized shape fall back to _parse_value
+        ["1.2.3B", "12BB", "B", "n/a", "4M", "1e3"],
+    ],
+)
+def test_parse_values_matches_parse_value(values):
+    raw = np.array(values, dtype=object)
+    np.testing.assert_array_equal(_parse_values(raw), _parse_each(raw))
+
+
+def test_parse_values_suffixes():
+    raw = np.array(["99.80B", "-1.23M", "456.78K", "2.5T", "1,234"], dtype=object)
+    np.testing.assert_allclose(_parse_values(raw), [99.8e9, -1.23e6, 456.78e3, 2.5e12, 1234])
+
+
+def test_parse_values_numeric_input():
+    np.testing.assert_array_equal(_parse_values(np.array([1, 2])), [1.0, 2.0])
+    np.testing.assert_array_equal(_parse_values(pd.Series([1.5, np.nan])), [1.5, np.nan])
+
+
+def test_melt_financial_df():
+    df = pd.DataFrame(
+        {
+            "annualTotalRevenue": ["99.80B", "--"],
+            "quarterlyNetIncome": ["1.5M", "2K"],
+            "annualEbit": [None, "-3.2M"],
+        },
+        index=["2023-09-30", "2022-09-30"],
+    )
+    melted = _melt_financial_df("AAPL", df)
+
+    assert list(melted.columns) == LOAD_COLUMNS
+    assert melted["frequency"].dtype == FREQUENCY_DTYPE
+    for column in ("ticker", "metric"):
+        assert isinstance(melted[column].dtype, pd.CategoricalDtype)
+    # Column by column, like DataFrame.melt, without the unparseable cells
+    rows = [
+        (row.ticker, row.frequency, row.report_date, row.metric, row.value)
+        for row in melted.itertuples()
+    ]
+    assert rows == [
+        ("AAPL", "annual", date(2023, 9, 30), "annualTotalRevenue", 99.8e9),
+        ("AAPL", "quarterly", date(2023, 9, 30), "quarterlyNetIncome", 1.5e6),
+        ("AAPL", "quarterly", date(2022, 9, 30), "quarterlyNetIncome", 2e3),
+        ("AAPL", "annual", date(2022, 9, 30), "annualEbit", -3.2e6),
+    ]
+    assert melted["insert_datetime"].nunique() == 1
+
+
+def test_melt_financial_df_drops_invalid_dates():
+    df = pd.DataFrame({"annualTotalRevenue": ["1B", "2B"]}, index=["2023-09-30", "TTM"])
+    melted = _melt_financial_df("AAPL", df)
+    assert melted["report_date"].tolist() == [date(2023, 9, 30)]
+    assert melted["value"].tolist() == [1e9]
+
+
+def test_melt_financial_df_duplicate_metrics():
+    df = pd.DataFrame([["1B", "2B"]], columns=["annualEbit", "annualEbit"], index=["2023-09-30"])
+    melted = _melt_financial_df("AAPL", df)
+    assert melted["metric"].tolist() == ["annualEbit", "annualEbit"]
+    assert melted["value"].tolist() == [1e9, 2e9]
@@ -0,0 +1,185 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from finance.src import rate_limiter
+from finance.src.rate_limiter import (
+    AdaptiveRateLimiter,
+    ThrottledError,
+    call_with_retries,
+    is_throttle_error,
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Replaces the limiter's clock and sleep with a clock the test advances."""
+    clock = SimpleNamespace(now=100.0, sleeps=[])
+
+    def sleep(seconds):
+        clock.sleeps.append(seconds)
+        clock.now += seconds
+
+    monkeypatch.setattr(
+        rate_limiter, "time", SimpleNamespace(monotonic=lambda: clock.now, sleep=sleep)
+    )
+    return clock
+
+
+def _limiter(**kwargs) -> AdaptiveRateLimiter:
+    options = {
+        "rate": 4.0,
+        "min_rate": 1.0,
+        "max_rate": 100.0,
+        "concurrency": 4,
+        "max_concurrency": 50,
+        "rate_increase": 0.5,
+        "decrease_factor": 0.5,
+        "cooldown": 2.0,
+    }
+    return AdaptiveRateLimiter("test", **{**options, **kwargs})
+
+
+def _request(limiter: AdaptiveRateLimiter, clock, throttled: bool | None) -> None:
+    """One request a second after the previous one, so a token is always available."""
+    clock.now += 1
+    assert limiter.try_acquire() == 0
+    limiter.release(throttled)
+
+
+def test_slow_start(clock):
+    limiter = _limiter()
+    _request(limiter, clock, False)
+    _request(limiter, clock, False)
+    assert (limiter.rate, limiter.concurrency) == (6.0, 6.0)
+    assert limiter.in_flight == 0
+
+
+def test_decrease_then_additive_increase(clock):
+    limiter = _limiter(rate=8.0, concurrency=8)
+    _request(limiter, clock, True)
+    assert (limiter.rate, limiter.concurrency) == (4.0, 4.0)
+    _request(limiter, clock, False)
+    assert (limiter.rate, limiter.concurrency) == (4.5, 4.25)
+
+
+def test_decrease_once_per_cooldown(clock):
+    limiter = _limiter(rate=8.0, concurrency=8, cooldown=5.0)
+    _request(limiter, clock, True)
+    _request(limiter, clock, True)
+    assert (limiter.rate, limiter.concurrency, limiter.throttled) == (4.0, 4.0, 2)
+    clock.now += 4
+    _request(limiter, clock, True)
+    assert (limiter.rate, limiter.concurrency) == (2.0, 2.0)
+
+
+def test_limits(clock):
+    limiter = _limiter(rate=1.5, concurrency=1, max_rate=2.0, max_concurrency=2)
+    for _ in range(3):
+        _request(limiter, clock, True)
+        clock.now += 2
+    assert (limiter.rate, limiter.concurrency) == (1.0, 1.0)
+    for _ in range(5):
+        _request(limiter, clock, False)
+    assert (limiter.rate, limiter.concurrency) == (2.0, 2.0)
+
+
+def test_release_none_keeps_limits(clock):
+    limiter = _limiter()
+    _request(limiter, clock, None)
+    assert (limiter.rate, limiter.concurrency, limiter.throttled) == (4.0, 4.0, 0)
+    assert limiter.in_flight == 0
+
+
+def test_concurrency_window(clock):
+    limiter = _limiter(rate=100.0, concurrency=2)
+    clock.now += 1  # fill the token bucket
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() > 0
+    limiter.release(None)
+    assert limiter.try_acquire() == 0
+    assert limiter.in_flight == 2
+
+
+def test_token_bucket(clock):
+    limiter = _limiter(rate=2.0, concurrency=10)
+    assert limiter.try_acquire() == 0
+    assert limiter.try_acquire() == pytest.approx(0.5)
+    limiter.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+    assert limiter.requests == 2
+
+
+def test_acquire_async(clock):
+    limiter = _limiter(rate=100.0, concurrency=1)
+    asyncio.run(limiter.acquire_async())
+    assert limiter.in_flight == 1
+
+
+@pytest.mark.parametrize(
+    "exc, throttled",
+    [
+        (ThrottledError("throttled"), True),
+        (asyncio.TimeoutError(), True),
+        (RuntimeError("Failed to fetch URL (status 429): Too Many Requests"), True),
+        (RuntimeError("Failed to fetch URL (status 503): ..."), True),
+        (RuntimeError("Rate limited, try again"), True),
+        (RuntimeError("Failed to fetch URL (status 404): Not Found"), False),
+        (ValueError("status 429"), False),
+        (KeyError("annual"), False),
+    ],
+)
+def test_is_throttle_error(exc, throttled):
+    assert is_throttle_error(exc) is throttled
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    """Retry attempts that backed off, without sleeping."""
+    attempts = []
+    monkeypatch.setattr(
+        rate_limiter, "backoff_delay", lambda attempt: attempts.append(attempt) or 0.0
+    )
+    return attempts
+
+
+def test_call_with_retries_recovers(clock, backoffs):
+    limiter = _limiter()
+    calls = []
+
+    def func():
+        calls.append(1)
+        if len(calls) < 3:
+            raise RuntimeError("Failed to fetch URL (status 429)")
+        return "data"
+
+    assert call_with_retries(func, limiter, retries=3) == "data"
+    assert (len(calls), backoffs, limiter.throttled) == (3, [0, 1], 2)
+    assert limiter.in_flight == 0
+
+
+def test_call_with_retries_raises_throttled(clock, backoffs):
+    limiter = _limiter()
+
+    def func():
+        raise RuntimeError("Failed to fetch URL (status 503)")
+
+    with pytest.raises(ThrottledError, match="Throttled after 3 attempts"):
+        call_with_retries(func, limiter, retries=2)
+    assert (limiter.requests, limiter.throttled, backoffs) == (3, 3, [0, 1])
+    assert limiter.in_flight == 0
+
+
+def test_call_with_retries_other_errors_propagate(clock, backoffs):
+    limiter = _limiter()
+
+    def func():
+        raise KeyError("annual")
+
+    with pytest.raises(KeyError):
+        call_with_retries(func, limiter, retries=2)
+    # Not retried; the server answered, so it counts as a healthy response
+    assert (limiter.requests, limiter.throttled, limiter.rate, backoffs) == (1, 0, 5.0, [])
+    assert limiter.in_flight == 0
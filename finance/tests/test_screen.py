@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+
+from finance.src.web.screen import DEFAULT_LIMIT, parse_screen_request
+
+TABLES = ["income_stmt", "balance_sheet", "cash_flow"]
+
+
+def test_defaults():
+    assert parse_screen_request({"metric": " annualEbit "}, TABLES, 500) == {
+        "table": "income_stmt",
+        "frequency": "annual",
+        "metric": "annualEbit",
+        "min_value": None,
+        "max_value": None,
+        "exchanges": [],
+        "since": None,
+        "order": "desc",
+        "limit": DEFAULT_LIMIT,
+        "offset": 0,
+    }
+
+
+def test_all_parameters():
+    filters = parse_screen_request(
+        {
+            "metric": "quarterlyNetIncome",
+            "table": "cash_flow",
+            "frequency": "quarterly",
+            "order": "asc",
+            "since": "2023-01-01",
+            "exchange": "NMS, NYQ,",
+            "min_value": "-1.5e6",
+            "max_value": "2000",
+            "limit": "10",
+            "offset": "20",
+        },
+        TABLES,
+        500,
+    )
+    assert filters == {
+        "table": "cash_flow",
+        "frequency": "quarterly",
+        "metric": "quarterlyNetIncome",
+        "min_value": -1.5e6,
+        "max_value": 2000.0,
+        "exchanges": ["NMS", "NYQ"],
+        "since": date(2023, 1, 1),
+        "order": "asc",
+        "limit": 10,
+        "offset": 20,
+    }
+
+
+def test_empty_numbers_use_defaults():
+    filters = parse_screen_request(
+        {"metric": "annualEbit", "min_value": "", "limit": "", "offset": ""}, TABLES, 500
+    )
+    assert (filters["min_value"], filters["limit"], filters["offset"]) == (None, DEFAULT_LIMIT, 0)
+
+
+@pytest.mark.parametrize(
+    "params, message",
+    [
+        ({}, "metric is required"),
+        ({"metric": "  "}, "metric is required"),
+        ({"metric": "m", "table": "nope"}, "table must be one of"),
+        ({"metric": "m", "frequency": "monthly"}, "frequency must be one of"),
+        ({"metric": "m", "order": "up"}, "order must be one of desc, asc"),
+        ({"metric": "m", "since": "yesterday"}, "since must be an ISO date"),
+        ({"metric": "m", "min_value": "lots"}, "min_value must be a number"),
+        ({"metric": "m", "limit": "1.5"}, "limit must be a number"),
+        ({"metric": "m", "limit": "0"}, "limit must be at least 1"),
+        ({"metric": "m", "limit": "501"}, "limit must be at most 500"),
+        ({"metric": "m", "offset": "-1"}, "offset must be at least 0"),
+    ],
+)
+def test_invalid(params, message):
+    with pytest.raises(ValueError, match=message):
+        parse_screen_request(params, TABLES, 500)
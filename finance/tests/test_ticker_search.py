@@ -0,0 +1,65 @@
+import pytest
+
+from finance.src.web.ticker_search import TickerIndex
+
+ROWS = [
+    ("AAPL", "Apple Inc."),
+    ("aa", "Alcoa Corporation"),
+    ("MSFT", "Microsoft Corporation"),
+    ("APLE", "Apple Hospitality REIT, Inc."),
+    ("PAPL", None),
+    ("XAPP", "Xapp Holdings"),
+    ("A", "Agilent Technologies, Inc."),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return TickerIndex(ROWS)
+
+
+def _tickers(results: list[dict]) -> list[str]:
+    return [result["ticker"] for result in results]
+
+
+def test_tickers_upper_cased_and_deduplicated():
+    index = TickerIndex([("aapl", "Apple"), ("AAPL", "Apple Inc.")])
+    assert len(index) == 1
+    assert index.search("aapl") == [{"ticker": "AAPL", "name": "Apple Inc."}]
+
+
+def test_ticker_prefix_shortest_first(index):
+    assert _tickers(index.search("a"))[:3] == ["A", "AA", "AAPL"]
+
+
+def test_ranking(index):
+    # Ticker prefix, then name word prefix, then ticker substring, then name substring
+    assert _tickers(index.search("AP")) == ["APLE", "AAPL", "PAPL", "XAPP"]
+    assert _tickers(index.search("APP")) == ["AAPL", "APLE", "XAPP"]
+
+
+def test_name_word_prefix(index):
+    assert _tickers(index.search("micro")) == ["MSFT"]
+    assert _tickers(index.search("corp")) == ["AA", "MSFT"]
+
+
+def test_substring(index):
+    # Three or more characters go through the trigram index, shorter ones a scan
+    assert _tickers(index.search("APL")) == ["APLE", "AAPL", "PAPL"]
+    assert _tickers(index.search("SF")) == ["MSFT"]
+    assert _tickers(index.search("ospital")) == ["APLE"]
+    assert index.search("QQQ") == []
+
+
+def test_limit(index):
+    assert len(index.search("A", limit=2)) == 2
+    assert _tickers(index.search("AP", limit=3)) == ["APLE", "AAPL", "PAPL"]
+
+
+def test_missing_name_is_none(index):
+    assert index.search("PAPL") == [{"ticker": "PAPL", "name": None}]
+
+
+@pytest.mark.parametrize("q", ["", "   ", "AA\nPL"])
+def test_empty_and_separator_queries(index, q):
+    assert index.search(q) == []